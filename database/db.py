@@ -0,0 +1,96 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger('wizards_of_x.database')
+
+class Database:
+    """Thin wrapper over a DB-API connection for the game's tables.
+
+    Statements are written with %s placeholders (mysql.connector style)
+    and always executed as prepared statements. One connection is shared
+    and guarded by a lock, which keeps the footprint small on the e2-micro
+    VM; `placeholder` lets tests run the same SQL against sqlite3.
+    """
+
+    def __init__(self, connect: Callable[[], Any], placeholder: str = '%s'):
+        self._connect = connect
+        self._conn = None
+        self.placeholder = placeholder
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, db_config: Dict) -> 'Database':
+        """Connect to MySQL using the same config dict as SystemMonitor."""
+        import mysql.connector
+        return cls(lambda: mysql.connector.connect(**db_config))
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn
+
+    def _sql(self, sql: str) -> str:
+        return sql if self.placeholder == '%s' else sql.replace('%s', self.placeholder)
+
+    @contextmanager
+    def transaction(self):
+        """Run several statements atomically; yields a cursor-like handle."""
+        with self._lock:
+            conn = self._connection()
+            cursor = conn.cursor()
+            try:
+                yield _Cursor(self, cursor)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, sql: str, params: Sequence = ()) -> int:
+        """Execute one statement in its own transaction; returns rowcount."""
+        with self.transaction() as cursor:
+            return cursor.execute(sql, params)
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> int:
+        """Execute one statement for many rows in a single transaction."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        with self.transaction() as cursor:
+            return cursor.executemany(sql, rows)
+
+    def fetchall(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        with self.transaction() as cursor:
+            return cursor.fetchall(sql, params)
+
+    def fetchone(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        rows = self.fetchall(sql, params)
+        return rows[0] if rows else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class _Cursor:
+    """Cursor wrapper that applies the placeholder translation."""
+
+    def __init__(self, db: Database, cursor):
+        self._db = db
+        self._cursor = cursor
+
+    def execute(self, sql: str, params: Sequence = ()) -> int:
+        self._cursor.execute(self._db._sql(sql), tuple(params))
+        return self._cursor.rowcount
+
+    def executemany(self, sql: str, rows: Iterable[Sequence]) -> int:
+        self._cursor.executemany(self._db._sql(sql), [tuple(row) for row in rows])
+        return self._cursor.rowcount
+
+    def fetchall(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        self._cursor.execute(self._db._sql(sql), tuple(params))
+        return self._cursor.fetchall()
@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_logic.character import Character
+
+logger = logging.getLogger('wizards_of_x.database')
+
+class PlayerStore:
+    """Column-level, batched persistence for the players table.
+
+    Callers `mark` characters after changing them, on the thread that
+    owns the character (its PlayerExecutor shard), and `mark` takes the
+    changed columns right there; `flush` only writes those collected
+    values, so it never reads a character another thread is changing.
+    Characters changed several times between flushes are written once.
+    Updates that touch the same set of columns share one executemany, and
+    a whole flush runs in a single transaction. Flushes happen when
+    `batch_size` characters are queued, from `maybe_flush` once
+    `flush_interval` has passed, and on `close`.
+    """
+
+    COLUMNS = ('twitter_handle', 'name', 'house', 'level', 'xp', 'hp', 'max_hp', 'bonus_galleons',
+               'withdrawable_galleons', 'spells', 'potions', 'wins', 'losses', 'titles')
+    INSERT_SQL = "INSERT INTO players ({}) VALUES ({})".format(
+        ', '.join(COLUMNS), ', '.join(['%s'] * len(COLUMNS))
+    )
+    SELECT_SQL = "SELECT {} FROM players WHERE twitter_handle = %s".format(', '.join(COLUMNS))
+
+    def __init__(self, db, batch_size: int = 500, flush_interval: Optional[float] = 5,
+                 clock: Callable[[], float] = time.monotonic):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval  # seconds; None disables maybe_flush
+        self.clock = clock
+        self.rows_written = 0
+        self.statements = 0
+        self._dirty: Dict[str, Dict[str, object]] = {}  # handle -> changed column values
+        self._last_flush = clock()
+        self._lock = threading.Lock()
+
+    def insert(self, character: Character) -> None:
+        """Write a new character's full row."""
+        row = character.to_dict()
+        character.take_changes()
+        self.db.execute(self.INSERT_SQL, [row[column] for column in self.COLUMNS])
+
+    def load(self, twitter_handle: str) -> Optional[Character]:
+        """Read one character, or None if the handle has no row."""
+        row = self.db.fetchone(self.SELECT_SQL, (twitter_handle,))
+        if row is None:
+            return None
+        return Character.from_dict(dict(zip(self.COLUMNS, row)))
+
+    def mark(self, character: Character) -> None:
+        """Take a character's changes for the next flush; call from its owning thread."""
+        changes = character.take_changes()
+        if not changes:
+            return
+        with self._lock:
+            self._dirty.setdefault(character.twitter_handle, {}).update(changes)
+            full = len(self._dirty) >= self.batch_size
+        if full:
+            self.flush()
+
+    def maybe_flush(self) -> int:
+        """Flush if `flush_interval` has passed since the last flush."""
+        if self.flush_interval is None or self.clock() - self._last_flush < self.flush_interval:
+            return 0
+        return self.flush()
+
+    def close(self) -> int:
+        """Write everything still queued, e.g. at shutdown."""
+        return self.flush()
+
+    def flush(self) -> int:
+        """Write every queued change; returns the number of rows updated."""
+        with self._lock:
+            taken, self._dirty = self._dirty, {}
+        self._last_flush = self.clock()
+        if not taken:
+            return 0
+
+        # Group rows by the exact set of columns they change
+        groups: Dict[Tuple[str, ...], List[Tuple]] = {}
+        for handle, changes in taken.items():
+            columns = tuple(sorted(changes))
+            groups.setdefault(columns, []).append(
+                tuple(changes[column] for column in columns) + (handle,)
+            )
+
+        try:
+            with self.db.transaction() as cursor:
+                for columns, rows in groups.items():
+                    assignments = ', '.join(f'{column} = %s' for column in columns)
+                    cursor.executemany(
+                        f"UPDATE players SET {assignments} WHERE twitter_handle = %s", rows
+                    )
+        except Exception as e:
+            logger.error(f"Failed to persist {len(taken)} players: {e}")
+            with self._lock:
+                # Requeue under anything marked since, which is newer
+                for handle, changes in taken.items():
+                    self._dirty[handle] = {**changes, **self._dirty.get(handle, {})}
+            return 0
+
+        self.statements += len(groups)
+        self.rows_written += len(taken)
+        return len(taken)
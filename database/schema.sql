@@ -10,6 +10,7 @@ CREATE TABLE IF NOT EXISTS players (
     level INT DEFAULT 1,
     xp INT DEFAULT 0,
     hp INT DEFAULT 100,
+    max_hp INT DEFAULT 100,
     bonus_galleons DECIMAL(10,2) DEFAULT 20.00,
     withdrawable_galleons DECIMAL(10,2) DEFAULT 0.00,
     spells JSON,
@@ -31,11 +32,29 @@ CREATE TABLE IF NOT EXISTS active_duels (
     hp1 INT,
     hp2 INT,
     combo_history JSON,
+    seed BIGINT,
+    -- Each player as the duel started, so a replay ignores later level-ups
+    level1 INT,
+    level2 INT,
+    house1 VARCHAR(20),
+    house2 VARCHAR(20),
+    start_hp1 INT,
+    start_hp2 INT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (player1) REFERENCES players(twitter_handle),
     FOREIGN KEY (player2) REFERENCES players(twitter_handle)
 );
 
+-- One row per cast; a duel is rebuilt by replaying these from its seed
+CREATE TABLE IF NOT EXISTS duel_events (
+    duel_id INT,
+    turn INT,
+    caster VARCHAR(50),
+    spell VARCHAR(30),
+    PRIMARY KEY (duel_id, turn),
+    FOREIGN KEY (duel_id) REFERENCES active_duels(id)
+);
+
 -- Banking tables
 CREATE TABLE IF NOT EXISTS withdrawal_requests (
     id INT PRIMARY KEY AUTO_INCREMENT,
@@ -66,4 +85,45 @@ CREATE TABLE IF NOT EXISTS processed_transactions (
     value DECIMAL(10,2),
     processed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     status VARCHAR(20)
-); 
\ No newline at end of file
+);
+
+-- Settled and expired @bankrbot transfers, archived out of memory
+CREATE TABLE IF NOT EXISTS bankrbot_transactions (
+    id VARCHAR(40) PRIMARY KEY,
+    sender VARCHAR(50),
+    amount DECIMAL(10,2),
+    tx_hash VARCHAR(66),
+    status VARCHAR(20),
+    created_at TIMESTAMP NULL,
+    confirmed_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tournament state written when the bracket starts and after every round
+CREATE TABLE IF NOT EXISTS tournament_checkpoints (
+    tournament_id INT,
+    round INT,
+    state JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tournament_id, round)
+);
+
+-- Match results between checkpoints, keyed by bracket node
+CREATE TABLE IF NOT EXISTS tournament_matches (
+    tournament_id INT,
+    node INT,
+    winner VARCHAR(50),
+    loser VARCHAR(50),
+    PRIMARY KEY (tournament_id, node)
+);
+
+-- Periodic snapshot of the in-memory house totals
+CREATE TABLE IF NOT EXISTS house_standings (
+    house VARCHAR(20) PRIMARY KEY,
+    members INT,
+    wins INT,
+    xp BIGINT,
+    tournament_points INT,
+    galleons_won DECIMAL(12,2),
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -50,9 +50,16 @@ def deploy():
         print("Setting up environment...")
         env_vars = {
             'MYSQL_ROOT_PASSWORD': os.environ.get('MYSQL_ROOT_PASSWORD', 'changeme'),
+            'MYSQL_DATABASE': os.environ.get('MYSQL_DATABASE', 'wizards_of_x'),
+            'MYSQL_USER': os.environ.get('MYSQL_USER', 'wizards'),
+            'MYSQL_PASSWORD': os.environ.get('MYSQL_PASSWORD', 'changeme'),
             'DISCORD_ERROR_WEBHOOK': os.environ.get('DISCORD_ERROR_WEBHOOK', 'https://discord.com/api/webhooks/error'),
             'DISCORD_INFO_WEBHOOK': os.environ.get('DISCORD_INFO_WEBHOOK', 'https://discord.com/api/webhooks/info'),
-            'DISCORD_ALERT_WEBHOOK': os.environ.get('DISCORD_ALERT_WEBHOOK', 'https://discord.com/api/webhooks/alert')
+            'DISCORD_ALERT_WEBHOOK': os.environ.get('DISCORD_ALERT_WEBHOOK', 'https://discord.com/api/webhooks/alert'),
+            'WIZARDS_ADMINS': os.environ.get('WIZARDS_ADMINS', ''),
+            'BASE_RPC_URL': os.environ.get('BASE_RPC_URL', 'https://mainnet.base.org'),
+            'BANKRBOT_API_URL': os.environ.get('BANKRBOT_API_URL', ''),
+            'BANKRBOT_API_KEY': os.environ.get('BANKRBOT_API_KEY', '')
         }
         
         env_file = "\\n".join([f"export {k}='{v}'" for k, v in env_vars.items()])
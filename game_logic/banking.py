@@ -1,11 +1,36 @@
+import asyncio
+import itertools
+import logging
 import random
 import re
+import threading
 import time
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, Optional, List
+from typing import Callable, Deque, Dict, Optional, List, Sequence, Tuple
+from .burn_scheduler import BurnScheduler
 from .character import Character
+from .dedup import TransactionDedup
+from .ledger import (
+    BURN_ACCOUNT, PRIZE_POOL_ACCOUNT, Ledger, escrow_account, from_minor, player_account, to_minor
+)
+from .settlement import SettlementOutbox, Withdrawal, WithdrawalSender, withdrawal_account
+from .tournament import PRIZE_SHARES
+from .verification import TransactionVerifier
+from utils.timing_wheel import TimingWheel
 from dataclasses import dataclass
 
+logger = logging.getLogger(__name__)
+
+# Every bankrbot message shape from agents/wizard_agent.json, as one
+# alternation so a tweet is classified in a single anchored match.
+_BANKRBOT_RE = re.compile(
+    r'transfer (?P<amount>\d+) Galleons to @WizardsOfX'
+    r'|Transaction confirmed: (?P<tx_hash>0x[a-fA-F0-9]{64})'
+    r'|Transaction failed:(?P<reason>.*)'
+    r'|(?P<status>Insufficient balance|Invalid amount|Transaction pending)'
+)
+
 @dataclass
 class Transaction:
     id: str
@@ -17,35 +42,94 @@ class Transaction:
     confirmed_at: Optional[datetime]
     retries: int = 0
 
+@dataclass(frozen=True)
+class BankrbotMessage:
+    """A classified bankrbot tweet."""
+    type: str  # 'transfer', 'confirmation', 'failure' or 'pending'
+    amount: Optional[int] = None
+    tx_hash: Optional[str] = None
+    reason: Optional[str] = None
+
+def parse_bankrbot_tweet(tweet_text: str) -> Optional[BankrbotMessage]:
+    """Classify a bankrbot tweet in one pass; None if it matches no known pattern."""
+    match = _BANKRBOT_RE.fullmatch(tweet_text.strip())
+    if match is None:
+        return None
+
+    group = match.lastgroup
+    if group == 'amount':
+        return BankrbotMessage('transfer', amount=int(match.group('amount')))
+    if group == 'tx_hash':
+        return BankrbotMessage('confirmation', tx_hash=match.group('tx_hash'))
+    if group == 'reason':
+        return BankrbotMessage('failure', reason=match.group('reason').strip())
+    status = match.group('status')
+    if status == 'Transaction pending':
+        return BankrbotMessage('pending')
+    return BankrbotMessage('failure', reason=status)
+
 class BankingSystem:
     FEE_RATE = 0.04  # 4% total fee
     PRIZE_POOL_RATE = 0.02  # 2% to prize pool
     BURN_RATE = 0.02  # 2% to burn queue
     
-    def __init__(self):
-        self.prize_pool = 0.0
-        self.burn_queue = []  # List of (amount, scheduled_time) tuples
-        self.processed_transactions = {}  # tx_hash -> transaction_details
+    DRIFT_TOLERANCE = 0.005  # Galleons; below a cent is float noise
+    
+    def __init__(self, verifier: TransactionVerifier, db=None,
+                 reconcile_interval: Optional[float] = None, ledger: Optional[Ledger] = None,
+                 sender: Optional[WithdrawalSender] = None, settlement: Optional[SettlementOutbox] = None):
+        # No fallback: a missing verifier must not mean every hash verifies
+        if verifier is None:
+            raise ValueError("BankingSystem needs a TransactionVerifier")
+        self.verifier = verifier
+        self.db = db
+        # Every balance change is recorded here before it is applied in memory
+        self.ledger = ledger or Ledger()
+        self.prize_pool = from_minor(self.ledger.balance(PRIZE_POOL_ACCOUNT))
+        # Withdrawals are paid out in batches by the settlement worker
+        if settlement is None:
+            # No fallback: a missing sender must not mean payouts go to a fake chain
+            if sender is None:
+                raise ValueError("BankingSystem needs a WithdrawalSender")
+            settlement = SettlementOutbox(self.ledger, sender, verifier, db=db)
+        self.settlement = settlement
+        self.burn_queue = BurnScheduler(self._execute_burn, db=db)
+        self.processed_transactions = TransactionDedup(db=db)
+        # Called as listener(player, amount) for every duel or tournament payout
+        self.winnings_listeners: List[Callable[[Character, float], None]] = []
+        
+        # Running tokenomics aggregates, updated on every money movement
+        self.total_deposited = 0.0
+        self.total_withdrawn = 0.0
+        self.total_fees = 0.0
+        self.total_burned = 0.0
+        self.total_prizes_paid = 0.0
+        self.reconcile_interval = reconcile_interval  # seconds; None disables
+        self._last_reconcile = time.monotonic()
+        
+        # Player balances are serialized per player by PlayerExecutor; this
+        # only guards the shared pool, aggregates and transaction records.
+        self._lock = threading.Lock()
         
     def process_deposit(self, tx_hash: str, player: Character, amount: float) -> Dict:
         """Process a deposit from @bankrbot."""
-        if tx_hash in self.processed_transactions:
+        # Claiming is atomic, so concurrent replays of one hash credit once
+        if not self.processed_transactions.claim(tx_hash):
             return {'error': 'Transaction already processed'}
             
-        # Verify transaction on Base scan (placeholder - implement actual verification)
         if not self._verify_transaction(tx_hash):
+            self.processed_transactions.release(tx_hash)
             return {'error': 'Transaction verification failed'}
             
-        # Update player balance
-        player.withdrawable_galleons += amount
-        
-        # Record transaction
-        self.processed_transactions[tx_hash] = {
-            'type': 'deposit',
-            'player': player.twitter_handle,
-            'amount': amount,
-            'timestamp': datetime.now()
-        }
+        # Persist the hash before crediting, so no failure can credit it twice
+        try:
+            self.processed_transactions.record(tx_hash, amount)
+        except Exception:
+            self.processed_transactions.release(tx_hash)
+            return {'error': 'Transaction could not be recorded'}
+        self._credit(player, to_minor(amount), 'deposit', ref=tx_hash)
+        with self._lock:
+            self.total_deposited += amount
         
         return {
             'success': True,
@@ -58,23 +142,41 @@ class BankingSystem:
         if amount > player.withdrawable_galleons:
             return {'error': 'Insufficient balance'}
             
-        # Calculate fees
-        total_fee = amount * self.FEE_RATE
-        prize_pool_fee = amount * self.PRIZE_POOL_RATE
-        burn_fee = amount * self.BURN_RATE
-        net_amount = amount - total_fee
+        # Calculate fees in minor units so the ledger never sees float noise
+        amount_minor = to_minor(amount)
+        prize_pool_minor = round(amount_minor * self.PRIZE_POOL_RATE)
+        burn_minor = round(amount_minor * self.BURN_RATE)
+        total_fee = from_minor(prize_pool_minor + burn_minor)
+        prize_pool_fee = from_minor(prize_pool_minor)
+        burn_fee = from_minor(burn_minor)
         
-        # Update balances
-        player.withdrawable_galleons -= amount
-        self.prize_pool += prize_pool_fee
+        # The debit and the outbox record are one ledger entry
+        net_minor = amount_minor - prize_pool_minor - burn_minor
+        withdrawal_id = self.settlement.next_id()
+        self.ledger.record('withdrawal', [
+            (player_account(player.twitter_handle), -amount_minor),
+            (PRIZE_POOL_ACCOUNT, prize_pool_minor),
+            (BURN_ACCOUNT, burn_minor),
+            (withdrawal_account(withdrawal_id, player.twitter_handle), net_minor)
+        ], ref=str(withdrawal_id))
+        self.settlement.enqueue(Withdrawal(
+            withdrawal_id, player.twitter_handle, net_minor,
+            prize_pool_minor + burn_minor, self.settlement.clock()
+        ))
+        self._adjust_balance(player, -amount_minor)
+        with self._lock:
+            self.prize_pool = from_minor(self.ledger.balance(PRIZE_POOL_ACCOUNT))
+            self.total_withdrawn += from_minor(net_minor)
+            self.total_fees += total_fee
         
         # Schedule burn
         burn_time = datetime.now() + timedelta(hours=random.randint(12, 48))
-        self.burn_queue.append((burn_fee, burn_time))
+        self.burn_queue.schedule(burn_fee, burn_time)
         
         return {
             'success': True,
-            'amount': net_amount,
+            'withdrawal_id': withdrawal_id,
+            'amount': from_minor(net_minor),
             'fee': total_fee,
             'prize_pool_contribution': prize_pool_fee,
             'burn_amount': burn_fee,
@@ -83,42 +185,38 @@ class BankingSystem:
         
     def process_burn_queue(self) -> Dict:
         """Process any pending burns that are due."""
-        current_time = datetime.now()
-        burns_processed = []
-        remaining_burns = []
-        total_burned = 0
-        
-        for amount, scheduled_time in self.burn_queue:
-            if current_time >= scheduled_time:
-                # Execute burn (placeholder - implement actual burn transaction)
-                self._execute_burn(amount)
-                burns_processed.append((amount, scheduled_time))
-                total_burned += amount
-            else:
-                remaining_burns.append((amount, scheduled_time))
-                
-        self.burn_queue = remaining_burns
+        burns_processed = self.burn_queue.process_due()
+        total_burned = sum(amount for amount, _ in burns_processed)
+        if burns_processed:
+            self.ledger.record('burn', [(BURN_ACCOUNT, -to_minor(total_burned))])
+        with self._lock:
+            self.total_burned += total_burned
+        self.maybe_reconcile()
         
         return {
             'burns_processed': burns_processed,
             'total_burned': total_burned,
-            'remaining_burns': len(remaining_burns)
+            'remaining_burns': len(self.burn_queue)
         }
         
     def distribute_tournament_prize(self, winner: Character, tournament_type: str) -> Dict:
         """Distribute prize pool for tournament winners."""
-        if tournament_type == 'daily':
-            prize = max(400, self.prize_pool * 0.10)
-        elif tournament_type == 'weekly':
-            prize = max(200, self.prize_pool * 0.20)
-        else:
+        if tournament_type not in ('daily', 'weekly'):
             return {'error': 'Invalid tournament type'}
             
-        if prize > self.prize_pool:
-            return {'error': 'Insufficient prize pool'}
-            
-        self.prize_pool -= prize
-        winner.withdrawable_galleons += prize
+        with self._lock:
+            prize = self._tournament_prize(tournament_type)
+            if prize > self.prize_pool:
+                return {'error': 'Insufficient prize pool'}
+            prize_minor = to_minor(prize)
+            self.ledger.record('tournament_prize', [
+                (PRIZE_POOL_ACCOUNT, -prize_minor),
+                (player_account(winner.twitter_handle), prize_minor)
+            ], ref=tournament_type)
+            self.prize_pool = from_minor(self.ledger.balance(PRIZE_POOL_ACCOUNT))
+            self.total_prizes_paid += prize
+        self._adjust_balance(winner, prize_minor)
+        self._notify_winnings(winner, prize)
         
         return {
             'success': True,
@@ -127,132 +225,372 @@ class BankingSystem:
             'winner_new_balance': winner.withdrawable_galleons
         }
         
+    def distribute_tournament_prizes(self, placings: Sequence[Character], tournament_type: str,
+                                     shares: Sequence[float] = PRIZE_SHARES) -> Dict:
+        """Split a tournament prize across placings (champion first) in one ledger entry.
+
+        Shares beyond the number of placed players stay in the prize pool.
+        """
+        if tournament_type not in ('daily', 'weekly'):
+            return {'error': 'Invalid tournament type'}
+            
+        with self._lock:
+            prize = self._tournament_prize(tournament_type)
+            if prize > self.prize_pool:
+                return {'error': 'Insufficient prize pool'}
+            prize_minor = to_minor(prize)
+            awards = [(player, round(prize_minor * share)) for player, share in zip(placings, shares)]
+            paid_minor = sum(amount for _, amount in awards)
+            self.ledger.record('tournament_prize', [(PRIZE_POOL_ACCOUNT, -paid_minor)] + [
+                (player_account(player.twitter_handle), amount) for player, amount in awards
+            ], ref=tournament_type)
+            self.prize_pool = from_minor(self.ledger.balance(PRIZE_POOL_ACCOUNT))
+            self.total_prizes_paid += from_minor(paid_minor)
+        for player, amount in awards:
+            self._adjust_balance(player, amount)
+            self._notify_winnings(player, from_minor(amount))
+        
+        return {
+            'success': True,
+            'prize': prize,
+            'payouts': {player.twitter_handle: from_minor(amount) for player, amount in awards},
+            'remaining_pool': self.prize_pool
+        }
+        
+    def _tournament_prize(self, tournament_type: str) -> float:
+        """Max(400G, 10% of pool) daily; Max(200G, 20% of pool) weekly."""
+        if tournament_type == 'daily':
+            return max(400, self.prize_pool * 0.10)
+        return max(200, self.prize_pool * 0.20)
+        
+    def escrow_stakes(self, duel_id: int, player1: Character, player2: Character, stake: float) -> Dict:
+        """Move both players' stakes into the duel's escrow account in one ledger entry."""
+        stake_minor = to_minor(stake)
+        for player in (player1, player2):
+            if stake_minor > to_minor(player.withdrawable_galleons):
+                return {'error': f'@{player.twitter_handle} cannot cover a {stake} Galleon stake'}
+        self.ledger.record('duel_stake', [
+            (player_account(player1.twitter_handle), -stake_minor),
+            (player_account(player2.twitter_handle), -stake_minor),
+            (escrow_account(duel_id), 2 * stake_minor)
+        ], ref=f'duel:{duel_id}')
+        self._adjust_balance(player1, -stake_minor)
+        self._adjust_balance(player2, -stake_minor)
+        return {'success': True, 'escrowed': from_minor(2 * stake_minor)}
+        
+    def pay_duel_winner(self, duel_id: int, winner: Character, stake: float) -> None:
+        """Pay a duel's escrowed stakes to its winner."""
+        pot_minor = 2 * to_minor(stake)
+        self.ledger.record('duel_win', [
+            (escrow_account(duel_id), -pot_minor),
+            (player_account(winner.twitter_handle), pot_minor)
+        ], ref=f'duel:{duel_id}')
+        self._adjust_balance(winner, pot_minor)
+        self._notify_winnings(winner, from_minor(pot_minor))
+        
+    def refund_stakes(self, duel_id: int, player1: Character, player2: Character, stake: float) -> None:
+        """Return each player's stake from the escrow of a cancelled duel."""
+        stake_minor = to_minor(stake)
+        self.ledger.record('duel_refund', [
+            (escrow_account(duel_id), -2 * stake_minor),
+            (player_account(player1.twitter_handle), stake_minor),
+            (player_account(player2.twitter_handle), stake_minor)
+        ], ref=f'duel:{duel_id}')
+        self._adjust_balance(player1, stake_minor)
+        self._adjust_balance(player2, stake_minor)
+
+    def _notify_winnings(self, player: Character, amount: float) -> None:
+        for listener in self.winnings_listeners:
+            try:
+                listener(player, amount)
+            except Exception as e:
+                logger.error(f"Winnings listener failed for {player.twitter_handle}: {e}")
+        
+    def restore_balance(self, player: Character) -> None:
+        """Load a player's withdrawable balance from the ledger, e.g. after a restart."""
+        player.withdrawable_galleons = from_minor(
+            self.ledger.balance(player_account(player.twitter_handle))
+        )
+        
+    def _credit(self, player: Character, amount_minor: int, reason: str, ref: Optional[str] = None) -> None:
+        self.ledger.record(reason, [(player_account(player.twitter_handle), amount_minor)], ref=ref)
+        self._adjust_balance(player, amount_minor)
+        
+    @staticmethod
+    def _adjust_balance(player: Character, delta_minor: int) -> None:
+        """Apply a recorded delta to the Character's float mirror in minor units."""
+        player.withdrawable_galleons = from_minor(to_minor(player.withdrawable_galleons) + delta_minor)
+        
     def get_tokenomics(self) -> Dict:
-        """Get current tokenomics status."""
+        """Get current tokenomics status from the running aggregates."""
         return {
             'prize_pool': self.prize_pool,
-            'pending_burns': sum(amount for amount, _ in self.burn_queue),
-            'total_processed_volume': sum(
-                tx['amount'] for tx in self.processed_transactions.values()
-            )
+            'pending_burns': self.burn_queue.pending_amount,
+            'total_burned': self.total_burned,
+            'total_processed_volume': self.total_deposited,
+            'total_withdrawn': self.total_withdrawn,
+            'total_fees': self.total_fees,
+            'total_prizes_paid': self.total_prizes_paid
+        }
+        
+    def reconcile_tokenomics(self, fix: bool = False) -> Dict:
+        """Recount aggregates from the underlying records and report drift.
+        
+        Returns {metric: {'running': x, 'recounted': y}} for each metric that
+        drifted. With fix=True the running values are reset to the recount.
+        """
+        recounted = {'total_processed_volume': self.processed_transactions.recount_volume()}
+        running = {'total_processed_volume': self.total_deposited}
+        recounted['pending_burns'] = self.burn_queue.recount_pending()
+        running['pending_burns'] = self.burn_queue.pending_amount
+        
+        drift = {
+            metric: {'running': running[metric], 'recounted': recounted[metric]}
+            for metric in recounted
+            if abs(running[metric] - recounted[metric]) > self.DRIFT_TOLERANCE
         }
+        if drift:
+            logger.warning(f"Tokenomics drift detected: {drift}")
+            if fix:
+                with self._lock:
+                    self.total_deposited = recounted['total_processed_volume']
+                self.burn_queue.reset_pending(recounted['pending_burns'])
+        return drift
+        
+    def maybe_reconcile(self) -> Optional[Dict]:
+        """Run reconcile_tokenomics if the reconcile interval has elapsed."""
+        if self.reconcile_interval is None:
+            return None
+        now = time.monotonic()
+        if now - self._last_reconcile < self.reconcile_interval:
+            return None
+        self._last_reconcile = now
+        return self.reconcile_tokenomics()
         
     def _verify_transaction(self, tx_hash: str) -> bool:
         """Verify transaction on Base scan."""
-        # TODO: Implement actual Base scan verification
-        return True
+        return self.verifier.verify_sync(tx_hash)
         
     def _execute_burn(self, amount: float) -> bool:
         """Execute burn transaction."""
         # TODO: Implement actual burn transaction
         return True
 
-class BankrbotHandler:
+class PendingTransactionIndex:
+    """Unmatched transfers, oldest first, by (sender, amount) and by sender.
+
+    A transfer sits in both queues. Matching through one queue leaves a
+    stale reference in the other, which is skipped and dropped the next
+    time that queue is read, so every operation is amortized O(1).
+    """
+
     def __init__(self):
+        self._by_key: Dict[Tuple[str, int], Deque[Transaction]] = {}
+        self._by_sender: Dict[str, Deque[Transaction]] = {}
+
+    @staticmethod
+    def _sender_key(sender: str) -> str:
+        return sender.lstrip('@').lower()
+
+    def add(self, tx: Transaction) -> None:
+        """Index a new transfer awaiting confirmation."""
+        sender = self._sender_key(tx.sender)
+        self._by_key.setdefault((sender, tx.amount), deque()).append(tx)
+        self._by_sender.setdefault(sender, deque()).append(tx)
+
+    def match(self, sender: str, amount: Optional[int] = None) -> Optional[Transaction]:
+        """Pop the oldest unmatched transfer for a sender (and amount, if known)."""
+        sender = self._sender_key(sender)
+        if amount is not None:
+            tx = self._pop(self._by_key, (sender, amount))
+            self._trim(self._by_sender, sender)
+        else:
+            tx = self._pop(self._by_sender, sender)
+            if tx is not None:
+                self._trim(self._by_key, (sender, tx.amount))
+        return tx
+
+    def discard(self, tx: Transaction) -> None:
+        """Drop a transfer that is no longer pending from the queue heads."""
+        sender = self._sender_key(tx.sender)
+        self._trim(self._by_sender, sender)
+        self._trim(self._by_key, (sender, tx.amount))
+
+    @staticmethod
+    def _is_unmatched(tx: Transaction) -> bool:
+        return tx.status == 'pending' and tx.tx_hash is None
+
+    def _pop(self, index: Dict, key) -> Optional[Transaction]:
+        queue = index.get(key)
+        while queue:
+            tx = queue.popleft()
+            if self._is_unmatched(tx):
+                if not queue:
+                    del index[key]
+                return tx
+        index.pop(key, None)
+        return None
+
+    def _trim(self, index: Dict, key) -> None:
+        """Drop already-matched transfers from the head of a queue."""
+        queue = index.get(key)
+        while queue and not self._is_unmatched(queue[0]):
+            queue.popleft()
+        if queue is not None and not queue:
+            del index[key]
+
+class BankrbotHandler:
+    MAX_RETRIES = 3
+    RETRY_DELAY = 5  # seconds
+
+    ARCHIVE_SQL = (
+        "INSERT INTO bankrbot_transactions "
+        "(id, sender, amount, tx_hash, status, created_at, confirmed_at) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s)"
+    )
+
+    def __init__(self, verifier: TransactionVerifier, db=None,
+                 confirmation_timeout: float = 300, retention: float = 300,
+                 clock: Callable[[], float] = time.time):
+        # Share the BankingSystem's verifier so both paths hit one cache
+        if verifier is None:
+            raise ValueError("BankrbotHandler needs a TransactionVerifier")
+        self.verifier = verifier
+        self.db = db
+        self.confirmation_timeout = confirmation_timeout  # safety_rules.confirmation_timeout
+        self.retention = retention  # How long settled transactions stay queryable in memory
+        self.clock = clock
         self.pending_transactions: Dict[str, Transaction] = {}
+        self.unmatched = PendingTransactionIndex()
+        self.expiry = TimingWheel(tick=1.0, start=clock())
         self.last_interaction = datetime.now()
         self.cooldown = 60  # seconds
+        self._tx_sequence = itertools.count(1)
         
     def validate_tweet_pattern(self, tweet_text: str) -> bool:
         """Validate if tweet matches expected bankrbot patterns"""
-        safe_patterns = [
-            r'^transfer \d+ Galleons to @WizardsOfX$',
-            r'^Transaction confirmed: 0x[a-fA-F0-9]{64}$',
-            r'^Transaction failed:.*$'
-        ]
-        return any(re.match(pattern, tweet_text) for pattern in safe_patterns)
+        return parse_bankrbot_tweet(tweet_text) is not None
 
     def extract_transaction_data(self, tweet_text: str) -> Optional[Dict]:
         """Safely extract transaction data from tweet"""
-        try:
-            if 'transfer' in tweet_text.lower():
-                match = re.match(r'transfer (\d+) Galleons to @WizardsOfX', tweet_text)
-                if match:
-                    return {
-                        'type': 'transfer',
-                        'amount': int(match.group(1))
-                    }
-            elif 'confirmed' in tweet_text.lower():
-                match = re.match(r'Transaction confirmed: (0x[a-fA-F0-9]{64})', tweet_text)
-                if match:
-                    return {
-                        'type': 'confirmation',
-                        'tx_hash': match.group(1)
-                    }
-            return None
-        except Exception as e:
-            logger.error(f"Error parsing bankrbot tweet: {e}")
+        message = parse_bankrbot_tweet(tweet_text)
+        if message is None:
             return None
+        data = {'type': message.type}
+        if message.amount is not None:
+            data['amount'] = message.amount
+        if message.tx_hash is not None:
+            data['tx_hash'] = message.tx_hash
+        if message.reason is not None:
+            data['reason'] = message.reason
+        return data
 
-    async def process_bankrbot_tweet(self, tweet_text: str, sender: str) -> Optional[str]:
-        """Process incoming bankrbot tweets with safety checks"""
+    async def process_bankrbot_tweet(self, tweet_text: str, sender: str,
+                                     amount: Optional[int] = None) -> Optional[str]:
+        """Process incoming bankrbot tweets with safety checks
+
+        `sender` is the player the tweet concerns. Confirmations and
+        failures are matched to that player's oldest unmatched transfer, or
+        to the oldest one for `amount` when the amount is known.
+        """
         # Enforce cooldown
         if (datetime.now() - self.last_interaction).total_seconds() < self.cooldown:
             return None
             
-        # Validate tweet pattern
-        if not self.validate_tweet_pattern(tweet_text):
+        # Validate and extract in one pass
+        message = parse_bankrbot_tweet(tweet_text)
+        if message is None:
             logger.warning(f"Invalid tweet pattern from bankrbot: {tweet_text}")
             return None
 
-        # Extract data
-        data = self.extract_transaction_data(tweet_text)
-        if not data:
-            return None
-
         # Handle transfer initiation
-        if data['type'] == 'transfer':
-            tx_id = f"tx_{int(time.time())}"
-            self.pending_transactions[tx_id] = Transaction(
+        if message.type == 'transfer':
+            # The sequence suffix keeps IDs unique within the same second
+            tx_id = f"tx_{int(time.time())}_{next(self._tx_sequence)}"
+            tx = Transaction(
                 id=tx_id,
-                amount=data['amount'],
+                amount=message.amount,
                 sender=sender,
                 tx_hash=None,
                 status='pending',
                 created_at=datetime.now(),
                 confirmed_at=None
             )
+            self.pending_transactions[tx_id] = tx
+            self.unmatched.add(tx)
+            self.expiry.schedule(tx_id, self.clock() + self.confirmation_timeout)
             return tx_id
 
         # Handle confirmation
-        elif data['type'] == 'confirmation':
-            # Find matching pending transaction
-            for tx_id, tx in self.pending_transactions.items():
-                if tx.status == 'pending' and not tx.tx_hash:
-                    tx.tx_hash = data['tx_hash']
-                    tx.status = 'confirming'
-                    # Verify on Base scan
-                    if await self.verify_transaction_on_basescan(tx):
-                        tx.status = 'confirmed'
-                        tx.confirmed_at = datetime.now()
-                        return tx_id
+        elif message.type == 'confirmation':
+            tx = self.unmatched.match(sender, amount)
+            if tx is None:
+                logger.warning(f"Confirmation {message.tx_hash} for {sender} has no pending transfer")
+                return None
+            tx.tx_hash = message.tx_hash
+            tx.status = 'confirming'
+            # Verify on Base scan
+            if await self.verify_transaction_on_basescan(tx):
+                tx.confirmed_at = datetime.now()
+                self._settle(tx, 'confirmed')
+                return tx.id
+            self._settle(tx, 'failed')
+
+        elif message.type == 'failure':
+            logger.warning(f"bankrbot reported failure for {sender}: {message.reason}")
+            tx = self.unmatched.match(sender, amount)
+            if tx is not None:
+                self._settle(tx, 'failed')
+                return tx.id
             
         self.last_interaction = datetime.now()
         return None
 
     async def verify_transaction_on_basescan(self, tx: Transaction) -> bool:
         """Verify transaction on Base scan with retries"""
-        for _ in range(3):  # Max retries
+        while tx.retries < self.MAX_RETRIES:
             try:
-                # Add Base scan verification logic here
-                # For now, we'll simulate verification
-                time.sleep(2)
-                return True
+                return await self.verifier.verify(tx.tx_hash)
             except Exception as e:
                 tx.retries += 1
-                if tx.retries >= 3:
-                    tx.status = 'failed'
-                    return False
-                await asyncio.sleep(5)  # Wait before retry
+                logger.warning(f"Base scan lookup for {tx.id} failed ({tx.retries}/{self.MAX_RETRIES}): {e}")
+                if tx.retries < self.MAX_RETRIES:
+                    await asyncio.sleep(self.RETRY_DELAY)  # Wait before retry
+        tx.status = 'failed'
         return False
 
-    def cleanup_old_transactions(self):
-        """Clean up old pending transactions"""
-        cutoff = datetime.now() - timedelta(hours=1)
-        for tx_id, tx in list(self.pending_transactions.items()):
-            if tx.created_at < cutoff and tx.status in ['pending', 'confirming']:
+    def _settle(self, tx: Transaction, status: str) -> None:
+        """Record a final status and keep the transaction for the retention window."""
+        tx.status = status
+        self.expiry.schedule(tx.id, self.clock() + self.retention)
+
+    def cleanup_old_transactions(self) -> int:
+        """Expire overdue transactions and archive settled ones out of memory.
+
+        Cost is proportional to the transactions whose deadline has passed.
+        Returns the number of transactions removed from memory.
+        """
+        archived = []
+        for tx_id in self.expiry.advance(self.clock()):
+            tx = self.pending_transactions.pop(tx_id, None)
+            if tx is None:
+                continue
+            if tx.status in ['pending', 'confirming']:
                 tx.status = 'expired'
                 logger.warning(f"Transaction {tx_id} expired")
+            self.unmatched.discard(tx)
+            archived.append(tx)
+
+        if archived and self.db is not None:
+            try:
+                self.db.executemany(self.ARCHIVE_SQL, [
+                    (tx.id, tx.sender, tx.amount, tx.tx_hash, tx.status,
+                     tx.created_at, tx.confirmed_at)
+                    for tx in archived
+                ])
+            except Exception as e:
+                logger.error(f"Failed to archive {len(archived)} bankrbot transactions: {e}")
+        return len(archived)
 
     def get_transaction_status(self, tx_id: str) -> Optional[str]:
         """Get current status of a transaction"""
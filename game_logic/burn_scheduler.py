@@ -0,0 +1,135 @@
+import heapq
+import itertools
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class BurnScheduler:
+    """Min-heap of pending burns ordered by scheduled time.
+
+    Only due burns are popped, so processing cost follows the number of
+    burns due rather than the size of the queue. Burns falling in the same
+    `coalesce_window` are executed as one burn. A new burn is written to
+    the `burn_queue` table as soon as it is scheduled, since its fee has
+    already left the player; status changes are written in one batch after
+    each processing run. `load` restores pending burns on startup.
+    """
+
+    INSERT_SQL = "INSERT INTO burn_queue (id, amount, scheduled_time, status) VALUES (%s, %s, %s, %s)"
+    UPDATE_SQL = "UPDATE burn_queue SET status = %s WHERE id = %s"
+    LOAD_SQL = "SELECT id, amount, scheduled_time FROM burn_queue WHERE status = 'pending'"
+
+    def __init__(self, execute: Callable[[float], bool], db=None,
+                 coalesce_window: timedelta = timedelta(minutes=10)):
+        self.execute = execute
+        self.db = db
+        self.coalesce_window = coalesce_window
+        self._heap: List[Tuple[datetime, int, float]] = []  # (scheduled_time, burn_id, amount)
+        self._pending_amount = 0.0
+        self._ids = itertools.count(1)
+        self._inserts: List[Tuple] = []
+        self._updates: List[Tuple] = []
+        self._lock = threading.Lock()
+
+    def load(self) -> int:
+        """Rebuild the heap from pending rows; returns the number loaded."""
+        if self.db is None:
+            return 0
+        rows = self.db.fetchall(self.LOAD_SQL)
+        max_id = self.db.fetchone("SELECT MAX(id) FROM burn_queue")[0] or 0
+        with self._lock:
+            self._heap = [(self._as_datetime(when), burn_id, float(amount)) for burn_id, amount, when in rows]
+            heapq.heapify(self._heap)
+            self._pending_amount = sum(amount for _, _, amount in self._heap)
+            self._ids = itertools.count(max_id + 1)
+        return len(rows)
+
+    def schedule(self, amount: float, scheduled_time: datetime) -> int:
+        """Queue a burn; returns its id."""
+        with self._lock:
+            burn_id = next(self._ids)
+            heapq.heappush(self._heap, (scheduled_time, burn_id, amount))
+            self._pending_amount += amount
+            self._inserts.append((burn_id, amount, scheduled_time, 'pending'))
+        self.flush()
+        return burn_id
+
+    def process_due(self, now: Optional[datetime] = None) -> List[Tuple[float, datetime]]:
+        """Execute every due burn, one execution per coalescing window.
+
+        Returns the (amount, scheduled_time) pairs that were burned. Burns
+        whose execution fails go back on the heap for the next run.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            due = []
+            while self._heap and self._heap[0][0] <= now:
+                due.append(heapq.heappop(self._heap))
+
+        windows: Dict[int, List[Tuple[datetime, int, float]]] = {}
+        window_seconds = self.coalesce_window.total_seconds()
+        for entry in due:
+            windows.setdefault(int(entry[0].timestamp() // window_seconds), []).append(entry)
+
+        burned = []
+        retry = []
+        for entries in windows.values():
+            total = sum(amount for _, _, amount in entries)
+            if self.execute(total):
+                burned.extend(entries)
+            else:
+                logger.error(f"Burn of {total} Galleons failed; {len(entries)} burns will retry")
+                retry.extend(entries)
+
+        with self._lock:
+            for entry in retry:
+                heapq.heappush(self._heap, entry)
+            for _, burn_id, amount in burned:
+                self._pending_amount -= amount
+                self._updates.append(('burned', burn_id))
+        self.flush()
+        return [(amount, when) for when, _, amount in burned]
+
+    def flush(self) -> None:
+        """Write buffered inserts and status changes in one transaction."""
+        with self._lock:
+            inserts, self._inserts = self._inserts, []
+            updates, self._updates = self._updates, []
+        if self.db is None or not (inserts or updates):
+            return
+        try:
+            with self.db.transaction() as cursor:
+                if inserts:
+                    cursor.executemany(self.INSERT_SQL, inserts)
+                if updates:
+                    cursor.executemany(self.UPDATE_SQL, updates)
+        except Exception as e:
+            logger.error(f"Failed to persist burn queue changes: {e}")
+            with self._lock:
+                self._inserts[:0] = inserts
+                self._updates[:0] = updates
+
+    @property
+    def pending_amount(self) -> float:
+        """Total Galleons waiting to be burned."""
+        return self._pending_amount
+
+    def recount_pending(self) -> float:
+        """Full recount of the pending total, for reconciliation."""
+        with self._lock:
+            return sum(amount for _, _, amount in self._heap)
+
+    def reset_pending(self, amount: float) -> None:
+        """Replace the running pending total after a reconciliation."""
+        with self._lock:
+            self._pending_amount = amount
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @staticmethod
+    def _as_datetime(value) -> datetime:
+        return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
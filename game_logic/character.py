@@ -1,8 +1,48 @@
 import random
 import json
-from typing import Dict, List, Optional
+import sys
+from array import array
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+from . import progression
+from .progression import LEVEL_REWARDS, LevelReward
+from .spells import POTIONS, POTIONS_BY_NAME, STARTING_SPELL_IDS, Spell, spellbook, spellbook_for, spells_unlocked_at
+
+# Abilities gained on reaching each level, built once from the catalog
+LEVEL_ABILITIES: Dict[int, Dict] = {
+    level: {'spells': spells_unlocked_at(level), 'max_hp': reward.max_hp, 'potions': reward.potions}
+    for level, reward in LEVEL_REWARDS.items()
+}
+
+# players table columns, by the attribute that backs them
+PLAYER_COLUMNS = {
+    'name': 'name', 'house': 'house', 'level': 'level', 'xp': 'xp', 'hp': 'hp', 'max_hp': 'max_hp',
+    'bonus_galleons': 'bonus_galleons', 'withdrawable_galleons': 'withdrawable_galleons',
+    '_spellbook': 'spells', '_potions': 'potions', 'wins': 'wins', 'losses': 'losses',
+    'titles': 'titles'
+}
+JSON_COLUMNS = frozenset({'spells', 'potions', 'titles'})
+_COLUMN_BITS = {column: 1 << i for i, column in enumerate(PLAYER_COLUMNS.values())}
+_ATTR_BITS = {attr: _COLUMN_BITS[column] for attr, column in PLAYER_COLUMNS.items()}
+_MISSING = object()
+BASE_MAX_HP = 100
 
 class Character:
+    """A player's wizard.
+
+    Uses __slots__ and shares everything immutable: spells come from the
+    catalog as one spellbook per distinct spell set, handles are interned,
+    and potions are a lazily allocated array of counts indexed by potion
+    ID. This keeps 100k+ wizards in memory on the 1GB VM.
+
+    Assignments to persisted attributes set a bit in `_dirty`, so the
+    storage layer can write only the columns that actually changed.
+    """
+    __slots__ = (
+        'twitter_handle', 'name', 'house', 'level', 'xp', 'hp', 'max_hp',
+        'bonus_galleons', 'withdrawable_galleons', '_spellbook', '_potions',
+        'wins', 'losses', 'titles', '_dirty'
+    )
+
     HOUSES = ['Ravenclaw', 'Gryffindor', 'Slytherin', 'Hufflepuff']
     HOUSE_BONUSES = {
         'Ravenclaw': {'accuracy': 10},  # +10% accuracy
@@ -10,52 +50,136 @@ class Character:
         'Slytherin': {'crit_dmg': 1},   # +1 crit damage
         'Hufflepuff': {'hp_regen': 1}   # +1 HP/turn
     }
-    
+
     def __init__(self, twitter_handle: str, name: str):
-        self.twitter_handle = twitter_handle
+        object.__setattr__(self, '_dirty', 0)
+        self.twitter_handle = sys.intern(twitter_handle)
         self.name = name
         self.house = random.choice(self.HOUSES)
         self.level = 1
         self.xp = 0
         self.hp = 100
+        self.max_hp = BASE_MAX_HP  # Before level and house bonuses; level rewards raise it
         self.bonus_galleons = 20.00
         self.withdrawable_galleons = 0.00
-        self.spells = self._get_starting_spells()
-        self.potions = {}
+        self._spellbook = spellbook(STARTING_SPELL_IDS)
+        self._potions: Optional[array] = None  # Allocated on first potion
         self.wins = 0
         self.losses = 0
-        self.titles = []
-        
-    def _get_starting_spells(self) -> Dict:
-        return {
-            'Incendio': {
-                'damage': (3, 6),
-                'accuracy': 110,
-                'effect': {'burn': 20}
-            },
-            'Protego': {
-                'block': True,
-                'heal': 2
-            }
-        }
-        
+        self.titles = ()
+        object.__setattr__(self, '_dirty', 0)  # New wizards are inserted whole
+
+    def __setattr__(self, attr: str, value) -> None:
+        bit = _ATTR_BITS.get(attr)
+        if bit is not None:
+            if getattr(self, attr, _MISSING) is value:
+                return
+            object.__setattr__(self, '_dirty', self._dirty | bit)
+        object.__setattr__(self, attr, value)
+
+    @property
+    def has_changes(self) -> bool:
+        return self._dirty != 0
+
+    @property
+    def dirty_columns(self) -> List[str]:
+        """players columns changed since the last save."""
+        return [column for column, bit in _COLUMN_BITS.items() if self._dirty & bit]
+
+    def take_changes(self) -> Dict[str, object]:
+        """Return changed columns with storage-encoded values and reset tracking."""
+        dirty = self._dirty
+        object.__setattr__(self, '_dirty', 0)
+        if not dirty:
+            return {}
+        row = {}
+        for column, bit in _COLUMN_BITS.items():
+            if dirty & bit:
+                row[column] = self._column_value(column)
+        return row
+
+    def mark_dirty(self, columns: Iterable[str]) -> None:
+        """Flag columns as changed again, e.g. after a failed write."""
+        bits = 0
+        for column in columns:
+            bits |= _COLUMN_BITS[column]
+        object.__setattr__(self, '_dirty', self._dirty | bits)
+
+    def _column_value(self, column: str):
+        # JSON is only encoded for columns that are actually being written
+        if column == 'spells':
+            return json.dumps(list(self._spellbook))
+        if column == 'potions':
+            return json.dumps(self.potions)
+        if column == 'titles':
+            return json.dumps(list(self.titles))
+        return getattr(self, column)
+
+    @property
+    def spells(self) -> Mapping[str, Spell]:
+        """Read-only name -> Spell mapping shared with same-level wizards."""
+        return self._spellbook
+
+    @spells.setter
+    def spells(self, names: Union[Mapping, Iterable[str]]) -> None:
+        self._spellbook = spellbook_for(names)
+
+    @property
+    def potions(self) -> Dict[str, int]:
+        """Potion counts by name."""
+        if self._potions is None:
+            return {}
+        return {POTIONS[i].name: count for i, count in enumerate(self._potions) if count}
+
+    @potions.setter
+    def potions(self, counts: Mapping[str, int]) -> None:
+        self._potions = None
+        for name, count in counts.items():
+            self.add_potion(name, count)
+
+    def add_potion(self, name: str, count: int = 1) -> None:
+        potion = POTIONS_BY_NAME[name]
+        if self._potions is None:
+            self._potions = array('H', bytes(2 * len(POTIONS)))
+        self._potions[potion.id] += count
+        self.mark_dirty(('potions',))
+
+    def use_potion(self, name: str) -> bool:
+        """Consume one potion; False if the wizard has none."""
+        potion = POTIONS_BY_NAME.get(name)
+        if potion is None or self._potions is None or not self._potions[potion.id]:
+            return False
+        self._potions[potion.id] -= 1
+        self.mark_dirty(('potions',))
+        return True
+
+    def _get_starting_spells(self) -> Mapping[str, Spell]:
+        return spellbook(STARTING_SPELL_IDS)
+
     def level_up(self) -> Dict:
         """Level up the character and return new abilities."""
+        self.xp -= progression.XP_PER_LEVEL * self.level
         self.level += 1
-        self.xp = self.xp - (100 * (self.level - 1))
-        new_abilities = self._get_level_abilities(self.level)
-        self.spells.update(new_abilities.get('spells', {}))
-        return new_abilities
-        
+        self.apply_reward(LEVEL_REWARDS.get(self.level, LevelReward()))
+        return self._get_level_abilities(self.level)
+
+    def grant_xp(self, amount: int) -> Dict:
+        """Add XP, resolving any number of level-ups at once."""
+        return progression.grant_xp(self, amount)
+
+    def apply_reward(self, reward: LevelReward) -> None:
+        """Apply the abilities from one or more level-ups."""
+        if reward.spells:
+            self.spells = list(self._spellbook) + list(reward.spells)
+        if reward.max_hp:
+            self.max_hp += reward.max_hp
+        for name in reward.potions:
+            self.add_potion(name)
+
     def _get_level_abilities(self, level: int) -> Dict:
         """Get new abilities for the given level."""
-        abilities = {
-            2: {'spells': {'Flipendo': {'damage': (4, 7), 'accuracy': 100, 'effect': {'stun': 60}}}},
-            3: {'spells': {'Reducto': {'damage': (5, 8), 'accuracy': 95, 'effect': {'armor_break': 30}}}},
-            # Add more spells for other levels
-        }
-        return abilities.get(level, {'spells': {}})
-        
+        return LEVEL_ABILITIES.get(level, {'spells': {}, 'max_hp': 0, 'potions': ()})
+
     def to_dict(self) -> Dict:
         """Convert character to dictionary for database storage."""
         return {
@@ -65,15 +189,16 @@ class Character:
             'level': self.level,
             'xp': self.xp,
             'hp': self.hp,
+            'max_hp': self.max_hp,
             'bonus_galleons': self.bonus_galleons,
             'withdrawable_galleons': self.withdrawable_galleons,
-            'spells': json.dumps(self.spells),
-            'potions': json.dumps(self.potions),
+            'spells': self._column_value('spells'),
+            'potions': self._column_value('potions'),
             'wins': self.wins,
             'losses': self.losses,
-            'titles': json.dumps(self.titles)
+            'titles': self._column_value('titles')
         }
-        
+
     @classmethod
     def from_dict(cls, data: Dict) -> 'Character':
         """Create character from dictionary (database record)."""
@@ -82,11 +207,14 @@ class Character:
         char.level = data['level']
         char.xp = data['xp']
         char.hp = data['hp']
+        char.max_hp = data.get('max_hp', BASE_MAX_HP)
         char.bonus_galleons = float(data['bonus_galleons'])
         char.withdrawable_galleons = float(data['withdrawable_galleons'])
+        # Older rows hold full spell dicts; only the names matter now
         char.spells = json.loads(data['spells'])
         char.potions = json.loads(data['potions'])
         char.wins = data['wins']
         char.losses = data['losses']
-        char.titles = json.loads(data['titles'])
-        return char 
\ No newline at end of file
+        char.titles = tuple(json.loads(data['titles']))
+        object.__setattr__(char, '_dirty', 0)  # Matches the stored row
+        return char
@@ -1,138 +1,323 @@
 import random
-from typing import Dict, Tuple, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from .character import Character
+from .spells import SPELLS, Spell
+
+# Status effects are bit positions; each also has a 4-bit turn counter
+PROTECTED = 1
+EFFECT_NAMES = ('protected',) + tuple(sorted({e for spell in SPELLS for e in spell.effect}))
+EFFECT_BITS = {name: 1 << i for i, name in enumerate(EFFECT_NAMES)}
+EFFECT_TURNS = 2  # Applied effects last 2 turns
+_COUNTER_SHIFT = 4
+
+# (bit index, name, chance) per spell ID, compiled once from the catalog
+_SPELL_EFFECTS: Tuple[Tuple[Tuple[int, str, int], ...], ...] = tuple(
+    tuple((EFFECT_NAMES.index(name), name, chance) for name, chance in spell.effect.items())
+    for spell in SPELLS
+)
+
+_MASK64 = (1 << 64) - 1
+_SEED_MASK = (1 << 63) - 1  # Seeds fit the signed BIGINT seed column
+
+COMBO_SIZE = 3
+_COMBO_MASK = (1 << (8 * COMBO_SIZE)) - 1
+COMBO_BONUSES = (0, 0, 0.10, 0.15)  # By combo length: 10% for 2 spells, 15% for 3
 
 class Combat:
-    def __init__(self, player1: Character, player2: Character, bet_amount: float = 0):
+    """State of one duel.
+
+    Kept compact so 10k+ duels fit in memory: starting HP is computed once,
+    each player's last three spells live in one int used as a byte ring,
+    and status effects are a bitmask plus packed turn counters. The
+    `combo_history` and `effects` dicts are rebuilt on demand for callers
+    and storage.
+
+    Each duel draws from its own seeded splitmix64 generator (one int of
+    state) and logs every cast as a one-byte spell ID, so a duel can be
+    rebuilt exactly from its seed and events with `replay`. Houses and
+    starting HP are fixed when the duel starts, so a replay does not
+    depend on what the players have become since.
+    """
+    __slots__ = (
+        'player1', 'player2', 'bet_amount', 'banking', 'duel_id', 'status', 'hp1', 'hp2',
+        'seed', 'events', 'levels', 'houses', '_rng', '_turn', '_max_hp', '_combo', '_flags', '_counters'
+    )
+
+    def __init__(self, player1: Character, player2: Character, bet_amount: float = 0, banking=None,
+                 seed: Optional[int] = None, duel_id: Optional[int] = None,
+                 houses: Optional[Tuple[str, str]] = None, starting_hp: Optional[Tuple[int, int]] = None):
+        self.seed = (random.getrandbits(63) if seed is None else seed) & _SEED_MASK
+        self._rng = self.seed
+        self.events = bytearray()  # Spell ID per cast; casters alternate from player1
         self.player1 = player1
         self.player2 = player2
         self.bet_amount = bet_amount
-        self.turn = player1.twitter_handle
-        self.hp1 = self._calculate_starting_hp(player1)
-        self.hp2 = self._calculate_starting_hp(player2)
-        self.combo_history = {player1.twitter_handle: [], player2.twitter_handle: []}
+        self.banking = banking  # Pays the escrowed stakes out when set
+        self.duel_id = duel_id  # Names the escrow account holding the stakes
+        self._turn = 0  # Index of the player to move
+        self.levels = (player1.level, player2.level)  # At the start of the duel
+        self.houses = houses or (player1.house, player2.house)
+        self._max_hp = starting_hp or (self._calculate_starting_hp(player1), self._calculate_starting_hp(player2))
+        self.hp1, self.hp2 = self._max_hp
+        self._combo = [0, 0]  # Last spell IDs + 1, one byte each, newest lowest
+        self._flags = [0, 0]  # Active status effect bits
+        self._counters = [0, 0]  # Remaining turns per effect, 4 bits each
         self.status = 'active'
-        self.effects = {player1.twitter_handle: {}, player2.twitter_handle: {}}
-        
+
+    @property
+    def handles(self) -> Tuple[str, str]:
+        """Both participants' handles, for locking two-player operations."""
+        return self.player1.twitter_handle, self.player2.twitter_handle
+
+    @property
+    def turn(self) -> str:
+        """Handle of the player to move."""
+        return (self.player1 if self._turn == 0 else self.player2).twitter_handle
+
+    @property
+    def combo_history(self) -> Dict[str, List[str]]:
+        """Each player's last spells, oldest first."""
+        return {handle: self._combo_names(i) for i, handle in enumerate(self.handles)}
+
+    @property
+    def effects(self) -> Dict[str, Dict]:
+        """Each player's active status effects and their remaining turns."""
+        return {handle: self._effect_dict(i) for i, handle in enumerate(self.handles)}
+
     def _calculate_starting_hp(self, player: Character) -> int:
-        """Calculate starting HP including house bonuses."""
-        base_hp = 100 + ((player.level - 1) * 10)
+        """Calculate starting HP from max HP plus level and house bonuses."""
+        base_hp = player.max_hp + ((player.level - 1) * 10)
         if player.house == 'Gryffindor':
             base_hp += 5
         return base_hp
-        
+
     def cast_spell(self, caster_handle: str, spell_name: str) -> Dict:
         """Process a spell cast and return the results."""
-        if self.turn != caster_handle or self.status != 'active':
+        if self.status != 'active' or self.turn != caster_handle:
             return {'error': 'Not your turn or duel is over'}
-            
-        caster = self.player1 if caster_handle == self.player1.twitter_handle else self.player2
-        target = self.player2 if caster_handle == self.player1.twitter_handle else self.player1
-        
-        if spell_name not in caster.spells:
+
+        side = self._turn
+        caster = self.player1 if side == 0 else self.player2
+
+        spell = caster.spells.get(spell_name)
+        if spell is None:
             return {'error': 'You don\'t know this spell'}
-            
-        spell = caster.spells[spell_name]
-        result = self._process_spell(caster, target, spell_name, spell)
-        
-        # Update combo history
-        self.combo_history[caster_handle].append(spell_name)
-        if len(self.combo_history[caster_handle]) > 3:
-            self.combo_history[caster_handle].pop(0)
-            
-        # Switch turns
-        self.turn = target.twitter_handle
-        
+
+        result = self._apply_cast(side, spell)
+
         # Check for victory
+        if self.status == 'player2_wins':
+            self._handle_duel_end(self.player2, self.player1)
+        elif self.status == 'player1_wins':
+            self._handle_duel_end(self.player1, self.player2)
+
+        return result
+
+    def time_out(self) -> Dict:
+        """End the duel because the player to move ran out of time.
+
+        A player who has cast at least once forfeits and the opponent is
+        paid as for a win. A player who never cast may not have seen the
+        challenge, so the duel is cancelled without rewards and both
+        stakes are refunded instead.
+        """
+        if self.status != 'active':
+            return {'error': 'Duel is already over'}
+        side = self._turn
+        stalled = self.player1 if side == 0 else self.player2
+        if len(self.events) <= side:
+            self.status = 'cancelled'
+            if self.bet_amount > 0 and self.banking is not None:
+                self.banking.refund_stakes(self.duel_id, self.player1, self.player2, self.bet_amount)
+            return {'status': self.status, 'forfeited': None}
+        self.status = 'player2_wins' if side == 0 else 'player1_wins'
+        winner = self.player2 if side == 0 else self.player1
+        self._handle_duel_end(winner, stalled)
+        return {'status': self.status, 'forfeited': stalled.twitter_handle}
+
+    def auto_play(self, max_turns: int = 200) -> Character:
+        """Play the duel out with random spell choices and return the winner.
+
+        Used for bracket matches resolved by the tournament engine, so no
+        duel rewards are paid. Choices come from a generator seeded with
+        the duel's seed, which keeps the cast log replayable. If
+        `max_turns` run out, the higher share of starting HP wins.
+        """
+        chooser = random.Random(self.seed)
+        spellbooks = (tuple(self.player1.spells.values()), tuple(self.player2.spells.values()))
+        while self.status == 'active' and len(self.events) < max_turns:
+            self._apply_cast(self._turn, chooser.choice(spellbooks[self._turn]))
+        if self.status == 'active':
+            lead = self.hp1 * self._max_hp[1] >= self.hp2 * self._max_hp[0]
+            self.status = 'player1_wins' if lead else 'player2_wins'
+        return self.player1 if self.status == 'player1_wins' else self.player2
+
+    @classmethod
+    def replay(cls, player1: Character, player2: Character, seed: int, spells: Iterable[str],
+               bet_amount: float = 0, banking=None, duel_id: Optional[int] = None,
+               levels: Optional[Tuple[int, int]] = None, houses: Optional[Tuple[str, str]] = None,
+               starting_hp: Optional[Tuple[int, int]] = None) -> 'Combat':
+        """Rebuild a duel from its seed and cast log without paying out rewards again.
+
+        `levels`, `houses` and `starting_hp` are the values logged when the
+        duel started; the players' current ones are used when omitted.
+        """
+        combat = cls(player1, player2, bet_amount, banking=banking, seed=seed, duel_id=duel_id,
+                     houses=houses, starting_hp=starting_hp)
+        if levels is not None:
+            combat.levels = levels
+        for spell_name in spells:
+            if combat.status != 'active':
+                raise ValueError('Cast logged after the duel ended')
+            caster = player1 if combat._turn == 0 else player2
+            spell = caster.spells.get(spell_name)
+            if spell is None:
+                raise ValueError(f'{caster.twitter_handle} does not know {spell_name}')
+            combat._apply_cast(combat._turn, spell)
+        return combat
+
+    @property
+    def event_log(self) -> List[Tuple[int, str, str]]:
+        """Casts so far as (turn, caster handle, spell name)."""
+        handles = self.handles
+        return [(turn, handles[turn % 2], SPELLS[spell_id].name) for turn, spell_id in enumerate(self.events)]
+
+    @property
+    def last_event(self) -> Tuple[int, str, str]:
+        """The latest cast as (turn, caster handle, spell name)."""
+        turn = len(self.events) - 1
+        return turn, self.handles[turn % 2], SPELLS[self.events[turn]].name
+
+    def _apply_cast(self, side: int, spell: Spell) -> Dict:
+        """Apply one cast to the duel state; rewards are left to the caller."""
+        self._tick_effects(side)
+        result = self._process_spell(side, spell)
+        self.events.append(spell.id)
+
+        # Update combo history: push the spell ID into the byte ring
+        self._combo[side] = ((self._combo[side] << 8) | (spell.id + 1)) & _COMBO_MASK
+
+        # Switch turns
+        self._turn = 1 - side
+
         if self.hp1 <= 0:
             self.status = 'player2_wins'
-            self._handle_duel_end(self.player2, self.player1)
         elif self.hp2 <= 0:
             self.status = 'player1_wins'
-            self._handle_duel_end(self.player1, self.player2)
-            
         return result
-        
-    def _process_spell(self, caster: Character, target: Character, spell_name: str, spell: Dict) -> Dict:
+
+    def _random(self) -> float:
+        """Next float in [0, 1) from the duel's splitmix64 stream."""
+        self._rng = z = (self._rng + 0x9E3779B97F4A7C15) & _MASK64
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+        return ((z ^ (z >> 31)) >> 11) * (1.0 / (1 << 53))
+
+    def _randint(self, low: int, high: int) -> int:
+        return low + int(self._random() * (high - low + 1))
+
+    def _process_spell(self, side: int, spell: Spell) -> Dict:
         """Process spell effects and calculate damage."""
-        result = {'spell': spell_name, 'effects': []}
-        
+        result = {'spell': spell.name, 'effects': []}
+        other = 1 - side
+
         # Check for Protego
-        if spell.get('block'):
-            self.effects[caster.twitter_handle]['protected'] = True
-            if spell.get('heal'):
-                heal = spell['heal']
-                if caster == self.player1:
-                    self.hp1 = min(self._calculate_starting_hp(caster), self.hp1 + heal)
+        if spell.block:
+            self._flags[side] |= PROTECTED
+            if spell.heal:
+                if side == 0:
+                    self.hp1 = min(self._max_hp[0], self.hp1 + spell.heal)
                 else:
-                    self.hp2 = min(self._calculate_starting_hp(caster), self.hp2 + heal)
-                result['effects'].append(f'Healed {heal} HP')
+                    self.hp2 = min(self._max_hp[1], self.hp2 + spell.heal)
+                result['effects'].append(f'Healed {spell.heal} HP')
             return result
-            
-        # Calculate accuracy
-        base_accuracy = spell.get('accuracy', 100)
-        if caster.house == 'Ravenclaw':
-            base_accuracy += 10
-            
+
+        # Accuracy is not rolled yet, so Ravenclaw's +10 has nothing to modify
+
         # Calculate damage
-        if spell.get('damage'):
-            damage = random.randint(*spell['damage'])
-            
+        if spell.damage:
+            damage = self._randint(*spell.damage)
+
             # Apply combo bonuses
-            combo_bonus = self._calculate_combo_bonus(caster.twitter_handle)
+            combo_bonus = self._calculate_combo_bonus(side)
             if combo_bonus > 0:
                 damage = int(damage * (1 + combo_bonus))
-                
+
             # Apply critical hits for Slytherin
-            if caster.house == 'Slytherin' and random.random() < 0.2:  # 20% crit chance
+            if self.houses[side] == 'Slytherin' and self._random() < 0.2:  # 20% crit chance
                 damage += 1
                 result['effects'].append('Critical Hit!')
-                
+
             # Apply damage
-            if target == self.player1:
-                if not self.effects.get(target.twitter_handle, {}).get('protected'):
+            if self._flags[other] & PROTECTED:
+                result['effects'].append('Attack Blocked!')
+            else:
+                if other == 0:
                     self.hp1 -= damage
-                    result['damage'] = damage
                 else:
-                    result['effects'].append('Attack Blocked!')
-            else:
-                if not self.effects.get(target.twitter_handle, {}).get('protected'):
                     self.hp2 -= damage
-                    result['damage'] = damage
-                else:
-                    result['effects'].append('Attack Blocked!')
-                    
+                result['damage'] = damage
+
         # Apply spell effects
-        if spell.get('effect'):
-            for effect, chance in spell['effect'].items():
-                if random.random() * 100 < chance:
-                    self.effects[target.twitter_handle][effect] = 2  # Effect lasts 2 turns
-                    result['effects'].append(f'Applied {effect}')
-                    
+        for bit, name, chance in _SPELL_EFFECTS[spell.id]:
+            if self._random() * 100 < chance:
+                self._flags[other] |= 1 << bit
+                shift = bit * _COUNTER_SHIFT
+                self._counters[other] = (self._counters[other] & ~(0xF << shift)) | (EFFECT_TURNS << shift)
+                result['effects'].append(f'Applied {name}')
+
         # Clear protection after use
-        self.effects[target.twitter_handle]['protected'] = False
-        
+        self._flags[other] &= ~PROTECTED
+
         return result
-        
-    def _calculate_combo_bonus(self, player_handle: str) -> float:
+
+    def _tick_effects(self, side: int) -> None:
+        """Count down the caster's timed effects at the start of its turn."""
+        flags = self._flags[side] & ~PROTECTED
+        if not flags:
+            return
+        counters = self._counters[side]
+        for bit in range(1, len(EFFECT_NAMES)):
+            if flags & (1 << bit):
+                shift = bit * _COUNTER_SHIFT
+                remaining = ((counters >> shift) & 0xF) - 1
+                counters = (counters & ~(0xF << shift)) | (max(remaining, 0) << shift)
+                if remaining <= 0:
+                    self._flags[side] &= ~(1 << bit)
+        self._counters[side] = counters
+
+    def _calculate_combo_bonus(self, side: int) -> float:
         """Calculate damage bonus from spell combos."""
-        combo_length = len(self.combo_history[player_handle])
-        if combo_length == 2:
-            return 0.10  # 10% bonus for 2-spell combo
-        elif combo_length == 3:
-            return 0.15  # 15% bonus for 3-spell combo
-        return 0
-        
+        return COMBO_BONUSES[(self._combo[side].bit_length() + 7) // 8]
+
+    def _combo_names(self, side: int) -> List[str]:
+        ring, names = self._combo[side], []
+        while ring:
+            names.append(SPELLS[(ring & 0xFF) - 1].name)
+            ring >>= 8
+        return names[::-1]
+
+    def _effect_dict(self, side: int) -> Dict:
+        flags, counters = self._flags[side], self._counters[side]
+        effects = {}
+        if flags & PROTECTED:
+            effects['protected'] = True
+        for bit in range(1, len(EFFECT_NAMES)):
+            if flags & (1 << bit):
+                effects[EFFECT_NAMES[bit]] = (counters >> (bit * _COUNTER_SHIFT)) & 0xF
+        return effects
+
     def _handle_duel_end(self, winner: Character, loser: Character) -> None:
         """Handle end of duel rewards and penalties."""
         winner.wins += 1
-        winner.xp += 20
-        if self.bet_amount > 0:
-            winner.withdrawable_galleons += self.bet_amount * 2
-            
+        winner.grant_xp(20)
+        if self.bet_amount > 0 and self.banking is not None:
+            # Both stakes were escrowed when the duel started
+            self.banking.pay_duel_winner(self.duel_id, winner, self.bet_amount)
+
         loser.losses += 1
-        loser.xp += 10
-        
+        loser.grant_xp(10)
+
     def to_dict(self) -> Dict:
         """Convert duel state to dictionary for database storage."""
         return {
@@ -144,5 +329,6 @@ class Combat:
             'hp1': self.hp1,
             'hp2': self.hp2,
             'combo_history': self.combo_history,
-            'effects': self.effects
-        } 
\ No newline at end of file
+            'effects': self.effects,
+            'seed': self.seed
+        }
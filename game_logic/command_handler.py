@@ -1 +1,649 @@
- 
\ No newline at end of file
+import itertools
+import logging
+import re
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from database.player_store import PlayerStore
+from .banking import BankingSystem
+from .character import Character
+from .combat import Combat
+from .duel_log import DuelJournal
+from .duel_registry import DUEL_TIME_LIMIT, DuelRegistry
+from .executor import PlayerExecutor
+from .house_cup import HouseCup
+from .house_standings import HouseStandings
+from .leaderboard import BOARD_ALIASES, BOARDS, Leaderboard
+from .progression import grant_xp_bulk
+from .tournament import LOSS_XP, MATCH_ID_STRIDE, WIN_XP, Tournament
+from .tournament_log import TournamentJournal
+from utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+# Compiled once at import time; every mention goes through these.
+_BOT_MENTION_RE = re.compile(r'^\s*(?:@wizardsofx\b\s*)+', re.IGNORECASE)
+_PHRASE_RE = re.compile(r'^\s*i\s+want\s+to\s+play\b', re.IGNORECASE)
+_TOKEN_RE = re.compile(
+    r'@(?P<mention>\w{1,50})'
+    r'|(?P<number>\d+(?:\.\d+)?)(?![\w.])'
+    r'|(?P<word>\S+)'
+)
+_NAME_RE = re.compile(r'^\w{3,20}$')
+
+# Short forms from the command guide map onto canonical command names.
+COMMAND_ALIASES = {
+    'd': 'duel',
+    't': 'tournament',
+    'p': 'profile',
+    'b': 'balance',
+    'lb': 'leaderboard',
+}
+
+@dataclass(frozen=True)
+class Command:
+    """A mention parsed into its canonical command and typed arguments."""
+    name: str
+    args: Tuple[str, ...] = ()
+    target: Optional[str] = None   # First @mention, without the '@'
+    amount: Optional[float] = None  # First numeric argument
+    text: str = ''
+
+def parse_args(name: str, args: List[str], text: str = '') -> Command:
+    """Build a Command from a command word and its raw argument tokens."""
+    name = name.lower()
+    name = COMMAND_ALIASES.get(name, name)
+    target = None
+    amount = None
+    for match in _TOKEN_RE.finditer(' '.join(args)):
+        if target is None and match.group('mention'):
+            target = match.group('mention')
+        elif amount is None and match.group('number'):
+            amount = float(match.group('number'))
+    return Command(name, tuple(args), target, amount, text)
+
+def parse_tweet(text: str) -> Optional[Command]:
+    """Parse mention text into a Command in a single pass over the tokens."""
+    body = _BOT_MENTION_RE.sub('', text, count=1)
+    if _PHRASE_RE.match(body):
+        return Command('start', (), text=text)
+
+    tokens = body.split()
+    if not tokens:
+        return None
+    return parse_args(tokens[0], tokens[1:], text)
+
+class CommandHandler:
+    """Routes tweet commands to game logic through a dispatch table."""
+
+    # Canonical command name -> handler method name
+    COMMANDS = {
+        'start': '_handle_start',
+        'help': '_handle_help',
+        'create': '_handle_create',
+        'duel': '_handle_duel',
+        'cast': '_handle_cast',
+        'profile': '_handle_profile',
+        'balance': '_handle_balance',
+        'deposit': '_handle_deposit',
+        'withdraw': '_handle_withdraw',
+        'tokenomics': '_handle_tokenomics',
+        'tournament': '_handle_tournament',
+        'leaderboard': '_handle_leaderboard',
+    }
+
+    # Rate limit class per command (see RateLimiter); anything else is 'general'
+    RATE_CLASSES = {
+        'cast': 'duel',
+        'deposit': 'banking',
+        'withdraw': 'banking',
+        'profile': 'profile',
+        'balance': 'profile',
+    }
+
+    def __init__(self, banking: BankingSystem, executor: Optional[PlayerExecutor] = None,
+                 rate_limiter: Optional[RateLimiter] = None, store: Optional[PlayerStore] = None,
+                 duel_log: Optional[DuelJournal] = None, duel_time_limit: float = DUEL_TIME_LIMIT,
+                 clock: Callable[[], float] = time.time, admins: Iterable[str] = (),
+                 tournament_log: Optional[TournamentJournal] = None,
+                 leaderboard: Optional[Leaderboard] = None,
+                 house_standings: Optional[HouseStandings] = None):
+        self.banking = banking
+        self.store = store  # None keeps players in memory only
+        self.duel_log = duel_log  # None keeps duels in memory only
+        self.tournament_log = tournament_log  # None keeps tournaments in memory only
+        self.leaderboard = Leaderboard() if leaderboard is None else leaderboard  # Empty boards are falsy
+        self.house_standings = house_standings or HouseStandings()
+        self.banking.winnings_listeners.append(self.house_standings.record_winnings)
+        self.banking.settlement.refund_listeners.append(self._withdrawal_refunded)
+        self.executor = executor or PlayerExecutor()
+        self.rate_limiter = RateLimiter() if rate_limiter is None else rate_limiter  # Empty limiters are falsy
+        self.admins = frozenset(admin.lower() for admin in admins)  # May run tournament admin commands
+        self.players: Dict[str, Character] = {}  # lowercased handle -> Character
+        self._load_lock = threading.Lock()  # One Character per wizard read from the store
+        self.duels = DuelRegistry(duel_time_limit, clock)
+        self.active_duels = self.duels.active
+        self.player_duels = self.duels.by_player  # lowercased handle -> duel id
+        self.tournaments: Dict[int, Tournament] = {}
+        self.current_tournament: Optional[Tournament] = None
+        self._tournament_ids = itertools.count(tournament_log.last_id() + 1 if tournament_log is not None else 1)
+        self.house_cup: Optional[HouseCup] = None
+        self._duel_ids = itertools.count(duel_log.last_id() + 1 if duel_log is not None else 1)
+        self._dispatch: Dict[str, Callable[[Command, str], Dict]] = {
+            name: getattr(self, attr) for name, attr in self.COMMANDS.items()
+        }
+
+    def handle_tweet(self, text: str, handle: str) -> Dict:
+        """Parse a raw mention and execute it."""
+        command = parse_tweet(text)
+        if command is None:
+            return {'error': 'Unknown command'}
+        return self.execute(command, handle)
+
+    def handle_command(self, command: str, args: List[str], handle: str) -> Dict:
+        """Execute a command given as a command word and argument list."""
+        return self.execute(parse_args(command, list(args)), handle)
+
+    def execute(self, command: Command, handle: str) -> Dict:
+        """Execute a parsed command and wait for its result."""
+        return self.submit(command, handle).result()
+
+    def submit(self, command: Command, handle: str) -> Future:
+        """Queue a parsed command on the executor of every player it touches."""
+        handler = self._dispatch.get(command.name)
+        if handler is None:
+            return self._resolved({'error': 'Unknown command'})
+
+        # Rejected before any game state or executor work; admins run whole brackets
+        rate_class = self.RATE_CLASSES.get(command.name, 'general')
+        wait = 0 if handle.lower() in self.admins else self.rate_limiter.acquire(handle, rate_class)
+        if wait > 0:
+            return self._resolved({
+                'error': "You're doing that too fast!",
+                'code': 429,
+                'retry_after': round(wait, 1)
+            })
+
+        participants = self._participants(command, handle)
+        return self.executor.submit(participants, self._run, handler, command, handle, participants)
+
+    @staticmethod
+    def _resolved(result: Dict) -> Future:
+        future = Future()
+        future.set_result(result)
+        return future
+
+    def _run(self, handler: Callable[[Command, str], Dict], command: Command,
+             handle: str, participants: Tuple[str, ...]) -> Dict:
+        """Run a handler with its players' shards held."""
+        # The duel may have changed between routing and acquiring the shards
+        if not set(self._participants(command, handle)) <= set(participants):
+            return {'error': 'Duel state changed, please try again'}
+        try:
+            return handler(command, handle)
+        except Exception as e:
+            logger.error(f"Error handling command {command.name} from {handle}: {e}")
+            return {'error': 'Error processing command'}
+        finally:
+            self._mark_changed(participants)
+
+    def _mark_changed(self, participants: Tuple[str, ...]) -> None:
+        """Re-rank participants and queue their unsaved changes for the player store."""
+        for participant in participants:
+            player = self.players.get(participant)
+            if player is None:
+                continue
+            self.leaderboard.update(player)
+            self.house_standings.observe(player)
+            if self.store is not None and player.has_changes:
+                self.store.mark(player)
+
+    def _withdrawal_refunded(self, handle: str, amount_minor: int) -> None:
+        """Settlement listener: reload a refunded wizard's balance on their shard."""
+        key = handle.lower()
+        if key in self.players:
+            self.executor.submit((key,), self._reload_balance, key)
+
+    def _reload_balance(self, key: str) -> None:
+        self.banking.restore_balance(self.players[key])
+        self._mark_changed((key,))
+
+    def _participants(self, command: Command, handle: str) -> Tuple[str, ...]:
+        """Handles whose state a command reads or writes."""
+        if command.name == 'duel' and command.target:
+            return handle.lower(), command.target.lower()
+        if command.name == 'cast':
+            combat = self.active_duels.get(self.player_duels.get(handle.lower()))
+            if combat is not None:
+                return tuple(h.lower() for h in combat.handles)
+        if command.name == 'tournament' and len(command.args) > 1 and command.args[0].lower() == 'process_match':
+            handles = self._match_participants(command.args[1])
+            if handles:
+                return handles
+        return (handle.lower(),)
+
+    def get_player(self, handle: str) -> Optional[Character]:
+        """Look up a registered wizard by Twitter handle, loading it from the store on a miss."""
+        handle = handle.lstrip('@')
+        player = self.players.get(handle.lower())
+        if player is None and self.store is not None:
+            player = self._load_player(handle)
+        return player
+
+    def _load_player(self, handle: str) -> Optional[Character]:
+        """Read a wizard saved before this process started and start tracking it."""
+        key = handle.lower()
+        with self._load_lock:
+            player = self.players.get(key)
+            if player is not None:
+                return player
+            player = self.store.load(handle)
+            if player is None:
+                return None
+            # The ledger, not the saved row, is authoritative for Galleons
+            self.banking.restore_balance(player)
+            self.players[key] = player
+        self.leaderboard.update(player)
+        self.house_standings.observe(player)
+        return player
+
+    def _handle_start(self, command: Command, handle: str) -> Dict:
+        return {
+            'success': True,
+            'registered': self.get_player(handle) is not None,
+            'next_step': 'create [name]'
+        }
+
+    def _handle_help(self, command: Command, handle: str) -> Dict:
+        return {'success': True, 'commands': sorted(self.COMMANDS)}
+
+    def _handle_create(self, command: Command, handle: str) -> Dict:
+        if not command.args or not _NAME_RE.match(command.args[0]):
+            return {'error': 'Invalid name! Use 3-20 alphanumeric characters.'}
+        if self.get_player(handle):
+            return {'error': 'You already have a wizard'}
+
+        player = Character(handle, command.args[0])
+        self.banking.restore_balance(player)
+        if self.store is not None:
+            self.store.insert(player)
+        self.players[handle.lower()] = player
+        logger.info(f"Created wizard {player.name} for {handle} ({player.house})")
+        return {
+            'success': True,
+            'name': player.name,
+            'house': player.house,
+            'level': player.level,
+            'hp': player.hp,
+            'bonus_galleons': player.bonus_galleons,
+            'spells': list(player.spells)
+        }
+
+    def _handle_duel(self, command: Command, handle: str) -> Dict:
+        player = self.get_player(handle)
+        if not player:
+            return {'error': 'Create a wizard first'}
+        if not command.target or not command.amount or command.amount <= 0:
+            return {'error': 'Invalid duel request! Use: d @player amount'}
+
+        opponent = self.get_player(command.target)
+        if not opponent:
+            return {'error': 'Opponent not found'}
+        if opponent is player:
+            return {'error': 'You cannot duel yourself'}
+        if self._current_duel(player) or self._current_duel(opponent):
+            return {'error': 'Already in a duel'}
+
+        duel_id = next(self._duel_ids)
+        escrow = self.banking.escrow_stakes(duel_id, player, opponent, command.amount)
+        if 'error' in escrow:
+            return escrow
+        combat = Combat(player, opponent, command.amount, banking=self.banking, duel_id=duel_id)
+        self.register_duel(duel_id, combat)
+        if self.duel_log is not None:
+            self.duel_log.start(duel_id, combat)
+        return {'success': True, 'duel_id': duel_id, 'duel': combat.to_dict()}
+
+    def _handle_cast(self, command: Command, handle: str) -> Dict:
+        player = self.get_player(handle)
+        if not player:
+            return {'error': 'Create a wizard first'}
+        if not command.args:
+            return {'error': 'No spell specified! Use: cast [spell]'}
+        combat = self._current_duel(player)
+        if not combat:
+            return {'error': 'No active duel'}
+
+        spell_name = self._resolve_spell(player, command.args[0])
+        result = combat.cast_spell(player.twitter_handle, spell_name)
+        if 'error' not in result:
+            duel_id = self.player_duels[player.twitter_handle.lower()]
+            self.duels.touch(duel_id)
+            if self.duel_log is not None:
+                self.duel_log.record_cast(duel_id, combat)
+        if combat.status != 'active':
+            self._end_duel(combat)
+        return result
+
+    def _handle_profile(self, command: Command, handle: str) -> Dict:
+        player = self.get_player(handle)
+        if not player:
+            return {'error': 'Create a wizard first'}
+        return {
+            'success': True,
+            'name': player.name,
+            'house': player.house,
+            'level': player.level,
+            'xp': player.xp,
+            'hp': player.hp,
+            'max_hp': player.max_hp,
+            'bonus_galleons': player.bonus_galleons,
+            'withdrawable_galleons': player.withdrawable_galleons,
+            'spells': list(player.spells),
+            'potions': dict(player.potions),
+            'wins': player.wins,
+            'losses': player.losses
+        }
+
+    def _handle_balance(self, command: Command, handle: str) -> Dict:
+        player = self.get_player(handle)
+        if not player:
+            return {'error': 'Create a wizard first'}
+        return {
+            'success': True,
+            'bonus_galleons': player.bonus_galleons,
+            'withdrawable_galleons': player.withdrawable_galleons,
+            'total': player.bonus_galleons + player.withdrawable_galleons
+        }
+
+    def _handle_deposit(self, command: Command, handle: str) -> Dict:
+        return {
+            'success': True,
+            'instructions': '@bankrbot transfer [amount] Galleons to @WizardsOfX'
+        }
+
+    def _handle_withdraw(self, command: Command, handle: str) -> Dict:
+        player = self.get_player(handle)
+        if not player:
+            return {'error': 'Create a wizard first'}
+        if not command.amount or command.amount <= 0:
+            return {'error': 'Invalid amount! Use: withdraw [amount]'}
+        return self.banking.process_withdrawal(player, command.amount)
+
+    def _handle_tokenomics(self, command: Command, handle: str) -> Dict:
+        return self.banking.get_tokenomics()
+
+    def _handle_leaderboard(self, command: Command, handle: str) -> Dict:
+        board = command.args[0].lower() if command.args else 'wins'
+        board = BOARD_ALIASES.get(board, board)
+        if board in ('h', 'house'):
+            return {'success': True, 'board': 'house', 'houses': self.house_standings.standings()}
+        if board not in BOARDS:
+            return {'error': f"Unknown leaderboard! Use: lb [{'/'.join(BOARDS)}/house]"}
+        return {
+            'success': True,
+            'board': board,
+            'players': len(self.leaderboard),
+            'top': self.leaderboard.top(board),
+            'rank': self.leaderboard.rank(handle, board),
+            'around': self.leaderboard.around(handle, board)
+        }
+
+    def _handle_tournament(self, command: Command, handle: str) -> Dict:
+        action = command.args[0].lower() if command.args else 'status'
+        if action == 'join':
+            player = self.get_player(handle)
+            if not player:
+                return {'error': 'Create a wizard first'}
+            return self._open_tournament().join(player.twitter_handle)
+        if action == 'status':
+            if self.current_tournament is None:
+                return {'error': 'No tournament scheduled'}
+            return {'success': True, **self.current_tournament.status_dict()}
+        if action == 'matches':
+            return self._tournament_matches(command)
+        if action == 'cup' and len(command.args) == 1:
+            cup = self.house_cup.status() if self.house_cup is not None else {'cup': None}
+            return {'success': True, **cup, 'standings': self.house_standings.standings()}
+
+        if handle.lower() not in self.admins:
+            return {'error': 'Unknown tournament command'}
+        if action == 'create':
+            kind = command.args[1].lower() if len(command.args) > 1 else 'daily'
+            tournament = self._create_tournament(kind)
+            return {'success': True, 'tournament_id': tournament.id}
+        if action == 'start':
+            return self._start_tournament(self._open_tournament())
+        if action == 'cup' and command.args[1].lower() == 'start':
+            return self.start_house_cup()
+        if action == 'process_match' and len(command.args) > 1 and command.args[1].isdigit():
+            return self._process_match(int(command.args[1]))
+        return {'error': 'Unknown tournament command'}
+
+    def _create_tournament(self, kind: str = 'daily') -> Tournament:
+        tournament = Tournament(next(self._tournament_ids), kind)
+        self.tournaments[tournament.id] = tournament
+        self.current_tournament = tournament
+        return tournament
+
+    def _open_tournament(self) -> Tournament:
+        """The current tournament, scheduling a daily one once the last has finished."""
+        tournament = self.current_tournament
+        if tournament is None or tournament.status == 'finished':
+            tournament = self._create_tournament()
+        return tournament
+
+    def _tournament_matches(self, command: Command) -> Dict:
+        """Matches of one round of the current tournament."""
+        tournament = self.current_tournament
+        if tournament is None:
+            return {'error': 'No tournament scheduled'}
+        round_num = int(command.amount) if command.amount is not None else tournament.current_round or 0
+        return {'success': True, 'tournament_id': tournament.id, 'round': round_num,
+                'matches': tournament.matches(round_num)}
+
+    def _find_match(self, match_id: int) -> Tuple[Optional[Tournament], Optional[int]]:
+        tournament = self.tournaments.get(match_id // MATCH_ID_STRIDE)
+        if tournament is None:
+            return None, None
+        return tournament, tournament.node_for(match_id)
+
+    def _match_participants(self, match_id: str) -> Tuple[str, ...]:
+        """Handles a match touches: its players, plus every placed player for a final."""
+        if not match_id.isdigit():
+            return ()
+        tournament, node = self._find_match(int(match_id))
+        if node is None:
+            return ()
+        nodes = (1, 2, 3) if node == 1 else (node,)
+        return tuple(sorted({
+            handle.lower() for n in nodes if n < tournament.size
+            for handle in tournament.players(n) if handle is not None
+        }))
+
+    def _process_match(self, match_id: int) -> Dict:
+        """Play a bracket match as an automatic duel and advance the winner."""
+        tournament, node = self._find_match(match_id)
+        if node is None:
+            return {'error': 'Match not found'}
+        handles = tournament.players(node)
+        if None in handles:
+            return {'error': 'Match is not ready'}
+        player1, player2 = (self.get_player(h) for h in handles)
+        if player1 is None or player2 is None:
+            return {'error': 'Player not found'}
+
+        winner = Combat(player1, player2).auto_play()
+        loser = player2 if winner is player1 else player1
+        result = tournament.record(node, winner.twitter_handle)
+        if 'error' in result:
+            return result
+        if self.tournament_log is not None:
+            self.tournament_log.record_match(tournament, node)
+        grant_xp_bulk([(winner, WIN_XP), (loser, LOSS_XP)])
+        if 'placings' in result:
+            self.house_standings.record_placings([self.get_player(h) for h in result['placings']])
+            result['prizes'] = self._pay_prizes(tournament)
+        if result['round_complete'] and self.tournament_log is not None:
+            self.tournament_log.checkpoint(tournament)
+        return result
+
+    def _start_tournament(self, tournament: Tournament) -> Dict:
+        result = tournament.start()
+        if 'error' not in result and self.tournament_log is not None:
+            self.tournament_log.checkpoint(tournament)
+        return result
+
+    def _pay_prizes(self, tournament: Tournament) -> Dict:
+        placed = [self.get_player(handle) for handle in tournament.placings()]
+        result = self.banking.distribute_tournament_prizes(placed, tournament.kind)
+        tournament.prizes_paid = 'error' not in result
+        return result
+
+    def resume_tournament(self, tournament: Tournament) -> Optional[Dict]:
+        """Adopt a recovered tournament, paying its prizes if the crash left them owed.
+
+        Returns the payout result when one was made.
+        """
+        self.tournaments[tournament.id] = tournament
+        if self.current_tournament is None or self.current_tournament.id <= tournament.id:
+            self.current_tournament = tournament
+        if tournament.status != 'finished' or tournament.prizes_paid:
+            return None
+        participants = tuple(sorted(handle.lower() for handle in tournament.placings()))
+        payout = self.executor.run(participants, self._pay_prizes, tournament)
+        self._mark_changed(participants)
+        if self.tournament_log is not None:
+            self.tournament_log.checkpoint(tournament)
+        return payout
+
+    def play_round(self, tournament_id: Optional[int] = None) -> List[Dict]:
+        """Play every ready match of a tournament's current round in parallel.
+
+        Matches run on their players' shards, so one round spreads across
+        the executor's workers. Call this from outside the executor.
+        """
+        tournament = self.tournaments.get(tournament_id) if tournament_id else self.current_tournament
+        if tournament is None:
+            return []
+        if tournament.status == 'registering' and 'error' in self._start_tournament(tournament):
+            return []
+        round_num = tournament.current_round
+        if round_num is None:
+            return []
+        futures = []
+        for match in tournament.matches(round_num):
+            if match['status'] == 'ready':
+                participants = self._match_participants(str(match['id']))
+                futures.append(self.executor.submit(participants, self._run_match, match['id'], participants))
+        return [future.result() for future in futures]
+
+    def start_house_cup(self) -> Dict:
+        """Open a House Cup among every registered wizard."""
+        if self.house_cup is not None and not self.house_cup.finished:
+            return {'error': 'House Cup already running'}
+        self.house_cup = HouseCup(list(self.players.values()))
+        return {'success': True, 'houses': dict(self.house_cup.houses),
+                'matches': self.house_cup.total_matches}
+
+    def play_house_cup(self, batch_size: int = 64) -> List[Dict]:
+        """Play the next batch of House Cup matches in parallel on the player shards.
+
+        Call this from outside the executor, repeatedly until it returns
+        no results.
+        """
+        if self.house_cup is None:
+            return []
+        futures = []
+        for pairing in self.house_cup.next_batch(batch_size):
+            participants = tuple(handle.lower() for handle in pairing)
+            futures.append(self.executor.submit(participants, self._run_cup_match, self.house_cup,
+                                                pairing, participants))
+        return [future.result() for future in futures]
+
+    def _run_cup_match(self, cup: HouseCup, pairing: Tuple[str, str], participants: Tuple[str, ...]) -> Dict:
+        player1, player2 = (self.get_player(handle) for handle in pairing)
+        if player1 is None or player2 is None:
+            return {'error': 'Player not found'}
+        try:
+            winner = Combat(player1, player2).auto_play()
+            loser = player2 if winner is player1 else player1
+            cup.record(winner.twitter_handle, loser.twitter_handle)
+        finally:
+            self._mark_changed(participants)
+        return {'success': True, 'house': winner.house, 'winner': winner.twitter_handle,
+                'loser': loser.twitter_handle}
+
+    def _run_match(self, match_id: int, participants: Tuple[str, ...]) -> Dict:
+        try:
+            return self._process_match(match_id)
+        except Exception as e:
+            logger.error(f"Error processing tournament match {match_id}: {e}")
+            return {'error': 'Error processing match'}
+        finally:
+            self._mark_changed(participants)
+
+    def _current_duel(self, player: Character) -> Optional[Combat]:
+        """Return the player's active duel, dropping stale references."""
+        key = player.twitter_handle.lower()
+        duel_id = self.player_duels.get(key)
+        if duel_id is None:
+            return None
+        combat = self.active_duels.get(duel_id)
+        if combat is None or combat.status != 'active':
+            del self.player_duels[key]
+            return None
+        return combat
+
+    def register_duel(self, duel_id: int, combat: Combat) -> None:
+        """Make a duel active under `duel_id` and start its move clock."""
+        self.duels.add(duel_id, combat)
+
+    def _end_duel(self, combat: Combat) -> None:
+        """Remove a finished duel from the active set."""
+        self.duels.remove(combat)
+
+    def expire_duels(self) -> List[Dict]:
+        """Resolve every duel whose player to move has run out of time.
+
+        Each duel is resolved on its players' shards, so a cast racing the
+        timeout is either applied first or rejected. Returns one result
+        per duel actually timed out.
+        """
+        futures = []
+        for duel_id in self.duels.expired():
+            combat = self.active_duels.get(duel_id)
+            if combat is not None:
+                participants = tuple(h.lower() for h in combat.handles)
+                futures.append(self.executor.submit(participants, self._time_out_duel, duel_id, participants))
+        results = [future.result() for future in futures]
+        return [result for result in results if result is not None]
+
+    def _time_out_duel(self, duel_id: int, participants: Tuple[str, ...]) -> Optional[Dict]:
+        combat = self.active_duels.get(duel_id)
+        # Skip duels that ended or got a cast in before the shards were held
+        if combat is None or not self.duels.is_overdue(duel_id):
+            return None
+        try:
+            result = combat.time_out()
+            if self.duel_log is not None:
+                self.duel_log.finish(duel_id, combat)
+        except Exception as e:
+            logger.error(f"Error timing out duel {duel_id}: {e}")
+            return None
+        finally:
+            self._end_duel(combat)
+            self._mark_changed(participants)
+        logger.info(f"Duel {duel_id} timed out: {result['status']}")
+        return {'duel_id': duel_id, **result}
+
+    @staticmethod
+    def _resolve_spell(player: Character, name: str) -> str:
+        """Match a spell name case-insensitively against the player's spellbook."""
+        lowered = name.lower()
+        for spell_name in player.spells:
+            if spell_name.lower() == lowered:
+                return spell_name
+        return name
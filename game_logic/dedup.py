@@ -0,0 +1,152 @@
+import hashlib
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("Invalid Bloom filter parameters")
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str) -> None:
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+class TransactionDedup:
+    """Exact replay detection for deposit hashes in bounded memory.
+
+    A hash is checked in three tiers. First a hot LRU of recent hashes.
+    Then a Bloom filter over every known hash, which answers most "never
+    seen" cases without I/O. Only a Bloom "maybe" falls through to the
+    processed_transactions table, so the answer stays exact. The filter
+    is seeded from the table on construction; until that succeeds every
+    miss is checked against the table too.
+
+    Without a database there is no exact tier: a Bloom "maybe" counts as
+    seen, which can only reject a fresh hash, never accept a replay. That
+    mode keeps memory bounded and is meant for tests and local runs.
+    """
+
+    LOOKUP_SQL = "SELECT 1 FROM processed_transactions WHERE tx_hash = %s"
+    INSERT_SQL = "INSERT INTO processed_transactions (tx_hash, value, status) VALUES (%s, %s, %s)"
+    LOAD_SQL = "SELECT tx_hash FROM processed_transactions"
+    VOLUME_SQL = "SELECT COALESCE(SUM(value), 0) FROM processed_transactions WHERE status = 'processed'"
+
+    def __init__(self, db=None, hot_size: int = 10_000,
+                 expected_items: int = 1_000_000, error_rate: float = 0.001):
+        self.db = db
+        self.hot_size = hot_size
+        self.bloom = BloomFilter(expected_items, error_rate)
+        self._hot: 'OrderedDict[str, None]' = OrderedDict()
+        self._claimed = set()  # Hashes mid-deposit, not yet recorded
+        self._volume = 0.0  # Recorded amounts, for recount_volume without a database
+        self._loaded = db is None  # Whether the Bloom filter holds every stored hash
+        self.db_lookups = 0
+        self._lock = threading.Lock()
+        if db is not None:
+            try:
+                self.load()
+            except Exception as e:
+                logger.error(f"Failed to seed the deposit filter, checking every hash against the DB: {e}")
+
+    def load(self, tx_hashes: Optional[Iterable[str]] = None) -> int:
+        """Seed the Bloom filter with every known hash (from the DB by default)."""
+        from_db = tx_hashes is None
+        if from_db:
+            if self.db is None:
+                return 0
+            tx_hashes = [row[0] for row in self.db.fetchall(self.LOAD_SQL)]
+        count = 0
+        with self._lock:
+            for tx_hash in tx_hashes:
+                self.bloom.add(tx_hash)
+                count += 1
+            if from_db:
+                self._loaded = True
+        return count
+
+    def claim(self, tx_hash: str) -> bool:
+        """Reserve a hash for processing; False if it was already seen."""
+        with self._lock:
+            if tx_hash in self._claimed or self._seen(tx_hash):
+                return False
+            self._claimed.add(tx_hash)
+            return True
+
+    def release(self, tx_hash: str) -> None:
+        """Give up a claim after a failed deposit so it can be retried."""
+        with self._lock:
+            self._claimed.discard(tx_hash)
+
+    def record(self, tx_hash: str, amount: float) -> None:
+        """Mark a claimed hash as processed, persisting it.
+
+        Raises if the row cannot be written; the hash stays claimed, so
+        the caller decides whether to release it.
+        """
+        if self.db is not None:
+            try:
+                self.db.execute(self.INSERT_SQL, (tx_hash, amount, 'processed'))
+            except Exception as e:
+                logger.error(f"Failed to persist processed transaction {tx_hash}: {e}")
+                raise
+        with self._lock:
+            self._claimed.discard(tx_hash)
+            self.bloom.add(tx_hash)
+            self._volume += amount
+            self._touch(tx_hash)
+
+    def recount_volume(self) -> float:
+        """Total deposited amount from the processed records, for reconciliation."""
+        if self.db is None:
+            with self._lock:
+                return self._volume
+        return float(self.db.fetchone(self.VOLUME_SQL)[0])
+
+    def __contains__(self, tx_hash: str) -> bool:
+        with self._lock:
+            return tx_hash in self._claimed or self._seen(tx_hash)
+
+    def _seen(self, tx_hash: str) -> bool:
+        if tx_hash in self._hot:
+            self._hot.move_to_end(tx_hash)
+            return True
+        if tx_hash not in self.bloom:
+            if self._loaded:
+                return False
+        elif self.db is None:
+            # No exact store: treat the Bloom "maybe" as seen
+            return True
+        # Bloom says maybe, or was never seeded: confirm against the table
+        self.db_lookups += 1
+        found = self.db.fetchone(self.LOOKUP_SQL, (tx_hash,)) is not None
+        if found:
+            self._touch(tx_hash)
+        return found
+
+    def _touch(self, tx_hash: str) -> None:
+        self._hot[tx_hash] = None
+        self._hot.move_to_end(tx_hash)
+        if len(self._hot) > self.hot_size:
+            self._hot.popitem(last=False)
@@ -0,0 +1,70 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .combat import Combat
+
+logger = logging.getLogger(__name__)
+
+class DuelJournal:
+    """Persists duels as a seed plus one small row per cast.
+
+    The active_duels row is written once when a duel starts and once when
+    it ends; in between, each cast is a single duel_events insert instead
+    of a full state snapshot. The row also keeps each player's level,
+    house and HP at the start, so `load` returns everything Combat.replay
+    needs to rebuild the duel exactly even after the players change.
+    """
+
+    START_SQL = (
+        "INSERT INTO active_duels (id, player1, player2, bet_amount, status, turn, hp1, hp2, seed, "
+        "level1, level2, house1, house2, start_hp1, start_hp2) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"
+    )
+    EVENT_SQL = "INSERT INTO duel_events (duel_id, turn, caster, spell) VALUES (%s, %s, %s, %s)"
+    FINISH_SQL = "UPDATE active_duels SET status = %s, turn = %s, hp1 = %s, hp2 = %s WHERE id = %s"
+    HEADER_SQL = (
+        "SELECT player1, player2, bet_amount, status, seed, level1, level2, house1, house2, "
+        "start_hp1, start_hp2 FROM active_duels WHERE id = %s"
+    )
+    EVENTS_SQL = "SELECT turn, caster, spell FROM duel_events WHERE duel_id = %s ORDER BY turn"
+    ACTIVE_SQL = "SELECT id FROM active_duels WHERE status = 'active'"
+
+    def __init__(self, db):
+        self.db = db
+
+    def start(self, duel_id: int, combat: Combat) -> None:
+        self.db.execute(self.START_SQL, (
+            duel_id, combat.player1.twitter_handle, combat.player2.twitter_handle,
+            combat.bet_amount, combat.status, combat.turn, combat.hp1, combat.hp2, combat.seed,
+            *combat.levels, *combat.houses, combat.hp1, combat.hp2
+        ))
+
+    def record_cast(self, duel_id: int, combat: Combat) -> None:
+        """Log the duel's latest cast; closes the duel row if it ended."""
+        self.db.execute(self.EVENT_SQL, (duel_id, *combat.last_event))
+        if combat.status != 'active':
+            self.finish(duel_id, combat)
+
+    def finish(self, duel_id: int, combat: Combat) -> None:
+        self.db.execute(self.FINISH_SQL, (combat.status, combat.turn, combat.hp1, combat.hp2, duel_id))
+
+    def load(self, duel_id: int) -> Optional[Tuple[Dict, List[str]]]:
+        """Header and ordered spell names for a duel, or None if unknown."""
+        header = self.db.fetchone(self.HEADER_SQL, (duel_id,))
+        if header is None:
+            return None
+        player1, player2, bet_amount, status, seed, level1, level2, house1, house2, hp1, hp2 = header
+        events = self.db.fetchall(self.EVENTS_SQL, (duel_id,))
+        for expected, (turn, caster, _) in enumerate(events):
+            if turn != expected or caster != (player1, player2)[turn % 2]:
+                raise ValueError(f'Duel {duel_id} event log is inconsistent at turn {turn}')
+        return ({'player1': player1, 'player2': player2, 'bet_amount': float(bet_amount or 0),
+                 'status': status, 'seed': int(seed), 'levels': (level1, level2),
+                 'houses': (house1, house2), 'starting_hp': (hp1, hp2)},
+                [spell for _, _, spell in events])
+
+    def active_ids(self) -> List[int]:
+        return [row[0] for row in self.db.fetchall(self.ACTIVE_SQL)]
+
+    def last_id(self) -> int:
+        return self.db.fetchone("SELECT MAX(id) FROM active_duels")[0] or 0
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.timing_wheel import TimingWheel
+from .combat import Combat
+
+DUEL_TIME_LIMIT = 300  # seconds; 5-minute limit per duel (GAME_MECHANICS.md)
+
+class DuelRegistry:
+    """Active duels, indexed by id and by player, with a move clock.
+
+    Each duel has one deadline in a TimingWheel: `time_limit` after its
+    last cast (or its start). Registering, casting and ending a duel are
+    O(1), and `expired` only touches duels whose deadline has passed, so
+    thousands of idle duels cost nothing between moves. Everything is
+    dropped when a duel ends, so memory follows the active duel count.
+    Shards register and touch duels while expiry runs on another thread,
+    so every operation holds one lock.
+    """
+
+    def __init__(self, time_limit: float = DUEL_TIME_LIMIT, clock: Callable[[], float] = time.time):
+        self.time_limit = time_limit
+        self.clock = clock
+        self.active: Dict[int, Combat] = {}
+        self.by_player: Dict[str, int] = {}  # lowercased handle -> duel id
+        self.deadlines = TimingWheel(tick=1.0, start=clock())
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def add(self, duel_id: int, combat: Combat) -> None:
+        """Register a duel and start its move clock."""
+        with self._lock:
+            self.active[duel_id] = combat
+            for handle in combat.handles:
+                self.by_player[handle.lower()] = duel_id
+            self.deadlines.schedule(duel_id, self.clock() + self.time_limit)
+
+    def touch(self, duel_id: int) -> None:
+        """Restart a duel's move clock, e.g. after a cast."""
+        with self._lock:
+            self.deadlines.schedule(duel_id, self.clock() + self.time_limit)
+
+    def remove(self, combat: Combat) -> Optional[int]:
+        """Drop a duel and its deadline; returns its id if it was registered."""
+        duel_id = None
+        with self._lock:
+            for handle in combat.handles:
+                duel_id = self.by_player.pop(handle.lower(), duel_id)
+            if duel_id is not None:
+                self.active.pop(duel_id, None)
+                self.deadlines.cancel(duel_id)
+        return duel_id
+
+    def is_overdue(self, duel_id: int) -> bool:
+        """True if the duel is still registered and its clock has run out."""
+        with self._lock:
+            return duel_id in self.active and duel_id not in self.deadlines
+
+    def expired(self) -> List[int]:
+        """Advance the clock and return the ids of duels that ran out of time."""
+        with self._lock:
+            return [duel_id for duel_id in self.deadlines.advance(self.clock()) if duel_id in self.active]
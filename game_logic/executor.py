@@ -0,0 +1,121 @@
+import logging
+import queue
+import threading
+import zlib
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class _Job:
+    """A queued call plus the number of its shards yet to reach it."""
+    __slots__ = ('future', 'func', 'args', 'waiting', 'done')
+
+    def __init__(self, future: Future, func: Callable, args: tuple, shards: int):
+        self.future = future
+        self.func = func
+        self.args = args
+        self.waiting = shards
+        self.done = threading.Event()
+
+class PlayerExecutor:
+    """Runs player commands on per-shard mailboxes.
+
+    Each Twitter handle hashes to one shard. A shard has a FIFO mailbox
+    drained by a single worker thread, so one wizard's commands run in
+    arrival order while other wizards' shards run in parallel.
+
+    Jobs touching several players (duels) take a ticket in the mailbox of
+    every shard involved and run once each of those workers has reached
+    their ticket; the workers that arrive first park until it is done. So
+    a duel for x queued before a withdrawal for x also runs before it, on
+    x's shard as on any other. Multi-shard tickets are enqueued under one
+    lock, so every mailbox sees them in the same order, which rules out
+    deadlock.
+    """
+
+    def __init__(self, shards: int = 8):
+        if shards < 1:
+            raise ValueError("Executor needs at least one shard")
+        self.shards = shards
+        self._mailboxes = [queue.Queue() for _ in range(shards)]
+        self._workers: List[Optional[threading.Thread]] = [None] * shards
+        self._start_lock = threading.Lock()
+        self._ticket_lock = threading.Lock()  # Orders multi-shard tickets across mailboxes
+        self._arrival_lock = threading.Lock()
+        self._closed = False
+
+    def shard_for(self, handle: str) -> int:
+        """Map a Twitter handle to its shard (stable across restarts)."""
+        return zlib.crc32(handle.lower().encode()) % self.shards
+
+    def submit(self, handles: Iterable[str], func: Callable, *args: Any) -> Future:
+        """Queue func(*args) to run with every given player's shard held."""
+        if self._closed:
+            raise RuntimeError("Executor is shut down")
+        shards = sorted({self.shard_for(handle) for handle in handles})
+        if not shards:
+            raise ValueError("A job needs at least one player handle")
+
+        future = Future()
+        job = _Job(future, func, args, len(shards))
+        for shard in shards:
+            self._ensure_worker(shard)
+        if len(shards) == 1:
+            self._mailboxes[shards[0]].put(job)
+        else:
+            with self._ticket_lock:
+                for shard in shards:
+                    self._mailboxes[shard].put(job)
+        return future
+
+    def run(self, handles: Iterable[str], func: Callable, *args: Any) -> Any:
+        """Submit a job and wait for its result."""
+        return self.submit(handles, func, *args).result()
+
+    def shutdown(self) -> None:
+        """Stop all workers once their mailboxes are drained."""
+        self._closed = True
+        with self._start_lock:
+            for index, worker in enumerate(self._workers):
+                if worker is not None:
+                    self._mailboxes[index].put(None)
+        for worker in self._workers:
+            if worker is not None:
+                worker.join()
+
+    def _ensure_worker(self, shard: int) -> None:
+        """Start a shard's worker the first time it receives a job."""
+        if self._workers[shard] is not None:
+            return
+        with self._start_lock:
+            if self._workers[shard] is None:
+                worker = threading.Thread(
+                    target=self._work, args=(shard,),
+                    name=f'player-shard-{shard}', daemon=True
+                )
+                worker.start()
+                self._workers[shard] = worker
+
+    def _work(self, shard: int) -> None:
+        """Drain one mailbox; the last shard to reach a job runs it."""
+        mailbox = self._mailboxes[shard]
+        while True:
+            job = mailbox.get()
+            if job is None:
+                return
+            with self._arrival_lock:
+                job.waiting -= 1
+                last = not job.waiting
+            if not last:
+                # Hold this shard until the job has run on the last one
+                job.done.wait()
+                continue
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    job.future.set_result(job.func(*job.args))
+            except BaseException as e:
+                logger.error(f"Player job failed on shard {shard}: {e}")
+                job.future.set_exception(e)
+            finally:
+                job.done.set()
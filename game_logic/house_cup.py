@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .character import Character
+
+def round_robin(players: Sequence[str]) -> Iterator[List[Tuple[str, str]]]:
+    """Yield the rounds of a single round-robin, one at a time (circle method).
+
+    The first player stays put while the rest rotate one place per round;
+    with an odd count one player sits each round out. Only the current
+    round's pairings exist at any time.
+    """
+    ring: List[Optional[str]] = list(players)
+    if len(ring) % 2:
+        ring.append(None)
+    n = len(ring)
+    for _ in range(n - 1):
+        yield [(ring[i], ring[n - 1 - i]) for i in range(n // 2)
+               if ring[i] is not None and ring[n - 1 - i] is not None]
+        ring.insert(1, ring.pop())
+
+class HouseCup:
+    """The Weekly House Cup: a round-robin among each house's members.
+
+    Pairings are streamed from one circle-method generator per house, so
+    at most one round per house is held in memory, never the O(n^2)
+    schedule. Each result updates per-wizard and per-house aggregates in
+    O(1), and standings are read from those at any point.
+    """
+
+    def __init__(self, players: Iterable[Character]):
+        members: Dict[str, List[str]] = {}
+        for player in players:
+            members.setdefault(player.house, []).append(player.twitter_handle)
+        self.houses = {house: len(handles) for house, handles in members.items()}
+        self.total_matches = sum(n * (n - 1) // 2 for n in self.houses.values())
+        self.played = 0
+        self.records: Dict[str, List[int]] = {  # handle -> [wins, losses]
+            handle: [0, 0] for handles in members.values() for handle in handles
+        }
+        self.house_of = {handle: house for house, handles in members.items() for handle in handles}
+        self.house_played = dict.fromkeys(members, 0)
+        self.leaders: Dict[str, Optional[str]] = dict.fromkeys(members)
+        self._rounds = {house: round_robin(sorted(handles)) for house, handles in members.items()}
+        self._queued: Deque[Tuple[str, str]] = deque()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        return self.played == self.total_matches
+
+    def next_batch(self, size: int) -> List[Tuple[str, str]]:
+        """Take up to `size` unplayed pairings, pulling the next rounds lazily.
+
+        Batches take a whole round from every house before moving on, so
+        matches in one batch rarely share a player.
+        """
+        with self._lock:
+            while len(self._queued) < size and self._rounds:
+                for house, rounds in list(self._rounds.items()):
+                    pairings = next(rounds, None)
+                    if pairings is None:
+                        del self._rounds[house]
+                    else:
+                        self._queued.extend(pairings)
+            return [self._queued.popleft() for _ in range(min(size, len(self._queued)))]
+
+    def record(self, winner: str, loser: str) -> None:
+        """Count one result in the wizard and house aggregates."""
+        with self._lock:
+            won = self.records[winner]
+            won[0] += 1
+            self.records[loser][1] += 1
+            house = self.house_of[winner]
+            self.house_played[house] += 1
+            self.played += 1
+            leader = self.leaders[house]
+            if leader is None or won[0] > self.records[leader][0]:
+                self.leaders[house] = winner
+
+    def standings(self, house: str, limit: int = 10) -> List[Dict]:
+        """A house's wizards by wins."""
+        with self._lock:
+            rows = [(handle, *self.records[handle]) for handle, h in self.house_of.items() if h == house]
+        rows.sort(key=lambda row: (-row[1], row[2], row[0]))
+        return [{'handle': handle, 'wins': wins, 'losses': losses} for handle, wins, losses in rows[:limit]]
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                'played': self.played,
+                'total_matches': self.total_matches,
+                'finished': self.finished,
+                'houses': {
+                    house: {
+                        'members': members,
+                        'played': self.house_played[house],
+                        'matches': members * (members - 1) // 2,
+                        'leader': self.leaders[house],
+                        'leader_wins': self.records[self.leaders[house]][0] if self.leaders[house] else 0
+                    }
+                    for house, members in self.houses.items()
+                }
+            }
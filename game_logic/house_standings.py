@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .character import Character
+from .ledger import from_minor, to_minor
+from .progression import total_xp
+from .tournament import HOUSE_POINTS
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('members', 'wins', 'xp', 'tournament_points', 'galleons_won')
+
+class HouseStandings:
+    """Running per-house totals: members, wins, XP, tournament points and winnings.
+
+    `observe` compares a wizard with the house, wins and cumulative XP it
+    last counted for them and applies only the difference, so every
+    update is O(1) and a house's totals never need a GROUP BY over
+    players. Winnings and tournament points arrive as events. Totals are
+    written to house_standings periodically and restored by `load`.
+    """
+
+    SNAPSHOT_SQL = (
+        "REPLACE INTO house_standings (house, members, wins, xp, tournament_points, galleons_won) "
+        "VALUES (%s, %s, %s, %s, %s, %s)"
+    )
+    PLAYERS_SQL = "SELECT twitter_handle, house, level, xp, wins FROM players"
+    EVENTS_SQL = "SELECT house, tournament_points, galleons_won FROM house_standings"
+
+    def __init__(self, db=None, snapshot_interval: Optional[float] = 60,
+                 clock: Callable[[], float] = time.monotonic):
+        self.db = db
+        self.snapshot_interval = snapshot_interval  # seconds; None disables maybe_snapshot
+        self.clock = clock
+        self.totals: Dict[str, Dict[str, int]] = {house: dict.fromkeys(FIELDS, 0) for house in Character.HOUSES}
+        self._counted: Dict[str, Tuple[str, int, int]] = {}  # handle -> (house, wins, cumulative XP)
+        self._last_snapshot = clock()
+        self._lock = threading.Lock()
+
+    def observe(self, player: Character) -> None:
+        """Fold a wizard's current house, wins and XP into the totals."""
+        handle = player.twitter_handle.lower()
+        counted = (player.house, player.wins, total_xp(player.level, player.xp))
+        with self._lock:
+            previous = self._counted.get(handle)
+            if previous == counted:
+                return
+            if previous is not None:
+                self._add(previous, -1)
+            self._add(counted, 1)
+            self._counted[handle] = counted
+
+    def _add(self, counted: Tuple[str, int, int], sign: int) -> None:
+        house, wins, xp = counted
+        totals = self.totals.setdefault(house, dict.fromkeys(FIELDS, 0))
+        totals['members'] += sign
+        totals['wins'] += sign * wins
+        totals['xp'] += sign * xp
+
+    def record_winnings(self, player: Character, amount: float) -> None:
+        """BankingSystem winnings listener: credit a payout to the wizard's house."""
+        with self._lock:
+            self.totals.setdefault(player.house, dict.fromkeys(FIELDS, 0))['galleons_won'] += to_minor(amount)
+
+    def record_placings(self, placings: Iterable[Character]) -> None:
+        """Award house points for a tournament's placings, champion first."""
+        with self._lock:
+            for player, points in zip(placings, HOUSE_POINTS):
+                self.totals.setdefault(player.house, dict.fromkeys(FIELDS, 0))['tournament_points'] += points
+
+    def standings(self) -> List[Dict]:
+        """Houses by tournament points, then wins."""
+        with self._lock:
+            rows = [{'house': house, **totals} for house, totals in self.totals.items()]
+        for row in rows:
+            row['galleons_won'] = from_minor(row['galleons_won'])
+        rows.sort(key=lambda row: (-row['tournament_points'], -row['wins'], row['house']))
+        return rows
+
+    def snapshot(self) -> bool:
+        """Write every house's totals in one batch."""
+        if self.db is None:
+            return False
+        with self._lock:
+            rows = [(house, t['members'], t['wins'], t['xp'], t['tournament_points'],
+                     from_minor(t['galleons_won'])) for house, t in self.totals.items()]
+        try:
+            self.db.executemany(self.SNAPSHOT_SQL, rows)
+        except Exception as e:
+            logger.error(f"Failed to snapshot house standings: {e}")
+            return False
+        self._last_snapshot = self.clock()
+        return True
+
+    def maybe_snapshot(self) -> bool:
+        """Snapshot if `snapshot_interval` has passed since the last one."""
+        if self.snapshot_interval is None or self.clock() - self._last_snapshot < self.snapshot_interval:
+            return False
+        return self.snapshot()
+
+    def load(self) -> int:
+        """Rebuild member totals from players and event totals from the last snapshot.
+
+        Returns the number of wizards counted.
+        """
+        players = self.db.fetchall(self.PLAYERS_SQL)
+        events = self.db.fetchall(self.EVENTS_SQL)
+        with self._lock:
+            self.totals = {house: dict.fromkeys(FIELDS, 0) for house in Character.HOUSES}
+            self._counted = {}
+            for handle, house, level, xp, wins in players:
+                counted = (house, wins, total_xp(level, xp))
+                self._add(counted, 1)
+                self._counted[handle.lower()] = counted
+            for house, points, galleons in events:
+                totals = self.totals.setdefault(house, dict.fromkeys(FIELDS, 0))
+                totals['tournament_points'] = points
+                totals['galleons_won'] = to_minor(float(galleons))
+        return len(players)
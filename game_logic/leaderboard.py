@@ -0,0 +1,105 @@
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.skiplist import IndexableSkipList
+from .character import Character
+from .ledger import to_minor
+
+# Sort keys ascending = best first; the lowercased handle breaks ties
+BOARDS: Dict[str, Callable[[Character], Tuple]] = {
+    'wins': lambda c: (-c.wins, c.losses, -c.level, -c.xp),
+    'level': lambda c: (-c.level, -c.xp, -c.wins),
+    'galleons': lambda c: (-to_minor(c.withdrawable_galleons), -c.wins),
+}
+
+BOARD_ALIASES = {'w': 'wins', 'a': 'wins', 'l': 'level', 'xp': 'level', 'g': 'galleons'}
+
+class Leaderboard:
+    """Live rankings of wizards by wins, level/XP and Galleons.
+
+    Each board is an IndexableSkipList of sort keys, so updating a
+    wizard, their rank, the top k and the page around them are all
+    O(log n) (plus the page size). `update` is cheap when nothing a board
+    sorts on has changed, so callers can run it after every command that
+    touched a wizard.
+    """
+
+    LOAD_SQL = "SELECT twitter_handle, name, house, level, xp, withdrawable_galleons, wins, losses FROM players"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._boards = {name: IndexableSkipList() for name in BOARDS}
+        self._keys: Dict[str, Dict[str, Tuple]] = {name: {} for name in BOARDS}  # handle -> current key
+        self._players: Dict[str, Character] = {}
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def load(self, db) -> int:
+        """Rebuild every board from the players table; returns the wizard count."""
+        rows = db.fetchall(self.LOAD_SQL)
+        with self._lock:
+            self._reset()
+        for handle, name, house, level, xp, galleons, wins, losses in rows:
+            player = Character(handle, name)
+            player.house, player.level, player.xp = house, level, xp
+            player.withdrawable_galleons = float(galleons)
+            player.wins, player.losses = wins, losses
+            self.update(player)
+        return len(rows)
+
+    def update(self, player: Character) -> None:
+        """Re-rank a wizard on any board whose sort key changed."""
+        handle = player.twitter_handle.lower()
+        with self._lock:
+            self._players[handle] = player
+            for name, key_of in BOARDS.items():
+                key = key_of(player) + (handle,)
+                old = self._keys[name].get(handle)
+                if old == key:
+                    continue
+                board = self._boards[name]
+                if old is not None:
+                    board.remove(old)
+                board.add(key)
+                self._keys[name][handle] = key
+
+    def remove(self, handle: str) -> None:
+        handle = handle.lower()
+        with self._lock:
+            if self._players.pop(handle, None) is None:
+                return
+            for name in BOARDS:
+                self._boards[name].remove(self._keys[name].pop(handle))
+
+    def top(self, board: str = 'wins', k: int = 10) -> List[Dict]:
+        return self.page(board, 0, k)
+
+    def rank(self, handle: str, board: str = 'wins') -> Optional[int]:
+        """1-based rank of a wizard, or None if unranked."""
+        handle = handle.lower()
+        with self._lock:
+            key = self._keys[board].get(handle)
+            return None if key is None else self._boards[board].index(key) + 1
+
+    def around(self, handle: str, board: str = 'wins', radius: int = 2) -> List[Dict]:
+        """The wizards ranked within `radius` places of a wizard."""
+        rank = self.rank(handle, board)
+        if rank is None:
+            return []
+        start = max(rank - 1 - radius, 0)
+        return self.page(board, start, rank + radius)
+
+    def page(self, board: str, start: int, stop: int) -> List[Dict]:
+        """Entries ranked [start, stop), 0-based."""
+        with self._lock:
+            keys = self._boards[board].slice(start, stop)
+            players = [self._players[key[-1]] for key in keys]
+        return [
+            {'rank': start + i + 1, 'handle': p.twitter_handle, 'name': p.name, 'house': p.house,
+             'level': p.level, 'wins': p.wins, 'losses': p.losses, 'galleons': p.withdrawable_galleons}
+            for i, p in enumerate(players)
+        ]
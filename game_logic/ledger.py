@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+GALLEON_SCALE = 100  # Minor units per Galleon
+
+def to_minor(amount: float) -> int:
+    """Convert a Galleon amount to integer minor units."""
+    return round(amount * GALLEON_SCALE)
+
+def from_minor(units: int) -> float:
+    """Convert integer minor units back to Galleons."""
+    return units / GALLEON_SCALE
+
+def player_account(handle: str) -> str:
+    """Ledger account holding a player's withdrawable Galleons."""
+    return f'{PLAYER_PREFIX}{handle.lower()}'
+
+def escrow_account(duel_id: int) -> str:
+    """Ledger account holding both stakes of a duel until it is settled."""
+    return f'escrow:duel:{duel_id}'
+
+PLAYER_PREFIX = 'player:'
+PRIZE_POOL_ACCOUNT = 'prize_pool'
+BURN_ACCOUNT = 'burn_pending'
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    seq: int
+    reason: str
+    postings: Tuple[Tuple[str, int], ...]  # (account, delta in minor units)
+    ref: Optional[str] = None
+
+    def encode(self) -> str:
+        return json.dumps(
+            {'seq': self.seq, 'reason': self.reason, 'ref': self.ref,
+             'postings': [list(posting) for posting in self.postings]},
+            separators=(',', ':')
+        ) + '\n'
+
+    @classmethod
+    def decode(cls, line: str) -> 'LedgerEntry':
+        data = json.loads(line)
+        return cls(data['seq'], data['reason'],
+                   tuple((account, delta) for account, delta in data['postings']),
+                   data.get('ref'))
+
+class Ledger:
+    """Append-only log of every Galleon movement.
+
+    Each entry holds one or more postings that are applied together, so a
+    withdrawal's debit and fee credits can never be split by a crash.
+    Entries are buffered and written by a single writer thread with one
+    fsync per batch: the writer waits up to `commit_window` seconds (or
+    until `max_batch` entries queue up) so concurrent callers share one
+    flush. `record` blocks until its entry is durable. Balances are kept
+    in memory, updated only once an entry is on disk, and rebuilt by
+    replaying the file on open; a failed write drops the unwritten entries
+    so memory never runs ahead of the file. Postings that would take a
+    player account below zero are rejected. Without a path the ledger is
+    memory-only, for tests.
+    """
+
+    def __init__(self, path: Optional[str] = None, commit_window: float = 0.005,
+                 max_batch: int = 1000, fsync: bool = True):
+        self.path = path
+        self.commit_window = commit_window
+        self.max_batch = max_batch
+        self.fsync = fsync
+        self.balances: Dict[str, int] = {}
+        self.batches_written = 0
+        self._seq = 0
+        self._committed = 0
+        self._pending: List[LedgerEntry] = []
+        self._pending_deltas: Dict[str, int] = {}  # account -> sum of queued, unwritten postings
+        self._valid_size = 0  # Bytes of the file holding whole entries
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._file = None
+        self._writer = None
+        if path is not None:
+            self.replay()
+            self._file = open(path, 'ab')
+            # Cut a torn tail so the next batch starts on a fresh line
+            self._file.truncate(self._valid_size)
+            self._writer = threading.Thread(target=self._write_loop, name='ledger-writer', daemon=True)
+            self._writer.start()
+
+    def replay(self) -> int:
+        """Rebuild balances from the log file; returns the number of entries.
+
+        Only the final line may be unreadable: it is a write torn by a crash
+        and was never acknowledged. Damage anywhere else raises ValueError.
+        """
+        self.balances = {}
+        self._seq = 0
+        self._valid_size = 0
+        if self.path is None or not os.path.exists(self.path):
+            return 0
+        count = 0
+        torn = None
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if torn is not None:
+                    raise ValueError(f"Corrupt ledger entry after seq {self._seq} in {self.path}")
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("unterminated entry")
+                    entry = LedgerEntry.decode(line.decode('utf-8'))
+                except (ValueError, KeyError, TypeError) as e:
+                    torn = e
+                    continue
+                self._apply(entry)
+                self._seq = entry.seq
+                self._valid_size += len(line)
+                count += 1
+        if torn is not None:
+            logger.warning(f"Dropping torn ledger tail after seq {self._seq}: {torn}")
+        self._committed = self._seq
+        return count
+
+    def record(self, reason: str, postings: Sequence[Tuple[str, int]],
+               ref: Optional[str] = None, wait: bool = True) -> LedgerEntry:
+        """Append an entry and, once it is durable, apply its postings.
+
+        Blocks until then unless wait=False. Raises ValueError if a posting
+        would overdraw a player account.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Ledger is closed")
+            if self._error is not None:
+                raise self._error
+            self._check_funds(postings)
+            self._seq += 1
+            entry = LedgerEntry(self._seq, reason, tuple(postings), ref)
+            if self._writer is None:
+                self._apply(entry)
+                self._committed = entry.seq
+                return entry
+            self._pending.append(entry)
+            for account, delta in entry.postings:
+                self._pending_deltas[account] = self._pending_deltas.get(account, 0) + delta
+            self._cond.notify_all()
+            if wait:
+                while self._committed < entry.seq and self._error is None:
+                    self._cond.wait()
+                if self._error is not None:
+                    raise self._error
+        return entry
+
+    def balance(self, account: str) -> int:
+        """Durable balance of an account in minor units."""
+        return self.balances.get(account, 0)
+
+    def _check_funds(self, postings: Sequence[Tuple[str, int]]) -> None:
+        """Reject postings that take a player below zero, counting queued entries."""
+        deltas: Dict[str, int] = {}
+        for account, delta in postings:
+            deltas[account] = deltas.get(account, 0) + delta
+        for account, delta in deltas.items():
+            if delta >= 0 or not account.startswith(PLAYER_PREFIX):
+                continue
+            available = self.balances.get(account, 0) + self._pending_deltas.get(account, 0)
+            if available + delta < 0:
+                raise ValueError(f"Posting of {delta} overdraws {account} ({available} available)")
+
+    def flush(self) -> None:
+        """Block until every recorded entry is durable."""
+        with self._cond:
+            target = self._seq
+            self._cond.notify_all()
+            while self._committed < target and self._error is None and self._writer is not None:
+                self._cond.wait()
+
+    def close(self) -> None:
+        """Flush outstanding entries and stop the writer."""
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+            self._file.close()
+
+    def _apply(self, entry: LedgerEntry) -> None:
+        for account, delta in entry.postings:
+            balance = self.balances.get(account, 0) + delta
+            if balance:
+                self.balances[account] = balance
+            else:
+                # Settled accounts (e.g. paid-out withdrawals) take no memory
+                self.balances.pop(account, None)
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Give concurrent callers a moment to join this batch
+                deadline = time.monotonic() + self.commit_window
+                while len(self._pending) < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+            try:
+                self._file.write(''.join(entry.encode() for entry in batch).encode('utf-8'))
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+            except Exception as e:
+                logger.error(f"Ledger write failed: {e}")
+                with self._cond:
+                    # Nothing unwritten was applied, so dropping it keeps memory in step with the file
+                    self._error = e
+                    self._pending = []
+                    self._pending_deltas = {}
+                    self._seq = self._committed
+                    self._cond.notify_all()
+                return
+            with self._cond:
+                for entry in batch:
+                    self._apply(entry)
+                    for account, delta in entry.postings:
+                        remaining = self._pending_deltas.get(account, 0) - delta
+                        if remaining:
+                            self._pending_deltas[account] = remaining
+                        else:
+                            self._pending_deltas.pop(account, None)
+                self._committed = batch[-1].seq
+                self.batches_written += 1
+                self._cond.notify_all()
@@ -0,0 +1,76 @@
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, Mapping, Tuple
+
+from .spells import POTIONS, SPELLS
+
+MAX_LEVEL = 15
+XP_PER_LEVEL = 100  # Reaching level n+1 costs n * 100 XP (GAME_MECHANICS.md)
+
+# Cumulative XP needed to reach each level; LEVEL_XP[n - 1] is level n
+LEVEL_XP: Tuple[int, ...] = tuple(
+    XP_PER_LEVEL * n * (n - 1) // 2 for n in range(1, MAX_LEVEL + 1)
+)
+
+@dataclass(frozen=True)
+class LevelReward:
+    """What a wizard gains on reaching a level."""
+    spells: Tuple[str, ...] = ()
+    max_hp: int = 0
+    potions: Tuple[str, ...] = ()
+
+MAX_HP_BONUSES = {4: 10}
+
+LEVEL_REWARDS: Mapping[int, LevelReward] = {
+    level: LevelReward(
+        spells=tuple(spell.name for spell in SPELLS if spell.level == level),
+        max_hp=MAX_HP_BONUSES.get(level, 0),
+        potions=tuple(potion.name for potion in POTIONS if potion.level == level)
+    )
+    for level in range(2, MAX_LEVEL + 1)
+}
+
+def level_for_xp(total_xp: int) -> int:
+    """Level reached with `total_xp` cumulative XP."""
+    return min(bisect_right(LEVEL_XP, total_xp), MAX_LEVEL)
+
+def total_xp(level: int, xp: int) -> int:
+    """Cumulative XP for a wizard at `level` with `xp` progress into it."""
+    return LEVEL_XP[level - 1] + xp
+
+def rewards_between(old_level: int, new_level: int) -> LevelReward:
+    """Combined rewards for every level in (old_level, new_level]."""
+    spells, potions, max_hp = [], [], 0
+    for level in range(old_level + 1, new_level + 1):
+        reward = LEVEL_REWARDS[level]
+        spells.extend(reward.spells)
+        potions.extend(reward.potions)
+        max_hp += reward.max_hp
+    return LevelReward(tuple(spells), max_hp, tuple(potions))
+
+def grant_xp(character, amount: int) -> Dict:
+    """Add XP to a wizard and apply every level-up it earns in one step."""
+    old_level = character.level
+    cumulative = total_xp(old_level, character.xp) + amount
+    new_level = max(old_level, level_for_xp(cumulative))
+    character.level = new_level
+    character.xp = cumulative - LEVEL_XP[new_level - 1]
+    result = {'xp_gained': amount, 'level': new_level, 'levels_gained': new_level - old_level}
+    if new_level > old_level:
+        reward = rewards_between(old_level, new_level)
+        character.apply_reward(reward)
+        result.update(new_spells=list(reward.spells), max_hp_bonus=reward.max_hp,
+                      potions_unlocked=list(reward.potions))
+    return result
+
+def grant_xp_bulk(awards: Iterable[Tuple[object, int]]) -> Dict[str, Dict]:
+    """Grant XP to many wizards at once, e.g. a whole tournament bracket.
+
+    Awards for the same wizard are summed first, so each wizard resolves
+    its level-ups once. Returns results by handle.
+    """
+    totals: Dict[str, list] = {}
+    for character, amount in awards:
+        entry = totals.setdefault(character.twitter_handle, [character, 0])
+        entry[1] += amount
+    return {handle: grant_xp(character, amount) for handle, (character, amount) in totals.items()}
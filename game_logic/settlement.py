@@ -0,0 +1,303 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional
+
+from .ledger import Ledger, from_minor, player_account
+from .verification import FakeChainBackend, TransactionVerifier
+
+logger = logging.getLogger(__name__)
+
+WITHDRAWAL_PREFIX = 'withdrawal:'
+SENT_PREFIX = 'withdrawal_sent:'
+
+def withdrawal_account(withdrawal_id: int, handle: str) -> str:
+    """Ledger account holding a withdrawal's net amount until it is sent."""
+    return f'{WITHDRAWAL_PREFIX}{withdrawal_id}:{handle.lower()}'
+
+def sent_account(withdrawal_id: int, handle: str) -> str:
+    """Ledger account holding a withdrawal handed to the sender until it settles."""
+    return f'{SENT_PREFIX}{withdrawal_id}:{handle.lower()}'
+
+@dataclass
+class Withdrawal:
+    id: int
+    handle: str
+    amount: int  # Net payout, minor units
+    fee: int  # Minor units
+    created: float
+    status: str = 'pending'  # 'sending' once the intent to send is in the ledger
+    tx_hash: Optional[str] = None
+
+    @property
+    def idempotency_key(self) -> str:
+        return f'wizardsofx-withdrawal-{self.id}'
+
+class WithdrawalSender:
+    """Pays out a batch of withdrawals on chain.
+
+    A withdrawal may be sent again after a crash or a failed batch, so a
+    sender must pay each `idempotency_key` at most once and answer a
+    repeated key with the original transaction hash.
+    """
+
+    async def send_batch(self, withdrawals: List[Withdrawal]) -> Dict[int, str]:
+        """Submit the payouts; returns withdrawal id -> transaction hash."""
+        raise NotImplementedError
+
+class BankrbotWithdrawalSender(WithdrawalSender):
+    """Pays withdrawals out through the bankrbot transfer API.
+
+    A batch is one request listing every payout under its idempotency key;
+    the API pays a key at most once and returns the original hash for a
+    repeated key, so a retried batch never pays twice.
+    """
+
+    def __init__(self, api_url: str, api_key: str, timeout: float = 30.0):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout
+
+    async def send_batch(self, withdrawals: List[Withdrawal]) -> Dict[int, str]:
+        import aiohttp
+
+        payload = {'transfers': [
+            {'idempotency_key': w.idempotency_key, 'to': w.handle, 'amount': from_minor(w.amount)}
+            for w in withdrawals
+        ]}
+        headers = {'Authorization': f'Bearer {self.api_key}'}
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(self.api_url, json=payload, headers=headers) as response:
+                response.raise_for_status()
+                paid = {t['idempotency_key']: t['tx_hash'] for t in (await response.json())['transfers']}
+
+        # A payout missing from the reply fails the batch, which is then retried
+        return {w.id: paid[w.idempotency_key] for w in withdrawals}
+
+class FakeWithdrawalSender(WithdrawalSender):
+    """Local sender for tests.
+
+    Each batch gets fake hashes that are registered on `chain` (when
+    given) with zero confirmations, so mining the fake chain confirms them.
+    """
+
+    def __init__(self, chain: Optional[FakeChainBackend] = None):
+        self.chain = chain
+        self.batches: List[List[int]] = []
+        self.paid: Dict[str, str] = {}  # idempotency key -> transaction hash
+
+    async def send_batch(self, withdrawals: List[Withdrawal]) -> Dict[int, str]:
+        self.batches.append([w.id for w in withdrawals])
+        hashes = {}
+        for withdrawal in withdrawals:
+            tx_hash = self.paid.get(withdrawal.idempotency_key)
+            if tx_hash is None:
+                tx_hash = '0x%064x' % (len(self.batches) << 32 | withdrawal.id)
+                self.paid[withdrawal.idempotency_key] = tx_hash
+                if self.chain is not None:
+                    self.chain.add_transaction(tx_hash, confirmations=0)
+            hashes[withdrawal.id] = tx_hash
+        return hashes
+
+class SettlementOutbox:
+    """Outbox of withdrawals waiting to be paid out on chain.
+
+    The debit and the outbox record are one ledger entry: the net amount
+    moves from the player's account into a per-withdrawal account, so a
+    request can never be lost between the two, and open requests are
+    recovered from the ledger on restart. Pending requests are dispatched
+    in batches once `batch_size` have queued or the oldest has waited
+    `max_delay` seconds.
+
+    Before a batch goes to the sender its amounts move into per-withdrawal
+    "sent" accounts, so the intent to pay is durable. A withdrawal found
+    in a sent account without a known hash after a restart is sent again
+    under the same idempotency key, which the sender pays at most once.
+    Sent batches are confirmed in bulk through the verifier; a payout
+    that reverts is refunded to the player. The withdrawal_requests table
+    is written one batch at a time.
+    """
+
+    INSERT_SQL = (
+        "INSERT INTO withdrawal_requests (id, twitter_handle, amount, fee, tx_hash, status) "
+        "VALUES (%s, %s, %s, %s, %s, %s)"
+    )
+    CONFIRM_SQL = "UPDATE withdrawal_requests SET status = %s, completed_at = %s WHERE id = %s"
+    SENT_SQL = "SELECT id, tx_hash FROM withdrawal_requests WHERE status = 'sent'"
+
+    def __init__(self, ledger: Ledger, sender: WithdrawalSender, verifier: TransactionVerifier, db=None,
+                 batch_size: int = 50, max_delay: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ledger = ledger
+        self.sender = sender
+        if verifier is None:
+            raise ValueError("SettlementOutbox needs a TransactionVerifier")
+        self.verifier = verifier
+        self.db = db
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.clock = clock
+        self.pending: Deque[Withdrawal] = deque()
+        self.sent: Dict[int, Withdrawal] = {}
+        # Called as listener(handle, amount in minor units) when a reverted payout is refunded
+        self.refund_listeners: List[Callable[[str, int], None]] = []
+        self._ids = itertools.count(1)
+
+    @property
+    def backlog(self) -> int:
+        """Withdrawals not yet confirmed on chain."""
+        return len(self.pending) + len(self.sent)
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def enqueue(self, withdrawal: Withdrawal) -> None:
+        """Queue a withdrawal whose debit has been recorded in the ledger."""
+        self.pending.append(withdrawal)
+
+    def recover(self) -> int:
+        """Requeue every open withdrawal found in the ledger; returns the count.
+
+        Requests already sent keep their transaction hash (from the
+        withdrawal_requests table) and wait for confirmation. Requests
+        whose send may or may not have happened are queued to be sent
+        again under their idempotency key, so they are never paid twice.
+        """
+        now = self.clock()
+        sent_hashes = {}
+        max_id = 0
+        if self.db is not None:
+            sent_hashes = dict(self.db.fetchall(self.SENT_SQL))
+            max_id = self.db.fetchone("SELECT MAX(id) FROM withdrawal_requests")[0] or 0
+        recovered = []
+        for account, balance in self.ledger.balances.items():
+            for prefix, status in ((WITHDRAWAL_PREFIX, 'pending'), (SENT_PREFIX, 'sending')):
+                if account.startswith(prefix) and balance > 0:
+                    withdrawal_id, handle = account[len(prefix):].split(':', 1)
+                    recovered.append(Withdrawal(int(withdrawal_id), handle, balance, 0, now, status))
+        recovered.sort(key=lambda w: w.id)
+        for withdrawal in recovered:
+            tx_hash = sent_hashes.get(withdrawal.id)
+            if withdrawal.status == 'sending' and tx_hash:
+                withdrawal.status, withdrawal.tx_hash = 'sent', tx_hash
+                self.sent[withdrawal.id] = withdrawal
+            else:
+                self.pending.append(withdrawal)
+            max_id = max(max_id, withdrawal.id)
+        self._ids = itertools.count(max_id + 1)
+        return len(recovered)
+
+    def due(self) -> bool:
+        """True when a batch is full or its oldest request has waited long enough."""
+        if not self.pending:
+            return False
+        return (len(self.pending) >= self.batch_size
+                or self.clock() - self.pending[0].created >= self.max_delay)
+
+    async def dispatch(self, force: bool = False) -> int:
+        """Send the next batch of pending withdrawals; returns how many were sent."""
+        if not (force and self.pending) and not self.due():
+            return 0
+        batch = [self.pending.popleft() for _ in range(min(self.batch_size, len(self.pending)))]
+
+        # Make the intent to send durable first; retries keep their earlier intent
+        fresh = [w for w in batch if w.status == 'pending']
+        if fresh:
+            postings = []
+            for w in fresh:
+                postings += [(withdrawal_account(w.id, w.handle), -w.amount),
+                             (sent_account(w.id, w.handle), w.amount)]
+            try:
+                await self._record('withdrawal_sending', postings, ref=','.join(str(w.id) for w in fresh))
+            except Exception as e:
+                logger.error(f"Failed to record the send of {len(fresh)} withdrawals: {e}")
+                self.pending.extendleft(reversed(batch))
+                return 0
+            for withdrawal in fresh:
+                withdrawal.status = 'sending'
+
+        try:
+            hashes = await self.sender.send_batch(batch)
+        except Exception as e:
+            logger.error(f"Withdrawal batch of {len(batch)} failed to send: {e}")
+            self.pending.extendleft(reversed(batch))
+            return 0
+
+        rows = []
+        for withdrawal in batch:
+            withdrawal.tx_hash = hashes[withdrawal.id]
+            withdrawal.status = 'sent'
+            self.sent[withdrawal.id] = withdrawal
+            rows.append((withdrawal.id, withdrawal.handle, from_minor(withdrawal.amount),
+                         from_minor(withdrawal.fee), withdrawal.tx_hash, 'sent'))
+        self._write(self.INSERT_SQL, rows)
+        return len(batch)
+
+    async def confirm(self) -> int:
+        """Check every sent withdrawal in bulk, settle the confirmed ones and refund reverts.
+
+        Returns the number confirmed.
+        """
+        if not self.sent:
+            return 0
+        verified = await self.verifier.check_many(w.tx_hash for w in self.sent.values())
+        confirmed = [w for w in self.sent.values() if verified.get(w.tx_hash)]
+        reverted = [w for w in self.sent.values() if w.tx_hash in verified and verified[w.tx_hash] is None]
+        now = datetime.now()
+
+        if confirmed:
+            # One ledger entry closes every confirmed withdrawal account
+            postings = [(sent_account(w.id, w.handle), -w.amount) for w in confirmed]
+            await self._record('withdrawal_settled', postings, ref=','.join(str(w.id) for w in confirmed))
+            for withdrawal in confirmed:
+                withdrawal.status = 'confirmed'
+                del self.sent[withdrawal.id]
+            self._write(self.CONFIRM_SQL, [('confirmed', now, w.id) for w in confirmed])
+
+        if reverted:
+            postings = []
+            for w in reverted:
+                postings += [(sent_account(w.id, w.handle), -w.amount), (player_account(w.handle), w.amount)]
+            await self._record('withdrawal_reverted', postings, ref=','.join(str(w.id) for w in reverted))
+            for withdrawal in reverted:
+                withdrawal.status = 'reverted'
+                del self.sent[withdrawal.id]
+                logger.warning(f"Withdrawal {withdrawal.id} reverted on chain; refunded {withdrawal.handle}")
+                for listener in self.refund_listeners:
+                    try:
+                        listener(withdrawal.handle, withdrawal.amount)
+                    except Exception as e:
+                        logger.error(f"Refund listener failed for {withdrawal.handle}: {e}")
+            self._write(self.CONFIRM_SQL, [('reverted', now, w.id) for w in reverted])
+        return len(confirmed)
+
+    async def run_once(self) -> Dict:
+        """One settlement pass: send every due batch, then confirm."""
+        sent = 0
+        while self.due():
+            dispatched = await self.dispatch()
+            if not dispatched:
+                break
+            sent += dispatched
+        confirmed = await self.confirm()
+        return {'sent': sent, 'confirmed': confirmed, 'backlog': self.backlog}
+
+    async def _record(self, reason: str, postings: List[tuple], ref: str) -> None:
+        """Record a ledger entry with the group-commit wait off the event loop."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.ledger.record(reason, postings, ref=ref)
+        )
+
+    def _write(self, sql: str, rows: List[tuple]) -> None:
+        if self.db is None or not rows:
+            return
+        try:
+            self.db.executemany(sql, rows)
+        except Exception as e:
+            # The ledger is authoritative; the table is for reporting
+            logger.error(f"Failed to persist {len(rows)} withdrawal rows: {e}")
@@ -0,0 +1,196 @@
+"""Vectorized Monte Carlo duel simulator for balance testing.
+
+Requires numpy (`pip install -e .[sim]`); the game itself does not import
+this module.
+"""
+import itertools
+import random
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .character import BASE_MAX_HP, Character
+from .combat import Combat
+from .progression import rewards_between
+from .spells import SPELLS
+
+HOUSES = Character.HOUSES
+SLYTHERIN = HOUSES.index('Slytherin')
+GRYFFINDOR = HOUSES.index('Gryffindor')
+MAX_LEVEL = 15
+
+# Rule tables mirroring game_logic/combat.py
+COMBO_BONUS = np.array([0.0, 0.0, 0.10, 0.15])  # By combo history length
+CRIT_CHANCE = 0.2
+CRIT_DAMAGE = 1
+GRYFFINDOR_HP = 5
+
+_ATTACKS = [spell for spell in SPELLS if spell.damage]
+_BLOCK = next(spell for spell in SPELLS if spell.block)
+_DAMAGE_LO = np.array([spell.damage[0] for spell in _ATTACKS])
+_DAMAGE_SPAN = np.array([spell.damage[1] - spell.damage[0] + 1 for spell in _ATTACKS])
+EFFECTS = sorted({effect for spell in _ATTACKS for effect in spell.effect})
+_EFFECT_CHANCE = np.array([[spell.effect.get(effect, 0) for spell in _ATTACKS] for effect in EFFECTS])
+
+# Attack spells known at each level: _KNOWN[level, i] for i < _KNOWN_COUNT[level]
+_KNOWN = np.zeros((MAX_LEVEL + 1, len(_ATTACKS)), dtype=np.int64)
+_KNOWN_COUNT = np.zeros(MAX_LEVEL + 1, dtype=np.int64)
+for _level in range(1, MAX_LEVEL + 1):
+    _ids = [i for i, spell in enumerate(_ATTACKS) if spell.level <= _level]
+    _KNOWN[_level, :len(_ids)] = _ids
+    _KNOWN_COUNT[_level] = len(_ids)
+
+# Max HP of a wizard who has collected every level reward up to each level
+_MAX_HP = np.array([BASE_MAX_HP] + [BASE_MAX_HP + rewards_between(1, level).max_hp
+                                    for level in range(1, MAX_LEVEL + 1)])
+
+def starting_hp(house: np.ndarray, level: np.ndarray) -> np.ndarray:
+    """Vectorized Combat._calculate_starting_hp."""
+    return _MAX_HP[level] + (level - 1) * 10 + np.where(house == GRYFFINDOR, GRYFFINDOR_HP, 0)
+
+@dataclass
+class SimulationResult:
+    winner: np.ndarray  # 1 or 2 per duel; 0 if max_turns ran out
+    turns: np.ndarray  # Casts until the duel ended
+    effects: Dict[str, int]  # Status effects applied, by name
+
+    @property
+    def p1_win_rate(self) -> float:
+        return float(np.mean(self.winner == 1))
+
+    @property
+    def draw_rate(self) -> float:
+        return float(np.mean(self.winner == 0))
+
+    def turn_histogram(self) -> np.ndarray:
+        """Number of duels ending after each turn count."""
+        return np.bincount(self.turns)
+
+    def summary(self) -> Dict:
+        return {
+            'duels': len(self.winner),
+            'p1_win_rate': self.p1_win_rate,
+            'p2_win_rate': float(np.mean(self.winner == 2)),
+            'draw_rate': self.draw_rate,
+            'mean_turns': float(np.mean(self.turns)),
+            'turn_percentiles': dict(zip((50, 90, 99), np.percentile(self.turns, (50, 90, 99)).tolist()))
+        }
+
+class DuelSimulator:
+    """Steps many duels in lockstep with the rules of Combat.
+
+    Each caster uses Protego with probability `protego_rate` and otherwise
+    an attack chosen uniformly from the spells its level knows. Like
+    Combat, accuracy is not rolled and status effects other than Protego's
+    block are only counted, not applied.
+    """
+
+    def __init__(self, protego_rate: float = 0.2, max_turns: int = 200, seed: Optional[int] = None):
+        self.protego_rate = protego_rate
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+
+    def run(self, house1, level1, house2, level2, n: int = 1) -> SimulationResult:
+        """Simulate duels between sides given as house indexes and levels.
+
+        Arguments may be scalars or equal-length arrays; scalars are
+        repeated for `n` duels.
+        """
+        shape = np.broadcast_shapes(*(np.shape(a) for a in (house1, level1, house2, level2)), (n,))
+        house = np.stack([np.broadcast_to(house1, shape), np.broadcast_to(house2, shape)]).astype(np.int64)
+        level = np.stack([np.broadcast_to(level1, shape), np.broadcast_to(level2, shape)]).astype(np.int64)
+        duels = shape[0]
+        rng = self.rng
+
+        start = starting_hp(house, level)
+        hp = start.copy()
+        protected = np.zeros((2, duels), dtype=bool)
+        combo = np.zeros((2, duels), dtype=np.int64)
+        winner = np.zeros(duels, dtype=np.int8)
+        turns = np.full(duels, self.max_turns, dtype=np.int64)
+        effects = np.zeros(len(EFFECTS), dtype=np.int64)
+        active = np.arange(duels)
+
+        for turn in range(self.max_turns):
+            if not len(active):
+                break
+            c, o = turn % 2, 1 - turn % 2
+            count = len(active)
+            block = rng.random(count) < self.protego_rate
+
+            # Attacks: spell choice, damage roll, combo bonus, Slytherin crit
+            lvl = level[c, active]
+            spell = _KNOWN[lvl, (rng.random(count) * _KNOWN_COUNT[lvl]).astype(np.int64)]
+            damage = _DAMAGE_LO[spell] + (rng.random(count) * _DAMAGE_SPAN[spell]).astype(np.int64)
+            bonus = COMBO_BONUS[combo[c, active]]
+            damage = np.where(bonus > 0, (damage * (1 + bonus)).astype(np.int64), damage)
+            damage += ((house[c, active] == SLYTHERIN) & (rng.random(count) < CRIT_CHANCE)) * CRIT_DAMAGE
+            attack = ~block
+            hits = attack & ~protected[o, active]
+            hp[o, active] -= np.where(hits, damage, 0)
+            rolls = rng.random((len(EFFECTS), count)) * 100 < _EFFECT_CHANCE[:, spell]
+            effects += (rolls & attack).sum(axis=1)
+            protected[o, active[attack]] = False
+
+            # Protego: shield the caster and heal up to starting HP
+            shielded = active[block]
+            protected[c, shielded] = True
+            hp[c, shielded] = np.minimum(start[c, shielded], hp[c, shielded] + _BLOCK.heal)
+
+            combo[c, active] = np.minimum(combo[c, active] + 1, 3)
+            p2_wins = hp[0, active] <= 0
+            p1_wins = ~p2_wins & (hp[1, active] <= 0)
+            winner[active[p2_wins]] = 2
+            winner[active[p1_wins]] = 1
+            done = p1_wins | p2_wins
+            turns[active[done]] = turn + 1
+            active = active[~done]
+
+        return SimulationResult(winner, turns, dict(zip(EFFECTS, effects.tolist())))
+
+    def matchup_table(self, houses: Sequence[str] = HOUSES, levels: Iterable[int] = (1,),
+                      n: int = 10_000) -> Dict[Tuple[str, int, str, int], Dict]:
+        """Run n duels for every (house, level) pairing in one vectorized batch."""
+        sides = [(h, l) for h in houses for l in levels]
+        matchups = list(itertools.product(sides, sides))
+        house1 = np.repeat([HOUSES.index(a[0]) for a, _ in matchups], n)
+        level1 = np.repeat([a[1] for a, _ in matchups], n)
+        house2 = np.repeat([HOUSES.index(b[0]) for _, b in matchups], n)
+        level2 = np.repeat([b[1] for _, b in matchups], n)
+        result = self.run(house1, level1, house2, level2)
+
+        table = {}
+        for i, ((h1, l1), (h2, l2)) in enumerate(matchups):
+            part = slice(i * n, (i + 1) * n)
+            table[(h1, l1, h2, l2)] = SimulationResult(result.winner[part], result.turns[part], {}).summary()
+        return table
+
+def play_scalar_duel(house1: str, level1: int, house2: str, level2: int,
+                     protego_rate: float = 0.2, max_turns: int = 200) -> Tuple[int, int]:
+    """Play one duel through Combat with the simulator's policy.
+
+    Returns (winner, turns) like SimulationResult; used to check the
+    simulator against the real rules. Draws from the global random module.
+    """
+    players = []
+    for i, (house, level) in enumerate(((house1, level1), (house2, level2))):
+        player = Character(f'sim{i + 1}', f'Sim{i + 1}')
+        player.house = house
+        player.level = level
+        player.max_hp = int(_MAX_HP[level])
+        player.spells = [spell.name for spell in SPELLS if spell.level <= level]
+        players.append(player)
+    combat = Combat(*players)
+    attacks = [[name for name, spell in p.spells.items() if spell.get('damage')] for p in players]
+
+    for turn in range(max_turns):
+        caster = turn % 2
+        if random.random() < protego_rate:
+            spell = _BLOCK.name
+        else:
+            spell = random.choice(attacks[caster])
+        combat.cast_spell(players[caster].twitter_handle, spell)
+        if combat.status != 'active':
+            return (1 if combat.status == 'player1_wins' else 2), turn + 1
+    return 0, max_turns
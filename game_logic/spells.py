@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+_EMPTY: Mapping[str, int] = MappingProxyType({})
+
+@dataclass(frozen=True)
+class Spell:
+    """Immutable spell definition, shared by every wizard that knows it.
+
+    Supports the read-only dict access (`spell['damage']`,
+    `spell.get('effect')`) that combat code used on the old per-character
+    spell dicts.
+    """
+    id: int
+    name: str
+    level: int
+    damage: Optional[Tuple[int, int]] = None
+    accuracy: int = 100
+    effect: Mapping[str, int] = field(default_factory=lambda: _EMPTY)
+    block: bool = False
+    heal: int = 0
+
+    def __getitem__(self, key: str) -> Any:
+        value = getattr(self, key, None) if key in _SPELL_KEYS else None
+        if not value:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        return key in _SPELL_KEYS and bool(getattr(self, key))
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+_SPELL_KEYS = frozenset({'damage', 'accuracy', 'effect', 'block', 'heal'})
+
+@dataclass(frozen=True)
+class Potion:
+    """Immutable potion definition."""
+    id: int
+    name: str
+    level: int
+    cost: int
+    effect: str
+    value: int
+    duration: int = 0  # Turns; 0 = instant
+
+def _spell(id: int, name: str, level: int, effect: Optional[Dict[str, int]] = None, **stats) -> Spell:
+    return Spell(id, name, level, effect=MappingProxyType(effect or {}), **stats)
+
+SPELLS: Tuple[Spell, ...] = (
+    _spell(0, 'Incendio', 1, damage=(3, 6), accuracy=110, effect={'burn': 20}),
+    _spell(1, 'Protego', 1, block=True, heal=2),
+    _spell(2, 'Flipendo', 2, damage=(4, 7), accuracy=100, effect={'stun': 60}),
+    _spell(3, 'Reducto', 3, damage=(5, 8), accuracy=95, effect={'armor_break': 30}),
+)
+
+POTIONS: Tuple[Potion, ...] = (
+    Potion(0, 'Healing Potion', 1, cost=30, effect='heal', value=20),
+    Potion(1, 'Strength Potion', 3, cost=40, effect='damage', value=20, duration=3),
+    Potion(2, 'Focus Potion', 5, cost=35, effect='accuracy', value=15, duration=3),
+)
+
+SPELLS_BY_NAME: Mapping[str, Spell] = MappingProxyType({spell.name: spell for spell in SPELLS})
+POTIONS_BY_NAME: Mapping[str, Potion] = MappingProxyType({potion.name: potion for potion in POTIONS})
+
+STARTING_SPELL_IDS: Tuple[int, ...] = tuple(spell.id for spell in SPELLS if spell.level == 1)
+
+@lru_cache(maxsize=None)
+def spellbook(spell_ids: Tuple[int, ...]) -> Mapping[str, Spell]:
+    """Shared read-only name -> Spell mapping for a set of spell IDs.
+
+    Wizards at the same level know the same spells, so a handful of
+    spellbooks serve every character.
+    """
+    return MappingProxyType({SPELLS[spell_id].name: SPELLS[spell_id] for spell_id in sorted(spell_ids)})
+
+def spellbook_for(names: Iterable[str]) -> Mapping[str, Spell]:
+    """Spellbook for spell names, ignoring names missing from the catalog."""
+    return spellbook(tuple(sorted({SPELLS_BY_NAME[name].id for name in names if name in SPELLS_BY_NAME})))
+
+def spells_unlocked_at(level: int) -> Mapping[str, Spell]:
+    """Spells that become available on reaching `level`."""
+    return spellbook(tuple(spell.id for spell in SPELLS if spell.level == level))
@@ -0,0 +1,221 @@
+import random
+import threading
+from typing import Dict, List, Optional, Tuple
+
+MIN_PLAYERS = 8
+MAX_PLAYERS = 128
+MATCH_ID_STRIDE = 2 * MAX_PLAYERS  # Match ids are tournament_id * stride + bracket node
+PRIZE_SHARES = (0.50, 0.30, 0.10, 0.10)  # 1st, 2nd, 3rd-4th (GAME_MECHANICS.md)
+HOUSE_POINTS = (4, 2, 1, 1)  # House points for the same placings
+WIN_XP = 50  # Per tournament match (COMMAND_GUIDE.md)
+LOSS_XP = 10
+
+class Tournament:
+    """A single-elimination bracket stored as an implicit binary tree.
+
+    Node 1 is the final and node i is the match between the winners of
+    nodes 2i and 2i + 1; the leaves `size`..`2 * size - 1` hold the
+    seeded players. Round r is nodes [size >> (r + 1), size >> r).
+    Recording a result writes the winner into its node, so the players of
+    the next match are read straight from the tree.
+
+    Seed slots are preallocated and handed out from a pre-shuffled list,
+    so joining is O(1) and the seeding is random.
+    """
+
+    def __init__(self, tournament_id: int, kind: str = 'daily', capacity: int = MAX_PLAYERS,
+                 min_players: int = MIN_PLAYERS, rng: Optional[random.Random] = None):
+        if not 2 <= capacity <= MAX_PLAYERS:
+            raise ValueError(f"Tournament capacity must be between 2 and {MAX_PLAYERS}")
+        self.id = tournament_id
+        self.kind = kind
+        self.capacity = capacity
+        self.min_players = min(min_players, capacity)
+        self.status = 'registering'
+        self.seeds: List[Optional[str]] = [None] * capacity
+        self.entrants: Dict[str, int] = {}  # lowercased handle -> seed slot
+        self._free_slots = list(range(capacity))
+        (rng or random).shuffle(self._free_slots)
+        self.size = 0
+        self.rounds = 0
+        self.tree: List[Optional[str]] = []
+        self.results: Dict[int, Tuple[str, str]] = {}  # node -> (winner, loser) for played matches
+        self.prizes_paid = False
+        self._pending: List[int] = []  # Unplayed matches per round
+        self._lock = threading.Lock()
+
+    def join(self, handle: str) -> Dict:
+        """Take a random free seed slot."""
+        key = handle.lower()
+        with self._lock:
+            if self.status != 'registering':
+                return {'error': 'Registration is closed'}
+            if key in self.entrants:
+                return {'error': 'Already registered'}
+            if not self._free_slots:
+                return {'error': 'Tournament is full'}
+            slot = self._free_slots.pop()
+            self.seeds[slot] = handle
+            self.entrants[key] = slot
+            return {'success': True, 'tournament_id': self.id, 'players': len(self.entrants)}
+
+    def start(self) -> Dict:
+        """Close registration and lay out the bracket, advancing byes."""
+        with self._lock:
+            if self.status != 'registering':
+                return {'error': 'Tournament already started'}
+            if len(self.entrants) < self.min_players:
+                return {'error': f'Need at least {self.min_players} players'}
+            players = [handle for handle in self.seeds if handle is not None]
+            size = 1 << (len(players) - 1).bit_length()
+            # Even leaves fill first, so every first-round match has a player
+            positions = list(range(0, size, 2)) + list(range(1, size, 2))
+            leaves: List[Optional[str]] = [None] * size
+            for position, handle in zip(positions, players):
+                leaves[position] = handle
+            self._layout(leaves)
+            return {'success': True, 'tournament_id': self.id, 'players': len(players),
+                    'rounds': self.rounds}
+
+    def _layout(self, leaves: List[Optional[str]]) -> None:
+        """Build the bracket over its leaves and advance byes."""
+        self.size = size = len(leaves)
+        self.rounds = size.bit_length() - 1
+        self.tree = [None] * size + list(leaves)
+        self._pending = [size >> (r + 1) for r in range(self.rounds)]
+        for node in range(size // 2, size):
+            if self.tree[2 * node + 1] is None:
+                self.tree[node] = self.tree[2 * node]
+                self._pending[0] -= 1
+        self.status = 'running'
+
+    @property
+    def current_round(self) -> Optional[int]:
+        """First round with matches left to play, or None if not running."""
+        if self.status != 'running':
+            return None
+        return self.completed_rounds
+
+    def match_id(self, node: int) -> int:
+        return self.id * MATCH_ID_STRIDE + node
+
+    def node_for(self, match_id: int) -> Optional[int]:
+        """Bracket node of one of this tournament's match ids, if valid."""
+        tournament_id, node = divmod(match_id, MATCH_ID_STRIDE)
+        if tournament_id != self.id or not 1 <= node < self.size:
+            return None
+        return node
+
+    def round_of(self, node: int) -> int:
+        return self.rounds - node.bit_length()
+
+    def players(self, node: int) -> Tuple[Optional[str], Optional[str]]:
+        return self.tree[2 * node], self.tree[2 * node + 1]
+
+    def match(self, node: int) -> Dict:
+        player1, player2 = self.players(node)
+        if node in self.results:
+            status = 'done'
+        elif self.tree[node] is not None:
+            status = 'bye'
+        elif player1 is None or player2 is None:
+            status = 'waiting'
+        else:
+            status = 'ready'
+        return {'id': self.match_id(node), 'round': self.round_of(node), 'player1': player1,
+                'player2': player2, 'winner': self.tree[node], 'status': status}
+
+    def matches(self, round_num: int) -> List[Dict]:
+        """Every match of a round; empty before the bracket exists."""
+        if not self.size or not 0 <= round_num < self.rounds:
+            return []
+        return [self.match(node) for node in range(self.size >> (round_num + 1), self.size >> round_num)]
+
+    def record(self, node: int, winner: str) -> Dict:
+        """Store a match result; the final also settles the placings."""
+        with self._lock:
+            if self.status != 'running':
+                return {'error': 'Tournament is not running'}
+            player1, player2 = self.players(node)
+            if self.tree[node] is not None:
+                return {'error': 'Match already played'}
+            if player1 is None or player2 is None:
+                return {'error': 'Match is not ready'}
+            if winner not in (player1, player2):
+                return {'error': 'Winner is not in this match'}
+            loser = player2 if winner == player1 else player1
+            round_num = self._apply(node, winner, loser)
+            result = {'success': True, 'match_id': self.match_id(node), 'round': round_num,
+                      'winner': winner, 'loser': loser, 'round_complete': not self._pending[round_num]}
+            if node == 1:
+                result['placings'] = self.placings()
+            return result
+
+    def _apply(self, node: int, winner: str, loser: str) -> int:
+        self.tree[node] = winner
+        self.results[node] = (winner, loser)
+        round_num = self.round_of(node)
+        self._pending[round_num] -= 1
+        if node == 1:
+            self.status = 'finished'
+        return round_num
+
+    @property
+    def completed_rounds(self) -> int:
+        """Rounds with every match played."""
+        return next((r for r, pending in enumerate(self._pending) if pending), self.rounds)
+
+    def checkpoint(self) -> Dict:
+        """Compact state: the seeded leaves, results so far and payout status."""
+        with self._lock:
+            return {
+                'id': self.id,
+                'kind': self.kind,
+                'capacity': self.capacity,
+                'leaves': self.tree[self.size:],
+                'results': [[node, winner, loser] for node, (winner, loser) in self.results.items()],
+                'prizes_paid': self.prizes_paid
+            }
+
+    @classmethod
+    def from_checkpoint(cls, state: Dict) -> 'Tournament':
+        """Rebuild a started tournament from `checkpoint` output."""
+        tournament = cls(state['id'], state['kind'], state['capacity'], min_players=0)
+        leaves = state['leaves']
+        for slot, handle in enumerate(leaves):
+            if handle is not None:
+                tournament.entrants[handle.lower()] = slot
+        tournament._layout(leaves)
+        for node, winner, loser in sorted(state['results'], reverse=True):
+            tournament.restore(node, winner, loser)
+        tournament.prizes_paid = state['prizes_paid']
+        return tournament
+
+    def restore(self, node: int, winner: str, loser: str) -> bool:
+        """Re-apply a logged result; returns False if it is already in place."""
+        with self._lock:
+            if node in self.results:
+                return False
+            if set(self.players(node)) != {winner, loser}:
+                raise ValueError(f'Tournament {self.id} match {node} does not fit the bracket')
+            self._apply(node, winner, loser)
+            return True
+
+    def placings(self) -> List[str]:
+        """Champion, runner-up, then the losing semi-finalists."""
+        if 1 not in self.results:
+            return []
+        placings = list(self.results[1])
+        placings.extend(self.results[node][1] for node in (2, 3) if node in self.results)
+        return placings
+
+    def status_dict(self) -> Dict:
+        return {
+            'tournament_id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'players': len(self.entrants),
+            'round': self.current_round,
+            'rounds': self.rounds,
+            'champion': self.tree[1] if self.status == 'finished' else None
+        }
@@ -0,0 +1,73 @@
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from .tournament import Tournament
+
+logger = logging.getLogger(__name__)
+
+class TournamentJournal:
+    """Persists tournaments as per-round checkpoints plus a match log.
+
+    A checkpoint (bracket leaves, results so far, payout status) is
+    written when the bracket starts and whenever a round completes; each
+    match in between is a single tournament_matches row. `load` returns
+    the latest checkpoint and the logged matches it does not contain yet.
+    """
+
+    CHECKPOINT_SQL = (
+        "REPLACE INTO tournament_checkpoints (tournament_id, round, state) VALUES (%s, %s, %s)"
+    )
+    MATCH_SQL = (
+        "INSERT INTO tournament_matches (tournament_id, node, winner, loser) VALUES (%s, %s, %s, %s)"
+    )
+    LATEST_SQL = (
+        "SELECT round, state FROM tournament_checkpoints WHERE tournament_id = %s "
+        "ORDER BY round DESC LIMIT 1"
+    )
+    MATCHES_SQL = "SELECT node, winner, loser FROM tournament_matches WHERE tournament_id = %s"
+    LAST_ID_SQL = "SELECT MAX(tournament_id) FROM tournament_checkpoints"
+    LATEST_ALL_SQL = (
+        "SELECT c.tournament_id, c.state FROM tournament_checkpoints c "
+        "JOIN (SELECT tournament_id, MAX(round) AS round FROM tournament_checkpoints "
+        "GROUP BY tournament_id) latest "
+        "ON c.tournament_id = latest.tournament_id AND c.round = latest.round"
+    )
+
+    def __init__(self, db):
+        self.db = db
+
+    def checkpoint(self, tournament: Tournament) -> None:
+        state = tournament.checkpoint()
+        self.db.execute(self.CHECKPOINT_SQL, (
+            tournament.id, tournament.completed_rounds, json.dumps(state, separators=(',', ':'))
+        ))
+
+    def record_match(self, tournament: Tournament, node: int) -> None:
+        winner, loser = tournament.results[node]
+        self.db.execute(self.MATCH_SQL, (tournament.id, node, winner, loser))
+
+    def load(self, tournament_id: int) -> Optional[Tuple[Dict, List[Tuple[int, str, str]]]]:
+        """Latest checkpoint state and the matches logged after it, earliest round first."""
+        row = self.db.fetchone(self.LATEST_SQL, (tournament_id,))
+        if row is None:
+            return None
+        state = json.loads(row[1])
+        done = {node for node, _, _ in state['results']}
+        tail = [
+            (node, winner, loser)
+            for node, winner, loser in self.db.fetchall(self.MATCHES_SQL, (tournament_id,))
+            if node not in done
+        ]
+        tail.sort(reverse=True)  # Higher nodes are earlier rounds
+        return state, tail
+
+    def open_ids(self) -> List[int]:
+        """Tournaments still being played or owed prizes, by their latest checkpoint."""
+        return sorted(
+            tournament_id for tournament_id, state in self.db.fetchall(self.LATEST_ALL_SQL)
+            if not json.loads(state)['prizes_paid']
+        )
+
+    def last_id(self) -> int:
+        return self.db.fetchone(self.LAST_ID_SQL)[0] or 0
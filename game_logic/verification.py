@@ -0,0 +1,204 @@
+import abc
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+REVERTED = -1  # Confirmation count reported for a mined transaction that failed
+_MISSING = object()
+
+class ChainBackend(abc.ABC):
+    """Source of confirmation counts for transaction hashes."""
+
+    @abc.abstractmethod
+    async def get_confirmations(self, tx_hashes: List[str]) -> Dict[str, Optional[int]]:
+        """Return confirmations per hash; None if unknown, REVERTED if it failed."""
+
+class FakeChainBackend(ChainBackend):
+    """In-memory chain for tests and offline load testing.
+
+    Hashes registered with add_transaction report their confirmation
+    count; anything else reports `default_confirmations`. `latency`
+    simulates one round trip per batch.
+    """
+
+    def __init__(self, default_confirmations: Optional[int] = None, latency: float = 0.0):
+        self.default_confirmations = default_confirmations
+        self.latency = latency
+        self.transactions: Dict[str, Optional[int]] = {}
+        self.requests = 0
+        self.hashes_requested = 0
+
+    def add_transaction(self, tx_hash: str, confirmations: Optional[int] = 0) -> None:
+        self.transactions[tx_hash] = confirmations
+
+    def mine(self, blocks: int = 1) -> None:
+        """Add confirmations to every known, non-reverted transaction."""
+        for tx_hash, confirmations in self.transactions.items():
+            if confirmations is not None and confirmations != REVERTED:
+                self.transactions[tx_hash] = confirmations + blocks
+
+    def revert(self, tx_hash: str) -> None:
+        self.transactions[tx_hash] = REVERTED
+
+    async def get_confirmations(self, tx_hashes: List[str]) -> Dict[str, Optional[int]]:
+        self.requests += 1
+        self.hashes_requested += len(tx_hashes)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return {
+            tx_hash: self.transactions.get(tx_hash, self.default_confirmations)
+            for tx_hash in tx_hashes
+        }
+
+class JsonRpcChainBackend(ChainBackend):
+    """Base node backend using batched JSON-RPC receipt lookups."""
+
+    def __init__(self, rpc_url: str, timeout: float = 10.0):
+        self.rpc_url = rpc_url
+        self.timeout = timeout
+
+    async def get_confirmations(self, tx_hashes: List[str]) -> Dict[str, Optional[int]]:
+        import aiohttp
+
+        # One HTTP round trip for the head block plus every receipt
+        payload = [{'jsonrpc': '2.0', 'id': 0, 'method': 'eth_blockNumber', 'params': []}]
+        payload += [
+            {'jsonrpc': '2.0', 'id': i + 1, 'method': 'eth_getTransactionReceipt', 'params': [tx_hash]}
+            for i, tx_hash in enumerate(tx_hashes)
+        ]
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.post(self.rpc_url, json=payload) as response:
+                response.raise_for_status()
+                replies = {reply['id']: reply.get('result') for reply in await response.json()}
+
+        head = int(replies[0], 16)
+        confirmations = {}
+        for i, tx_hash in enumerate(tx_hashes):
+            receipt = replies.get(i + 1)
+            if not receipt:
+                confirmations[tx_hash] = None
+            elif receipt.get('status') != '0x1':
+                confirmations[tx_hash] = REVERTED
+            else:
+                confirmations[tx_hash] = head - int(receipt['blockNumber'], 16) + 1
+        return confirmations
+
+class TransactionVerifier:
+    """Verifies transaction hashes against a chain backend.
+
+    Lookups are split into batches that run concurrently, up to
+    `max_concurrency` at a time. Results are cached by hash. A verified
+    hash stays cached for `cache_ttl` seconds, as does a reverted one,
+    since both are final. A hash that is not yet verified is cached for
+    `negative_ttl` seconds, so repeated polling does not hammer the
+    backend.
+    """
+
+    def __init__(self, backend: ChainBackend, min_confirmations: int = 3,
+                 cache_ttl: float = 3600, negative_ttl: float = 10,
+                 batch_size: int = 20, max_concurrency: int = 4,
+                 max_cache_entries: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.backend = backend
+        self.min_confirmations = min_confirmations
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+        self.max_cache_entries = max_cache_entries
+        self.clock = clock
+        # hash -> (verified, expires); verified is None for a reverted hash
+        self._cache: 'OrderedDict[str, Tuple[Optional[bool], float]]' = OrderedDict()
+        self._lock = threading.Lock()  # Deposits verify from several executor shards
+
+    @classmethod
+    def from_config(cls, backend: ChainBackend, config: Dict, **kwargs) -> 'TransactionVerifier':
+        """Build from the agent config's `transaction_verification` section."""
+        return cls(backend, min_confirmations=config.get('min_confirmations', 3), **kwargs)
+
+    def cached(self, tx_hash: str) -> Optional[bool]:
+        """Cached result for a hash, or None if absent or expired."""
+        verified = self._lookup_cache(tx_hash)
+        return None if verified is _MISSING else bool(verified)
+
+    def _lookup_cache(self, tx_hash: str):
+        """Cached verified/None-if-reverted value, or _MISSING."""
+        with self._lock:
+            entry = self._cache.get(tx_hash)
+            if entry is None:
+                return _MISSING
+            verified, expires = entry
+            if self.clock() >= expires:
+                del self._cache[tx_hash]
+                return _MISSING
+            return verified
+
+    async def verify(self, tx_hash: str) -> bool:
+        """Verify a single hash."""
+        return (await self.verify_many([tx_hash]))[tx_hash]
+
+    async def verify_many(self, tx_hashes: Iterable[str]) -> Dict[str, bool]:
+        """Verify many hashes, querying the backend only for cache misses."""
+        return {tx_hash: bool(verified) for tx_hash, verified in (await self.check_many(tx_hashes)).items()}
+
+    async def check_many(self, tx_hashes: Iterable[str]) -> Dict[str, Optional[bool]]:
+        """Like verify_many, but None marks a hash that reverted on chain."""
+        results = {}
+        misses = []
+        for tx_hash in tx_hashes:
+            if tx_hash in results:
+                continue
+            verified = self._lookup_cache(tx_hash)
+            if verified is _MISSING:
+                misses.append(tx_hash)
+                results[tx_hash] = False
+            else:
+                results[tx_hash] = verified
+        if not misses:
+            return results
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def lookup(batch: List[str]) -> Dict[str, Optional[int]]:
+            async with semaphore:
+                return await self.backend.get_confirmations(batch)
+
+        batches = [misses[i:i + self.batch_size] for i in range(0, len(misses), self.batch_size)]
+        for confirmations in await asyncio.gather(*(lookup(batch) for batch in batches)):
+            for tx_hash, count in confirmations.items():
+                verified = None if count == REVERTED else count is not None and count >= self.min_confirmations
+                results[tx_hash] = verified
+                self._store(tx_hash, verified)
+        return results
+
+    def verify_sync(self, tx_hash: str) -> bool:
+        """Blocking verification for synchronous callers.
+
+        Must not be called from a thread with a running event loop; async
+        code should await verify() instead.
+        """
+        verified = self.cached(tx_hash)
+        if verified is not None:
+            return verified
+        return asyncio.run(self.verify(tx_hash))
+
+    def _store(self, tx_hash: str, verified: Optional[bool]) -> None:
+        now = self.clock()
+        ttl = self.negative_ttl if verified is False else self.cache_ttl
+        with self._lock:
+            cache = self._cache
+            cache.pop(tx_hash, None)
+            cache[tx_hash] = (verified, now + ttl)
+
+            # Drop expired entries from the oldest end, then enforce the size cap
+            while cache:
+                oldest = next(iter(cache.values()))
+                if oldest[1] > now and len(cache) <= self.max_cache_entries:
+                    break
+                cache.popitem(last=False)
@@ -13,6 +13,7 @@ setup(
     ],
     extras_require={
         "elizaos": ["elizaos==14.8.0"],
+        "sim": ["numpy>=1.24"],
     },
     python_requires=">=3.8",
 ) 
\ No newline at end of file
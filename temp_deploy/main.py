@@ -1,9 +1,23 @@
 import os
+import asyncio
 import logging
 from typing import Dict, Any
 from elizaos import ElizaOS, Agent
 from .agents.wizard_agent import WizardAgent
 from .monitoring.metrics import MonitoringSystem
+from .game_logic.banking import BankingSystem, BankrbotHandler
+from .game_logic.command_handler import CommandHandler
+from .game_logic.house_standings import HouseStandings
+from .game_logic.duel_log import DuelJournal
+from .game_logic.leaderboard import Leaderboard
+from .game_logic.ledger import Ledger
+from .game_logic.settlement import BankrbotWithdrawalSender
+from .game_logic.tournament_log import TournamentJournal
+from .game_logic.verification import JsonRpcChainBackend, TransactionVerifier
+from .database.db import Database
+from .database.player_store import PlayerStore
+from .utils.error_handler import ErrorHandler, StateRecovery
+from .utils.pipeline import build_mention_pipeline
 
 logging.basicConfig(
     level=logging.INFO,
@@ -13,11 +27,121 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class GameService:
+    METRICS_INTERVAL = 60  # seconds
+    SETTLEMENT_INTERVAL = 5  # seconds
+    DUEL_TIMEOUT_INTERVAL = 1  # seconds; the duel clock's resolution
+    PLAYER_FLUSH_INTERVAL = 5  # seconds; most player changes a crash can lose
+    BURN_INTERVAL = 60  # seconds; burns are scheduled 12-48 hours out
+    BANKRBOT_CLEANUP_INTERVAL = 10  # seconds; expired transfers stop matching within this
+    LEDGER_PATH = '/var/lib/wizards-of-x/galleons.ledger'
+    ADMINS_ENV = 'WIZARDS_ADMINS'  # Comma-separated handles allowed to run tournaments
+    RPC_URL_ENV = 'BASE_RPC_URL'  # Base node used to verify deposits and payouts
+    BANKRBOT_API_URL_ENV = 'BANKRBOT_API_URL'  # Transfer endpoint that pays out withdrawals
+    BANKRBOT_API_KEY_ENV = 'BANKRBOT_API_KEY'
+    ERROR_WEBHOOK_ENV = 'DISCORD_ERROR_WEBHOOK'
+
     def __init__(self):
         self.agent = WizardAgent()
         self.monitoring = MonitoringSystem()
+        os.makedirs(os.path.dirname(self.LEDGER_PATH), exist_ok=True)
+        self.ledger = Ledger(self.LEDGER_PATH)
+        self.db = Database.from_config(self._db_config())
+        self.player_store = PlayerStore(self.db, flush_interval=self.PLAYER_FLUSH_INTERVAL)
+        # One verifier, so deposits, bankrbot confirmations and payouts share its cache
+        self.verifier = self._build_verifier()
+        self.banking = BankingSystem(self.verifier, db=self.db, ledger=self.ledger,
+                                     sender=self._build_withdrawal_sender())
+        self.banking.burn_queue.load()
+        self.bankrbot = BankrbotHandler(self.verifier, db=self.db)
+        self.banking.settlement.recover()
+        self.duel_log = DuelJournal(self.db)
+        self.tournament_log = TournamentJournal(self.db)
+        self.command_handler = CommandHandler(self.banking, store=self.player_store,
+                                              duel_log=self.duel_log, tournament_log=self.tournament_log,
+                                              admins=self._load_admins(),
+                                              leaderboard=self._load_leaderboard(),
+                                              house_standings=self._load_house_standings())
+        self.recovery = StateRecovery(ErrorHandler(os.getenv(self.ERROR_WEBHOOK_ENV)),
+                                      duel_log=self.duel_log, tournament_log=self.tournament_log,
+                                      command_handler=self.command_handler)
+        self._recover_duels()
+        self._recover_tournaments()
+        self.pipeline = build_mention_pipeline(
+            self.command_handler,
+            self.agent.fetch_mentions,
+            self.agent.send_reply
+        )
         self.running = False
 
+    @staticmethod
+    def _db_config():
+        """MySQL connection settings from the service environment"""
+        return {
+            'host': os.getenv('MYSQL_HOST', 'localhost'),
+            'port': int(os.getenv('MYSQL_PORT', '3306')),
+            'database': os.getenv('MYSQL_DATABASE', 'wizards_of_x'),
+            'user': os.getenv('MYSQL_USER', 'wizards'),
+            'password': os.getenv('MYSQL_PASSWORD', '')
+        }
+
+    def _load_leaderboard(self):
+        """Rankings rebuilt from the players table, so they survive restarts"""
+        leaderboard = Leaderboard()
+        logger.info(f"Ranked {leaderboard.load(self.db)} wizards")
+        return leaderboard
+
+    def _load_house_standings(self):
+        """House totals rebuilt from the players table and the last snapshot"""
+        standings = HouseStandings(self.db)
+        logger.info(f"Counted {standings.load()} wizards into house standings")
+        return standings
+
+    def _build_verifier(self):
+        """Transaction verifier backed by the configured Base node"""
+        rpc_url = os.getenv(self.RPC_URL_ENV)
+        if not rpc_url:
+            raise RuntimeError(f"{self.RPC_URL_ENV} must point at a Base JSON-RPC node")
+        return TransactionVerifier(JsonRpcChainBackend(rpc_url))
+
+    def _build_withdrawal_sender(self):
+        """Withdrawal sender backed by the configured bankrbot transfer API"""
+        api_url = os.getenv(self.BANKRBOT_API_URL_ENV)
+        api_key = os.getenv(self.BANKRBOT_API_KEY_ENV)
+        if not api_url or not api_key:
+            raise RuntimeError(
+                f"{self.BANKRBOT_API_URL_ENV} and {self.BANKRBOT_API_KEY_ENV} must be set to pay withdrawals"
+            )
+        return BankrbotWithdrawalSender(api_url, api_key)
+
+    def _recover_duels(self):
+        """Resume the duels that were still active when the service stopped"""
+        duel_ids = self.duel_log.active_ids()
+        failed = 0
+        for duel_id in duel_ids:
+            result = self.recovery.recover_duel(duel_id)
+            if result.get('error'):
+                failed += 1
+                logger.error(f"Could not recover duel {duel_id}: {result['message']}")
+        logger.info(f"Recovered {len(duel_ids) - failed} of {len(duel_ids)} active duels")
+
+    def _recover_tournaments(self):
+        """Resume the tournaments still running or owed prizes when the service stopped"""
+        tournament_ids = self.tournament_log.open_ids()
+        failed = 0
+        for tournament_id in tournament_ids:
+            result = self.recovery.recover_tournament(tournament_id)
+            if result.get('error'):
+                failed += 1
+                logger.error(f"Could not recover tournament {tournament_id}: {result['message']}")
+        logger.info(f"Recovered {len(tournament_ids) - failed} of {len(tournament_ids)} open tournaments")
+
+    def _load_admins(self):
+        """Admin handles from the service environment; none unless configured"""
+        admins = [handle.strip().lstrip('@') for handle in os.getenv(self.ADMINS_ENV, '').split(',')]
+        admins = [handle for handle in admins if handle]
+        logger.info(f"Tournament admins: {', '.join(admins) or 'none'}")
+        return admins
+
     def start(self):
         try:
             logger.info("Starting Wizards of X game service...")
@@ -45,18 +169,107 @@ class GameService:
 
     def _run(self):
         """Main game loop"""
+        try:
+            asyncio.run(self._run_async())
+        finally:
+            # The pipeline has drained; make sure every balance and player change is on disk
+            self.ledger.close()
+            self.player_store.close()
+            self.command_handler.house_standings.snapshot()
+            self.db.close()
+
+    async def _run_async(self):
+        """Run the mention pipeline with metrics and settlement alongside it"""
+        metrics = asyncio.ensure_future(self._collect_metrics())
+        settlement = asyncio.ensure_future(self._settle_withdrawals())
+        timeouts = asyncio.ensure_future(self._expire_duels())
+        players = asyncio.ensure_future(self._flush_players())
+        burns = asyncio.ensure_future(self._process_burns())
+        bankrbot = asyncio.ensure_future(self._cleanup_bankrbot())
+        try:
+            await self.pipeline.run()
+        finally:
+            metrics.cancel()
+            settlement.cancel()
+            timeouts.cancel()
+            players.cancel()
+            burns.cancel()
+            bankrbot.cancel()
+
+    async def _collect_metrics(self):
+        """Update monitoring metrics on a fixed interval"""
+        loop = asyncio.get_event_loop()
         while self.running:
             try:
-                # Process tweets and game state
-                self.agent.process_tweets()
-                
-                # Update monitoring metrics
-                self.monitoring.update_metrics()
-                
+                await loop.run_in_executor(None, self.monitoring.update_metrics)
+                await loop.run_in_executor(None, self.command_handler.house_standings.maybe_snapshot)
+                logger.info(f"Pipeline stats: {self.pipeline.stats()}")
             except Exception as e:
-                logger.error(f"Error in main loop: {e}")
-                # Continue running despite errors
-                continue
+                logger.error(f"Error updating metrics: {e}")
+            await asyncio.sleep(self.METRICS_INTERVAL)
+
+    async def _settle_withdrawals(self):
+        """Send and confirm withdrawal batches on a fixed interval"""
+        while self.running:
+            try:
+                result = await self.banking.settlement.run_once()
+                if result['sent'] or result['confirmed']:
+                    logger.info(f"Settlement: {result}")
+            except Exception as e:
+                logger.error(f"Error settling withdrawals: {e}")
+            await asyncio.sleep(self.SETTLEMENT_INTERVAL)
+
+    async def _expire_duels(self):
+        """Resolve duels whose player to move has run out of time"""
+        loop = asyncio.get_event_loop()
+        while self.running:
+            try:
+                expired = await loop.run_in_executor(None, self.command_handler.expire_duels)
+                if expired:
+                    logger.info(f"Timed out {len(expired)} duels")
+            except Exception as e:
+                logger.error(f"Error expiring duels: {e}")
+            await asyncio.sleep(self.DUEL_TIMEOUT_INTERVAL)
+
+    async def _flush_players(self):
+        """Write queued player changes once the flush interval has passed"""
+        loop = asyncio.get_event_loop()
+        while self.running:
+            try:
+                await loop.run_in_executor(None, self.player_store.maybe_flush)
+            except Exception as e:
+                logger.error(f"Error flushing players: {e}")
+            await asyncio.sleep(self.PLAYER_FLUSH_INTERVAL)
+
+    async def _process_burns(self):
+        """Execute scheduled burns once they are due"""
+        loop = asyncio.get_event_loop()
+        while self.running:
+            try:
+                result = await loop.run_in_executor(None, self.banking.process_burn_queue)
+                if result['burns_processed']:
+                    logger.info(f"Burned {result['total_burned']} Galleons; "
+                                f"{result['remaining_burns']} burns pending")
+            except Exception as e:
+                logger.error(f"Error processing burns: {e}")
+            await asyncio.sleep(self.BURN_INTERVAL)
+
+    async def _cleanup_bankrbot(self):
+        """Expire unconfirmed bankrbot transfers and archive settled ones"""
+        loop = asyncio.get_event_loop()
+        while self.running:
+            try:
+                removed = await loop.run_in_executor(None, self.bankrbot.cleanup_old_transactions)
+                if removed:
+                    logger.info(f"Archived {removed} bankrbot transactions")
+            except Exception as e:
+                logger.error(f"Error cleaning up bankrbot transactions: {e}")
+            await asyncio.sleep(self.BANKRBOT_CLEANUP_INTERVAL)
+
+    def stop(self):
+        """Stop fetching mentions and drain the pipeline"""
+        self.running = False
+        self.pipeline.stop()
 
 def main():
     service = GameService()
@@ -1,6 +1,8 @@
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List
 from elizaos import Agent
+from .game_logic.command_handler import Command
+from .utils.replies import format_reply
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +25,12 @@ class WizardAgent(Agent):
                 "patterns": ["transfer", "confirmed", "failed"]
             }
         }
+        self._handlers = {
+            "create": self._handle_create,
+            "duel": self._handle_duel,
+            "d": self._handle_duel,
+            "cast": self._handle_cast,
+        }
 
     def load_config(self):
         """Load agent configuration"""
@@ -43,16 +51,25 @@ class WizardAgent(Agent):
             logger.error(f"Error processing tweets: {e}")
             raise
 
+    def fetch_mentions(self) -> List[Dict[str, Any]]:
+        """Return new mentions as dicts with 'id', 'author' and 'text'"""
+        try:
+            return self.process_mentions() or []
+        except Exception as e:
+            logger.error(f"Error fetching mentions: {e}")
+            return []
+
+    def send_reply(self, mention: Dict[str, Any], result: Dict[str, Any], command: Command) -> None:
+        """Reply to a mention with the result of its command"""
+        self.reply(mention['id'], format_reply(command, result))
+
     def handle_command(self, command: str, args: Dict[str, Any]) -> str:
         """Handle game commands from tweets"""
         try:
-            if command == "create":
-                return self._handle_create(args)
-            elif command == "duel":
-                return self._handle_duel(args)
-            elif command == "cast":
-                return self._handle_cast(args)
-            # Add other command handlers
+            handler = self._handlers.get(command.lower())
+            if handler is None:
+                return "❌ Unknown command. Type '@WizardsOfX help' for command list."
+            return handler(args)
             
         except Exception as e:
             logger.error(f"Error handling command {command}: {e}")
@@ -1,8 +1,77 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
 import unittest
+from concurrent.futures import wait
 from game_logic.character import Character
-from game_logic.combat import Combat
-from game_logic.banking import BankingSystem
+from game_logic.command_handler import CommandHandler
+from game_logic.combat import EFFECT_NAMES, EFFECT_TURNS, Combat
+from game_logic.banking import BankingSystem, BankrbotHandler, parse_bankrbot_tweet
+from game_logic.burn_scheduler import BurnScheduler
+from game_logic.duel_log import DuelJournal
+from game_logic.duel_registry import DuelRegistry
+from game_logic.dedup import BloomFilter, TransactionDedup
+from game_logic.house_cup import round_robin
+from game_logic.house_standings import HouseStandings
+from game_logic.leaderboard import Leaderboard
+from game_logic.executor import PlayerExecutor
+from game_logic.progression import LEVEL_XP, MAX_LEVEL, grant_xp_bulk, level_for_xp
+from game_logic.ledger import Ledger, escrow_account, player_account, to_minor
+from game_logic.tournament import Tournament
+from game_logic.tournament_log import TournamentJournal
+from game_logic.settlement import FakeWithdrawalSender, SettlementOutbox
+from game_logic.verification import ChainBackend, FakeChainBackend, TransactionVerifier
+from utils.rate_limiter import RateLimiter, RateLimit
+from utils.error_handler import ErrorHandler, StateRecovery
+from utils.skiplist import IndexableSkipList
+from utils.timing_wheel import TimingWheel
+from database.db import Database
+from database.player_store import PlayerStore
 
+try:
+    import numpy
+    from game_logic import simulator
+except ImportError:  # The simulator is an optional balance-testing tool
+    numpy = None
+
+def make_test_db(*ddl):
+    """In-memory sqlite Database with the given tables."""
+    db = Database(lambda: sqlite3.connect(':memory:', check_same_thread=False), placeholder='?')
+    for statement in ddl:
+        db.execute(statement)
+    return db
+
+def accepting_verifier():
+    """Verifier over a fake chain on which every hash has three confirmations."""
+    return TransactionVerifier(FakeChainBackend(default_confirmations=3))
+
+def make_banking(**kwargs):
+    """BankingSystem checking hashes against an accepting fake chain unless told otherwise."""
+    kwargs.setdefault('verifier', accepting_verifier())
+    if 'settlement' not in kwargs:
+        kwargs.setdefault('sender', FakeWithdrawalSender())
+    return BankingSystem(**kwargs)
+
+def fund(banking, player, amount):
+    """Give a player withdrawable Galleons through the ledger."""
+    banking.ledger.record('deposit', [(player_account(player.twitter_handle), to_minor(amount))])
+    banking.restore_balance(player)
+
+def make_state_recovery(**kwargs):
+    """StateRecovery whose ErrorHandler writes its log files to a temp directory."""
+    cwd = os.getcwd()
+    os.chdir(tempfile.mkdtemp())  # ErrorHandler opens its log files in the working directory
+    try:
+        return StateRecovery(ErrorHandler(), **kwargs)
+    finally:
+        os.chdir(cwd)
+    
 class TestCharacter(unittest.TestCase):
     def setUp(self):
         self.character = Character('test_user', 'TestWizard')
@@ -36,6 +105,77 @@ class TestCharacter(unittest.TestCase):
         self.assertEqual(self.character.xp, 0)
         self.assertIn('Flipendo', new_abilities['spells'])
         
+    def test_spellbooks_are_shared(self):
+        """Test that wizards share catalog spells instead of per-instance dicts."""
+        other = Character('other_user', 'OtherWizard')
+        self.assertIs(self.character.spells, other.spells)
+        self.assertFalse(hasattr(self.character, '__dict__'))
+        
+        self.character.level_up()
+        self.assertIn('Flipendo', self.character.spells)
+        self.assertIs(self.character.spells['Incendio'], other.spells['Incendio'])
+        
+    def test_round_trip_with_potions(self):
+        """Test that storage round-trips spells, potions and legacy spell dicts."""
+        self.character.add_potion('Healing Potion', 2)
+        self.assertTrue(self.character.use_potion('Healing Potion'))
+        self.assertFalse(self.character.use_potion('Focus Potion'))
+        
+        data = self.character.to_dict()
+        restored = Character.from_dict(data)
+        self.assertEqual(restored.potions, {'Healing Potion': 1})
+        self.assertEqual(list(restored.spells), ['Incendio', 'Protego'])
+        
+        data['spells'] = '{"Incendio": {"damage": [3, 6]}, "Flipendo": {}}'
+        self.assertEqual(list(Character.from_dict(data).spells), ['Incendio', 'Flipendo'])
+        
+class TestProgression(unittest.TestCase):
+    def test_level_table(self):
+        """Test the cumulative XP table and lookup."""
+        self.assertEqual(LEVEL_XP[:5], (0, 100, 300, 600, 1000))
+        self.assertEqual(level_for_xp(99), 1)
+        self.assertEqual(level_for_xp(100), 2)
+        self.assertEqual(level_for_xp(10 ** 9), MAX_LEVEL)
+        
+    def test_grant_resolves_several_levels(self):
+        """Test that one large grant applies every level's rewards."""
+        wizard = Character('test_user', 'TestWizard')
+        result = wizard.grant_xp(650)
+        
+        self.assertEqual((wizard.level, wizard.xp), (4, 50))
+        self.assertEqual(result['levels_gained'], 3)
+        self.assertEqual(result['new_spells'], ['Flipendo', 'Reducto'])
+        self.assertEqual(result['max_hp_bonus'], 10)
+        self.assertEqual(result['potions_unlocked'], ['Strength Potion'])
+        self.assertEqual((wizard.max_hp, wizard.hp), (110, 100))
+        self.assertEqual(wizard.potions, {'Strength Potion': 1})
+        self.assertIn('Reducto', wizard.spells)
+        
+    def test_max_hp_sets_starting_duel_hp(self):
+        """Test that Combat starts wizards at their persisted max HP plus level bonus."""
+        wizard, rival = Character('test_user', 'TestWizard'), Character('rival', 'Rival')
+        wizard.house = rival.house = 'Ravenclaw'
+        wizard.grant_xp(650)
+        
+        self.assertEqual(Combat(wizard, rival)._max_hp, (110 + 30, 100))
+        self.assertEqual(Character.from_dict(wizard.to_dict()).max_hp, 110)
+        
+    def test_duel_end_levels_up(self):
+        """Test that duel XP triggers level-ups automatically."""
+        winner, loser = Character('winner', 'Winner'), Character('loser', 'Loser')
+        winner.xp = 90
+        Combat(winner, loser)._handle_duel_end(winner, loser)
+        self.assertEqual((winner.level, winner.xp), (2, 10))
+        self.assertEqual((loser.level, loser.xp), (1, 10))
+        
+    def test_bulk_grant_sums_per_wizard(self):
+        """Test bulk grants for a bracket, with repeated wizards combined."""
+        champion, runner_up = Character('champion', 'Champ'), Character('runner_up', 'Runner')
+        results = grant_xp_bulk([(champion, 50), (runner_up, 10), (champion, 50)])
+        self.assertEqual(results['champion']['level'], 2)
+        self.assertEqual(results['runner_up']['levels_gained'], 0)
+        self.assertEqual(champion.xp, 0)
+        
 class TestCombat(unittest.TestCase):
     def setUp(self):
         self.player1 = Character('player1', 'Wizard1')
@@ -73,9 +213,74 @@ class TestCombat(unittest.TestCase):
         self.assertEqual(self.player1.wins, 1)
         self.assertEqual(self.player2.losses, 1)
         
+    def test_compact_state_keeps_dict_shape(self):
+        """Test that combo ring, effect flags and blocks surface as before."""
+        # No Slytherin, so no critical hit outdoes the heals
+        self.combat = Combat(self.player1, self.player2, 50.0, seed=1, houses=('Ravenclaw', 'Ravenclaw'))
+        self.assertFalse(hasattr(self.combat, '__dict__'))
+        for handle, spell in [('player1', 'Incendio'), ('player2', 'Protego'),
+                              ('player1', 'Incendio'), ('player2', 'Protego'),
+                              ('player1', 'Protego'), ('player2', 'Protego'),
+                              ('player1', 'Incendio')]:
+            result = self.combat.cast_spell(handle, spell)
+        
+        state = self.combat.to_dict()
+        self.assertEqual(state['combo_history']['player1'], ['Incendio', 'Protego', 'Incendio'])
+        self.assertEqual(state['combo_history']['player2'], ['Protego', 'Protego', 'Protego'])
+        self.assertEqual(state['effects']['player1'], {'protected': True})
+        self.assertIn('Attack Blocked!', result['effects'])
+        self.assertNotIn('damage', result)
+        self.assertEqual(self.combat.hp2, self.combat._max_hp[1])
+        
+    def test_effects_count_down(self):
+        """Test that applied effects expire after the target's two turns."""
+        burn = EFFECT_NAMES.index('burn')
+        self.combat.cast_spell('player1', 'Protego')
+        self.combat._flags[1] |= 1 << burn  # As if Incendio's burn had landed
+        self.combat._counters[1] = EFFECT_TURNS << (4 * burn)
+        self.assertEqual(self.combat.effects['player2']['burn'], 2)
+        self.combat.cast_spell('player2', 'Protego')
+        self.assertEqual(self.combat.effects['player2']['burn'], 1)
+        self.combat.cast_spell('player1', 'Protego')
+        self.combat.cast_spell('player2', 'Protego')
+        self.assertNotIn('burn', self.combat.effects['player2'])
+
+    def test_seeded_duels_are_deterministic(self):
+        """Test that the same seed and casts give the same duel."""
+        casts = [('player1', 'Incendio'), ('player2', 'Incendio')] * 5
+        self.player1.house = self.player2.house = 'Slytherin'
+        states = []
+        for _ in range(2):
+            combat = Combat(Character.from_dict(self.player1.to_dict()),
+                            Character.from_dict(self.player2.to_dict()), seed=1234)
+            results = [combat.cast_spell(handle, spell) for handle, spell in casts]
+            states.append((results, combat.to_dict()))
+        self.assertEqual(states[0], states[1])
+        
+    def test_seeds_share_one_width(self):
+        """Test that explicit and generated seeds both fit a signed BIGINT."""
+        self.assertLess(Combat(self.player1, self.player2, seed=(1 << 64) - 1).seed, 1 << 63)
+        self.assertLess(Combat(self.player1, self.player2).seed, 1 << 63)
+        self.assertEqual(Combat(self.player1, self.player2, seed=1234).seed, 1234)
+        
+    def test_replay_rebuilds_duel(self):
+        """Test that replaying the event log reproduces state without rewards."""
+        copies = Character.from_dict(self.player1.to_dict()), Character.from_dict(self.player2.to_dict())
+        combat = Combat(self.player1, self.player2, seed=99)
+        for handle, spell in [('player1', 'Incendio'), ('player2', 'Protego'), ('player1', 'Incendio')]:
+            combat.cast_spell(handle, spell)
+        self.assertEqual(combat.last_event, (2, 'player1', 'Incendio'))
+        
+        spells = [spell for _, _, spell in combat.event_log]
+        replayed = Combat.replay(*copies, combat.seed, spells)
+        self.assertEqual(replayed.to_dict(), combat.to_dict())
+        self.assertEqual(replayed.events, combat.events)
+        with self.assertRaises(ValueError):
+            Combat.replay(self.player1, self.player2, 99, ['Reducto'])
+        
 class TestBanking(unittest.TestCase):
     def setUp(self):
-        self.banking = BankingSystem()
+        self.banking = make_banking()
         self.player = Character('test_user', 'TestWizard')
         
     def test_deposit(self):
@@ -93,7 +298,7 @@ class TestBanking(unittest.TestCase):
     def test_withdrawal(self):
         """Test withdrawal processing."""
         # Setup initial balance
-        self.player.withdrawable_galleons = 100.0
+        fund(self.banking, self.player, 100.0)
         
         result = self.banking.process_withdrawal(self.player, 50.0)
         
@@ -103,7 +308,7 @@ class TestBanking(unittest.TestCase):
         
     def test_insufficient_balance(self):
         """Test withdrawal with insufficient balance."""
-        self.player.withdrawable_galleons = 10.0
+        fund(self.banking, self.player, 10.0)
         
         result = self.banking.process_withdrawal(self.player, 50.0)
         self.assertIn('error', result)
@@ -121,5 +326,1297 @@ class TestBanking(unittest.TestCase):
         self.assertEqual(result['prize'], 400.0)  # Minimum daily prize
         self.assertEqual(self.player.withdrawable_galleons, 400.0)
         
+    def test_split_prize_distribution(self):
+        """Test that tournament placings share the prize 50/30/10/10."""
+        players = [Character(f'placed{i}', f'Placed{i}') for i in range(4)]
+        self.banking.prize_pool = 1000.0
+        result = self.banking.distribute_tournament_prizes(players, 'daily')
+        
+        self.assertEqual(list(result['payouts'].values()), [200.0, 120.0, 40.0, 40.0])
+        self.assertEqual(players[1].withdrawable_galleons, 120.0)
+        self.assertEqual(self.banking.total_prizes_paid, 400.0)
+        
+    def test_tokenomics_aggregates(self):
+        """Test that tokenomics reflect every money movement without rescans."""
+        self.banking.process_deposit('tx1', self.player, 200.0)
+        self.banking.process_withdrawal(self.player, 100.0)
+        self.banking.prize_pool = 1000.0
+        self.banking.distribute_tournament_prize(self.player, 'daily')
+        
+        tokenomics = self.banking.get_tokenomics()
+        self.assertEqual(tokenomics['total_processed_volume'], 200.0)
+        self.assertEqual(tokenomics['total_withdrawn'], 96.0)
+        self.assertEqual(tokenomics['total_fees'], 4.0)
+        self.assertEqual(tokenomics['pending_burns'], 2.0)
+        self.assertEqual(tokenomics['total_prizes_paid'], 400.0)
+        self.assertEqual(self.banking.reconcile_tokenomics(), {})
+        
+    def test_reconcile_reports_drift(self):
+        """Test that reconciliation detects and repairs drifted aggregates."""
+        self.banking.process_deposit('tx1', self.player, 50.0)
+        self.banking.total_deposited = 75.0
+        
+        drift = self.banking.reconcile_tokenomics(fix=True)
+        self.assertEqual(drift['total_processed_volume'], {'running': 75.0, 'recounted': 50.0})
+        self.assertEqual(self.banking.get_tokenomics()['total_processed_volume'], 50.0)
+        self.assertEqual(self.banking.reconcile_tokenomics(), {})
+        
+class TestPlayerExecutor(unittest.TestCase):
+    def setUp(self):
+        self.executor = PlayerExecutor(shards=4)
+        
+    def tearDown(self):
+        self.executor.shutdown()
+        
+    def test_same_player_runs_in_order(self):
+        """Test that one player's jobs run in submission order."""
+        order = []
+        futures = [
+            self.executor.submit(['player1'], order.append, i)
+            for i in range(100)
+        ]
+        for future in futures:
+            future.result()
+        self.assertEqual(order, list(range(100)))
+        
+    def test_two_player_jobs_are_serialized(self):
+        """Test that read-modify-write across two players never interleaves."""
+        balances = {'a': 0, 'b': 0}
+        
+        def transfer(src, dst):
+            amount = balances[src]
+            balances[src] = amount - 1
+            balances[dst] += 1
+            
+        futures = []
+        for _ in range(200):
+            futures.append(self.executor.submit(['a', 'b'], transfer, 'a', 'b'))
+            futures.append(self.executor.submit(['b', 'a'], transfer, 'b', 'a'))
+        for future in futures:
+            future.result()
+        self.assertEqual(balances, {'a': 0, 'b': 0})
+        
+    def test_two_player_job_keeps_each_players_order(self):
+        """Test that a duel queued before a withdrawal for the same player runs first."""
+        x = next(h for h in (f'x{i}' for i in range(100)) if self.executor.shard_for(h) == 3)
+        y = next(h for h in (f'y{i}' for i in range(100)) if self.executor.shard_for(h) == 0)
+        order = []
+        release = threading.Event()
+        blocker = self.executor.submit([y], release.wait)  # Keeps y's shard, the lower one, busy
+        duel = self.executor.submit([x, y], order.append, 'duel')
+        withdrawal = self.executor.submit([x], order.append, 'withdrawal')
+        try:
+            self.assertEqual(wait([withdrawal], timeout=0.1).done, set())
+        finally:
+            release.set()
+        for future in (blocker, duel, withdrawal):
+            future.result()
+        self.assertEqual(order, ['duel', 'withdrawal'])
+        
+    def test_errors_reach_the_caller(self):
+        """Test that a failing job surfaces its exception."""
+        with self.assertRaises(ZeroDivisionError):
+            self.executor.run(['player1'], lambda: 1 / 0)
+            
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.limiter = RateLimiter(
+            {'general': RateLimit(6, 60), 'duel': RateLimit(1, 5)},
+            clock=lambda: self.now
+        )
+        
+    def test_burst_then_refill(self):
+        """Test that a bucket allows its capacity then refills lazily."""
+        for _ in range(6):
+            self.assertEqual(self.limiter.acquire('player1', 'general'), 0)
+        self.assertAlmostEqual(self.limiter.acquire('player1', 'general'), 10.0)
+        
+        self.now = 10.0
+        self.assertEqual(self.limiter.acquire('player1', 'general'), 0)
+        
+    def test_classes_and_players_are_independent(self):
+        """Test that buckets are keyed by player and command class."""
+        self.assertEqual(self.limiter.acquire('player1', 'duel'), 0)
+        self.assertGreater(self.limiter.acquire('player1', 'duel'), 0)
+        self.assertEqual(self.limiter.acquire('player1', 'general'), 0)
+        self.assertEqual(self.limiter.acquire('player2', 'duel'), 0)
+        self.assertEqual(self.limiter.acquire('player1', 'unlimited'), 0)
+        
+    def test_idle_buckets_are_evicted(self):
+        """Test that fully refilled buckets do not accumulate."""
+        for i in range(1000):
+            self.limiter.acquire(f'player_{i}', 'duel')
+        self.assertEqual(len(self.limiter), 1000)
+        
+        self.now = 5.0
+        self.limiter.acquire('player_new', 'duel')
+        self.assertEqual(len(self.limiter), 1)
+        
+class TestBankrbotParsing(unittest.TestCase):
+    def test_transfer(self):
+        """Test parsing a transfer tweet."""
+        message = parse_bankrbot_tweet('transfer 50 Galleons to @WizardsOfX')
+        self.assertEqual(message.type, 'transfer')
+        self.assertEqual(message.amount, 50)
+        
+    def test_confirmation(self):
+        """Test parsing a confirmation tweet."""
+        tx_hash = '0x' + 'ab' * 32
+        message = parse_bankrbot_tweet(f'Transaction confirmed: {tx_hash}')
+        self.assertEqual(message.type, 'confirmation')
+        self.assertEqual(message.tx_hash, tx_hash)
+        
+    def test_failures_and_status(self):
+        """Test parsing failure and status tweets."""
+        self.assertEqual(
+            parse_bankrbot_tweet('Transaction failed: nonce too low').reason,
+            'nonce too low'
+        )
+        self.assertEqual(parse_bankrbot_tweet('Insufficient balance').type, 'failure')
+        self.assertEqual(parse_bankrbot_tweet('Invalid amount').reason, 'Invalid amount')
+        self.assertEqual(parse_bankrbot_tweet('Transaction pending').type, 'pending')
+        
+    def test_rejects_unknown_text(self):
+        """Test that anything outside the known patterns is rejected."""
+        handler = BankrbotHandler(accepting_verifier())
+        self.assertFalse(handler.validate_tweet_pattern('send 50 Galleons to @someone'))
+        self.assertFalse(handler.validate_tweet_pattern('Transaction confirmed: 0x123'))
+        self.assertFalse(
+            handler.validate_tweet_pattern('transfer 50 Galleons to @WizardsOfX now')
+        )
+        self.assertEqual(
+            handler.extract_transaction_data('transfer 7 Galleons to @WizardsOfX'),
+            {'type': 'transfer', 'amount': 7}
+        )
+        
+class TestBankrbotMatching(unittest.TestCase):
+    def setUp(self):
+        self.handler = BankrbotHandler(accepting_verifier())
+        self.handler.cooldown = 0
+        
+    def _tweet(self, text, sender, amount=None):
+        return asyncio.run(self.handler.process_bankrbot_tweet(text, sender, amount))
+        
+    def test_ids_are_unique_within_a_second(self):
+        """Test that transfers in the same second get distinct IDs."""
+        ids = {
+            self._tweet('transfer 10 Galleons to @WizardsOfX', f'player{i}')
+            for i in range(50)
+        }
+        self.assertEqual(len(ids), 50)
+        self.assertEqual(len(self.handler.pending_transactions), 50)
+        
+    def test_confirmation_matches_sender_and_amount(self):
+        """Test that a confirmation goes to the right sender's transfer."""
+        first = self._tweet('transfer 10 Galleons to @WizardsOfX', 'player1')
+        second = self._tweet('transfer 25 Galleons to @WizardsOfX', 'player1')
+        other = self._tweet('transfer 10 Galleons to @WizardsOfX', 'player2')
+        
+        confirmed = self._tweet('Transaction confirmed: 0x' + '1' * 64, 'player1', 25)
+        self.assertEqual(confirmed, second)
+        
+        confirmed = self._tweet('Transaction confirmed: 0x' + '2' * 64, '@Player1')
+        self.assertEqual(confirmed, first)
+        self.assertEqual(self.handler.get_transaction_status(other), 'pending')
+        
+        # Nothing left to match for player1
+        self.assertIsNone(self._tweet('Transaction confirmed: 0x' + '3' * 64, 'player1'))
+        
+    def test_failure_marks_transfer_failed(self):
+        """Test that a bankrbot failure fails the sender's oldest transfer."""
+        tx_id = self._tweet('transfer 10 Galleons to @WizardsOfX', 'player1')
+        self.assertEqual(self._tweet('Insufficient balance', 'player1'), tx_id)
+        self.assertEqual(self.handler.get_transaction_status(tx_id), 'failed')
+        
+class TestTransactionVerifier(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.chain = FakeChainBackend()
+        self.verifier = TransactionVerifier(
+            self.chain, min_confirmations=3, cache_ttl=60,
+            negative_ttl=5, batch_size=10, clock=lambda: self.now
+        )
+        
+    def test_min_confirmations(self):
+        """Test that hashes need the configured confirmations."""
+        self.chain.add_transaction('0xaa', confirmations=2)
+        self.assertFalse(asyncio.run(self.verifier.verify('0xaa')))
+        
+        self.chain.mine()
+        self.now = 5.0  # Negative result has expired
+        self.assertTrue(asyncio.run(self.verifier.verify('0xaa')))
+        self.assertFalse(asyncio.run(self.verifier.verify('0xunknown')))
+        
+    def test_batches_and_cache(self):
+        """Test that lookups are batched and cached hashes skip the backend."""
+        hashes = [f'0x{i:02x}' for i in range(25)]
+        for tx_hash in hashes:
+            self.chain.add_transaction(tx_hash, confirmations=3)
+            
+        results = asyncio.run(self.verifier.verify_many(hashes + hashes[:5]))
+        self.assertTrue(all(results.values()))
+        self.assertEqual(self.chain.requests, 3)
+        self.assertEqual(self.chain.hashes_requested, 25)
+        
+        self.assertTrue(self.verifier.verify_sync(hashes[0]))
+        self.assertEqual(self.chain.requests, 3)
+        
+        self.now = 61.0
+        self.assertIsNone(self.verifier.cached(hashes[0]))
+        
+    def test_verifier_is_required(self):
+        """Test that nothing falls back to a chain that accepts every hash or a fake sender."""
+        with self.assertRaises(ValueError):
+            BankingSystem(None)
+        with self.assertRaises(ValueError):
+            BankingSystem(self.verifier)
+        with self.assertRaises(ValueError):
+            BankrbotHandler(None)
+        with self.assertRaises(ValueError):
+            SettlementOutbox(Ledger(), FakeWithdrawalSender(), None)
+        with self.assertRaises(TypeError):
+            ChainBackend()
+        
+    def test_banking_uses_verifier(self):
+        """Test that deposits are rejected until the hash verifies."""
+        banking = make_banking(verifier=self.verifier)
+        player = Character('test_user', 'TestWizard')
+        self.chain.add_transaction('0xbb', confirmations=1)
+        
+        self.assertIn('error', banking.process_deposit('0xbb', player, 10.0))
+        self.assertEqual(player.withdrawable_galleons, 0)
+        
+class TestTimingWheel(unittest.TestCase):
+    def test_matches_brute_force(self):
+        """Test expiry times against a naive scan across all levels."""
+        rng = random.Random(7)
+        wheel = TimingWheel(tick=1.0, slots=8, levels=3)
+        deadlines = {}
+        for key in range(500):
+            deadlines[key] = rng.randint(0, 1200)  # Some beyond 8**3 ticks
+            wheel.schedule(key, deadlines[key])
+        for key in range(0, 500, 7):
+            wheel.cancel(key)
+            del deadlines[key]
+            
+        now = 0
+        while deadlines:
+            now += rng.randint(1, 40)
+            expired = set(wheel.advance(now))
+            expected = {key for key, deadline in deadlines.items() if deadline <= now}
+            self.assertEqual(expired, expected)
+            for key in expired:
+                del deadlines[key]
+        self.assertEqual(len(wheel), 0)
+        
+    def test_reschedule(self):
+        """Test that rescheduling replaces the earlier deadline."""
+        wheel = TimingWheel(tick=1.0)
+        wheel.schedule('duel', 10)
+        wheel.schedule('duel', 100)
+        self.assertEqual(wheel.advance(50), [])
+        self.assertEqual(wheel.advance(100), ['duel'])
+        
+class TestDuelRegistry(unittest.TestCase):
+    def test_concurrent_moves_and_expiry(self):
+        """Test that shards can start and end duels while expiry advances the clock."""
+        now = [0.0]
+        registry = DuelRegistry(time_limit=1, clock=lambda: now[0])
+        combats = {
+            shard_id: [Combat(Character(f's{shard_id}a{i}', 'A'), Character(f's{shard_id}b{i}', 'B'))
+                       for i in range(2000)]
+            for shard_id in range(4)
+        }
+        errors = []
+        done = threading.Event()
+        
+        def shard(shard_id):
+            try:
+                for _ in range(30):
+                    for i, combat in enumerate(combats[shard_id]):
+                        registry.add(shard_id * 10000 + i, combat)
+                    for combat in combats[shard_id]:
+                        registry.remove(combat)
+            except Exception as e:
+                errors.append(e)
+                
+        def expire():
+            try:
+                while not done.is_set():
+                    now[0] += 1
+                    registry.expired()
+            except Exception as e:
+                errors.append(e)
+                
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)  # Interleave the threads as often as possible
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+        expiry = threading.Thread(target=expire)
+        expiry.start()
+        shards = [threading.Thread(target=shard, args=(n,)) for n in range(4)]
+        for thread in shards:
+            thread.start()
+        for thread in shards:
+            thread.join()
+        done.set()
+        expiry.join()
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(len(registry), 0)
+        self.assertEqual(len(registry.deadlines), 0)
+        
+class TestBankrbotExpiry(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.db = make_test_db(
+            "CREATE TABLE bankrbot_transactions (id TEXT PRIMARY KEY, sender TEXT, "
+            "amount REAL, tx_hash TEXT, status TEXT, created_at TEXT, confirmed_at TEXT)"
+        )
+        self.handler = BankrbotHandler(
+            accepting_verifier(), db=self.db, confirmation_timeout=300, retention=60, clock=lambda: self.now
+        )
+        self.handler.cooldown = 0
+        
+    def _tweet(self, text, sender):
+        return asyncio.run(self.handler.process_bankrbot_tweet(text, sender))
+        
+    def test_expired_transactions_leave_memory(self):
+        """Test that unconfirmed transfers expire and are archived."""
+        for i in range(20):
+            self._tweet('transfer 10 Galleons to @WizardsOfX', f'player{i}')
+        confirmed = self._tweet('Transaction confirmed: 0x' + 'a' * 64, 'player0')
+        
+        self.now += 100
+        self.assertEqual(self.handler.cleanup_old_transactions(), 1)  # Settled one
+        self.assertIsNone(self.handler.get_transaction_status(confirmed))
+        
+        self.now += 250
+        self.assertEqual(self.handler.cleanup_old_transactions(), 19)
+        self.assertEqual(self.handler.pending_transactions, {})
+        
+        rows = dict(self.db.fetchall("SELECT status, COUNT(*) FROM bankrbot_transactions GROUP BY status"))
+        self.assertEqual(rows, {'confirmed': 1, 'expired': 19})
+        
+        # Expired transfers can no longer be confirmed
+        self.assertIsNone(self._tweet('Transaction confirmed: 0x' + 'b' * 64, 'player1'))
+        
+class TestBurnScheduler(unittest.TestCase):
+    BURN_QUEUE_DDL = (
+        "CREATE TABLE burn_queue (id INTEGER PRIMARY KEY, amount REAL, "
+        "scheduled_time TIMESTAMP, status TEXT)"
+    )
+    
+    def setUp(self):
+        self.db = make_test_db(self.BURN_QUEUE_DDL)
+        self.executed = []
+        self.start = datetime(2024, 1, 1, 12, 0)
+        self.scheduler = BurnScheduler(
+            self._execute, db=self.db, coalesce_window=timedelta(minutes=10)
+        )
+        
+    def _execute(self, amount):
+        self.executed.append(round(amount, 2))
+        return True
+        
+    def test_only_due_burns_are_coalesced(self):
+        """Test that due burns in one window become a single execution."""
+        for minutes, amount in [(1, 1.0), (2, 2.0), (3, 3.0), (25, 4.0), (600, 5.0)]:
+            self.scheduler.schedule(amount, self.start + timedelta(minutes=minutes))
+            
+        burned = self.scheduler.process_due(self.start + timedelta(minutes=30))
+        self.assertEqual(sorted(amount for amount, _ in burned), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(sorted(self.executed), [4.0, 6.0])
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertEqual(self.scheduler.pending_amount, 5.0)
+        
+    def test_state_persists_and_reloads(self):
+        """Test that pending burns survive a restart via the burn_queue table."""
+        self.scheduler.schedule(1.5, self.start)
+        self.scheduler.schedule(2.5, self.start + timedelta(hours=24))
+        self.scheduler.process_due(self.start + timedelta(hours=1))
+        
+        statuses = dict(self.db.fetchall("SELECT amount, status FROM burn_queue"))
+        self.assertEqual(statuses, {1.5: 'burned', 2.5: 'pending'})
+        
+        restarted = BurnScheduler(self._execute, db=self.db)
+        self.assertEqual(restarted.load(), 1)
+        self.assertEqual(restarted.pending_amount, 2.5)
+        self.assertGreater(restarted.schedule(1.0, self.start), 2)
+        
+    def test_scheduled_burn_is_written_immediately(self):
+        """Test that a burn survives a crash straight after it is scheduled."""
+        self.scheduler.schedule(1.5, self.start)
+        
+        restarted = BurnScheduler(self._execute, db=self.db)
+        self.assertEqual(restarted.load(), 1)
+        self.assertEqual(restarted.pending_amount, 1.5)
+        
+    def test_failed_burns_retry(self):
+        """Test that a failed execution leaves burns queued."""
+        scheduler = BurnScheduler(lambda amount: False)
+        scheduler.schedule(1.0, self.start)
+        self.assertEqual(scheduler.process_due(self.start), [])
+        self.assertEqual(len(scheduler), 1)
+        
+class TestTransactionDedup(unittest.TestCase):
+    PROCESSED_DDL = (
+        "CREATE TABLE processed_transactions (tx_hash TEXT PRIMARY KEY, block_number INTEGER, "
+        "from_address TEXT, to_address TEXT, value REAL, processed_at TEXT, status TEXT)"
+    )
+    
+    def setUp(self):
+        self.db = make_test_db(self.PROCESSED_DDL)
+        
+    def test_bloom_filter_has_no_false_negatives(self):
+        """Test that every added key is reported present."""
+        bloom = BloomFilter(1000, error_rate=0.01)
+        keys = [f'0x{i:064x}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        false_positives = sum(f'0y{i:064x}' in bloom for i in range(1000))
+        self.assertLess(false_positives, 50)
+        
+    def test_exact_beyond_hot_cache(self):
+        """Test that hashes evicted from the LRU are still caught via the DB."""
+        dedup = TransactionDedup(db=self.db, hot_size=2, expected_items=100)
+        for i in range(10):
+            self.assertTrue(dedup.claim(f'tx{i}'))
+            dedup.record(f'tx{i}', 1.0)
+        self.assertFalse(dedup.claim('tx0'))
+        self.assertGreater(dedup.db_lookups, 0)
+        self.assertTrue(dedup.claim('tx_new'))
+        
+    def test_reload_from_database(self):
+        """Test that a restarted index recognises hashes stored earlier."""
+        dedup = TransactionDedup(db=self.db)
+        dedup.claim('tx1')
+        dedup.record('tx1', 25.0)
+        
+        restarted = TransactionDedup(db=self.db)
+        self.assertIn('tx1', restarted.bloom)  # Seeded on construction
+        self.assertIn('tx1', restarted)
+        self.assertEqual(restarted.recount_volume(), 25.0)
+        
+    def test_replay_after_restart_is_rejected(self):
+        """Test that a deposit replayed to a restarted bank is not credited again."""
+        player = Character('test_user', 'TestWizard')
+        self.assertTrue(make_banking(db=self.db).process_deposit('tx1', player, 10.0)['success'])
+        result = make_banking(db=self.db).process_deposit('tx1', player, 10.0)
+        self.assertEqual(result, {'error': 'Transaction already processed'})
+        self.assertEqual(player.withdrawable_galleons, 10.0)
+        
+    def test_unseeded_filter_checks_database(self):
+        """Test that every miss goes to the DB while the filter could not be seeded."""
+        db = make_test_db()
+        dedup = TransactionDedup(db=db)
+        db.execute(self.PROCESSED_DDL)
+        db.execute(TransactionDedup.INSERT_SQL.replace('%s', '?'), ('tx_old', 5.0, 'processed'))
+        self.assertFalse(dedup.claim('tx_old'))
+        self.assertEqual(dedup.db_lookups, 1)
+        dedup.load()
+        self.assertTrue(dedup.claim('tx_new'))
+        self.assertEqual(dedup.db_lookups, 1)
+        
+    def test_failed_insert_fails_deposit(self):
+        """Test that a deposit whose hash cannot be stored is not credited."""
+        banking = make_banking(db=self.db)
+        self.db.execute("DROP TABLE processed_transactions")
+        player = Character('test_user', 'TestWizard')
+        self.assertIn('error', banking.process_deposit('tx1', player, 10.0))
+        self.assertEqual(player.withdrawable_galleons, 0)
+        self.assertEqual(banking.ledger.balance(player_account('test_user')), 0)
+        self.assertNotIn('tx1', banking.processed_transactions._claimed)
+        
+    def test_concurrent_replay_credits_once(self):
+        """Test that the same deposit submitted concurrently is credited once."""
+        from concurrent.futures import ThreadPoolExecutor
+        banking = make_banking(db=self.db)
+        player = Character('test_user', 'TestWizard')
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(
+                lambda _: banking.process_deposit('tx_replay', player, 10.0), range(8)
+            ))
+        self.assertEqual(sum('success' in result for result in results), 1)
+        self.assertEqual(player.withdrawable_galleons, 10.0)
+        
+    def test_failed_verification_releases_claim(self):
+        """Test that a hash failing verification can be retried later."""
+        chain = FakeChainBackend()
+        banking = make_banking(verifier=TransactionVerifier(chain, negative_ttl=0))
+        player = Character('test_user', 'TestWizard')
+        self.assertIn('error', banking.process_deposit('tx1', player, 10.0))
+        chain.add_transaction('tx1', confirmations=3)
+        self.assertTrue(banking.process_deposit('tx1', player, 10.0)['success'])
+        
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'galleons.ledger')
+        
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        
+    def test_concurrent_records_share_batches(self):
+        """Test that concurrent callers are group-committed."""
+        from concurrent.futures import ThreadPoolExecutor
+        ledger = Ledger(self.path, commit_window=0.02, fsync=False)
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(lambda i: ledger.record('deposit', [(f'player:p{i % 4}', 100)]), range(64)))
+        ledger.close()
+        
+        self.assertLess(ledger.batches_written, 64)
+        self.assertEqual(ledger.balance('player:p0'), 1600)
+        
+    def test_replay_rebuilds_balances(self):
+        """Test that reopening the log restores balances and ignores a torn tail."""
+        ledger = Ledger(self.path, commit_window=0)
+        ledger.record('deposit', [('player:a', 5000)])
+        ledger.record('withdrawal', [('player:a', -1000), ('prize_pool', 20), ('burn_pending', 20)])
+        ledger.close()
+        with open(self.path, 'a') as f:
+            f.write('{"seq":3,"reason":"dep')
+            
+        reopened = Ledger(self.path)
+        self.assertEqual(reopened.balance('player:a'), 4000)
+        self.assertEqual(reopened.balance('prize_pool'), 20)
+        self.assertEqual(reopened.record('deposit', [('player:a', 1)]).seq, 3)
+        reopened.close()
+        
+        with open(self.path) as f:
+            self.assertEqual([json.loads(line)['seq'] for line in f], [1, 2, 3])
+        
+    def test_replay_rejects_corruption_mid_file(self):
+        """Test that only the final line may be unreadable."""
+        ledger = Ledger(self.path, commit_window=0)
+        ledger.record('deposit', [('player:a', 5000)])
+        ledger.record('deposit', [('player:a', 100)])
+        ledger.close()
+        with open(self.path) as f:
+            lines = f.readlines()
+        with open(self.path, 'w') as f:
+            f.writelines(['{"seq":1,"rea\n'] + lines[1:])
+            
+        with self.assertRaises(ValueError):
+            Ledger(self.path)
+            
+    def test_overdraft_is_rejected(self):
+        """Test that a player account cannot go below zero, queued entries included."""
+        ledger = Ledger()
+        ledger.record('deposit', [('player:a', 500)])
+        
+        with self.assertRaises(ValueError):
+            ledger.record('withdrawal', [('player:a', -501), ('prize_pool', 501)])
+        ledger.record('withdrawal', [('player:a', -500), ('prize_pool', 500)])
+        self.assertEqual(ledger.balance('player:a'), 0)
+        self.assertEqual(ledger.balance('prize_pool'), 500)
+        
+    def test_failed_write_is_not_applied(self):
+        """Test that balances only move once an entry is on disk."""
+        ledger = Ledger(self.path, commit_window=0)
+        ledger.record('deposit', [('player:a', 500)])
+        ledger._file.close()
+        
+        with self.assertRaises(ValueError):
+            ledger.record('deposit', [('player:a', 100)])
+        self.assertEqual(ledger.balance('player:a'), 500)
+        with self.assertRaises(ValueError):
+            ledger.record('deposit', [('player:a', 100)])
+        self.assertEqual(Ledger(self.path).balance('player:a'), 500)
+        
+    def test_banking_recovers_from_ledger(self):
+        """Test that balances and the prize pool survive a restart."""
+        ledger = Ledger(self.path, commit_window=0)
+        banking = make_banking(ledger=ledger)
+        player = Character('test_user', 'TestWizard')
+        banking.process_deposit('tx1', player, 100.0)
+        banking.process_withdrawal(player, 33.33)
+        ledger.close()
+        
+        restarted = make_banking(ledger=Ledger(self.path))
+        recovered = Character('test_user', 'TestWizard')
+        restarted.restore_balance(recovered)
+        self.assertEqual(recovered.withdrawable_galleons, 66.67)
+        self.assertEqual(restarted.prize_pool, 0.67)
+        self.assertEqual(restarted.ledger.balance(player_account('TEST_USER')), to_minor(66.67))
+        restarted.ledger.close()
+        
+class TestSettlementOutbox(unittest.TestCase):
+    WITHDRAWALS_DDL = (
+        "CREATE TABLE withdrawal_requests (id INTEGER PRIMARY KEY, twitter_handle TEXT, amount REAL, "
+        "fee REAL, tx_hash TEXT, status TEXT, created_at TEXT, completed_at TEXT, block_number INTEGER)"
+    )
+    
+    def setUp(self):
+        self.now = 0.0
+        self.db = make_test_db(self.WITHDRAWALS_DDL)
+        self.chain = FakeChainBackend()
+        self.ledger = Ledger()
+        self.outbox = self._make_outbox(self.ledger)
+        self.banking = make_banking(ledger=self.ledger, settlement=self.outbox)
+        self.player = Character('test_user', 'TestWizard')
+        fund(self.banking, self.player, 1000.0)
+        
+    def _make_outbox(self, ledger):
+        return SettlementOutbox(
+            ledger, FakeWithdrawalSender(self.chain), verifier=TransactionVerifier(self.chain, negative_ttl=0),
+            db=self.db, batch_size=3, max_delay=30.0, clock=lambda: self.now
+        )
+        
+    def test_batches_by_count_and_age(self):
+        """Test that withdrawals go out in full batches, then by age."""
+        for _ in range(4):
+            self.banking.process_withdrawal(self.player, 50.0)
+        self.assertEqual(asyncio.run(self.outbox.run_once())['sent'], 3)
+        self.assertEqual(self.outbox.sender.batches, [[1, 2, 3]])
+        
+        self.now = 31.0
+        self.assertEqual(asyncio.run(self.outbox.run_once())['sent'], 1)
+        rows = self.db.fetchall("SELECT id, amount, fee, status FROM withdrawal_requests ORDER BY id")
+        self.assertEqual(rows[0], (1, 48.0, 2.0, 'sent'))
+        self.assertEqual(len(rows), 4)
+        
+    def test_confirmations_settle_in_bulk(self):
+        """Test that confirmed withdrawals close their ledger accounts together."""
+        for _ in range(3):
+            self.banking.process_withdrawal(self.player, 50.0)
+        asyncio.run(self.outbox.run_once())
+        self.assertEqual(asyncio.run(self.outbox.confirm()), 0)
+        
+        self.chain.mine(3)
+        self.assertEqual(asyncio.run(self.outbox.confirm()), 3)
+        self.assertEqual(self.outbox.backlog, 0)
+        self.assertFalse(any(account.startswith('withdrawal:') for account in self.ledger.balances))
+        statuses = self.db.fetchall("SELECT DISTINCT status FROM withdrawal_requests")
+        self.assertEqual(statuses, [('confirmed',)])
+        
+    def test_recover_does_not_resend(self):
+        """Test that a restart requeues unsent requests and keeps sent ones."""
+        for _ in range(4):
+            self.banking.process_withdrawal(self.player, 50.0)
+        asyncio.run(self.outbox.run_once())
+        
+        restarted = self._make_outbox(self.ledger)
+        self.assertEqual(restarted.recover(), 4)
+        self.assertEqual([w.id for w in restarted.pending], [4])
+        self.assertEqual(sorted(restarted.sent), [1, 2, 3])
+        self.assertEqual(restarted.next_id(), 5)
+        
+    def test_crash_after_send_pays_once(self):
+        """Test that withdrawals sent without a stored hash are resent under the same key."""
+        sender = FakeWithdrawalSender(self.chain)
+        outbox = SettlementOutbox(self.ledger, sender, verifier=TransactionVerifier(self.chain, negative_ttl=0),
+                                  batch_size=3, clock=lambda: self.now)
+        banking = make_banking(ledger=self.ledger, settlement=outbox)
+        for _ in range(3):
+            banking.process_withdrawal(self.player, 50.0)
+        asyncio.run(outbox.run_once())
+        hashes = dict(sender.paid)
+        
+        # No database, so only the ledger knows these were handed to the sender
+        restarted = SettlementOutbox(self.ledger, sender, verifier=outbox.verifier, clock=lambda: self.now)
+        self.assertEqual(restarted.recover(), 3)
+        self.assertEqual({w.status for w in restarted.pending}, {'sending'})
+        self.assertEqual(asyncio.run(restarted.dispatch(force=True)), 3)
+        self.assertEqual(sender.paid, hashes)
+        self.assertEqual({w.tx_hash for w in restarted.sent.values()}, set(hashes.values()))
+        
+    def test_reverted_payout_is_refunded(self):
+        """Test that a payout reverting on chain returns its amount to the player."""
+        refunds = []
+        self.outbox.refund_listeners.append(lambda handle, amount: refunds.append((handle, amount)))
+        self.banking.process_withdrawal(self.player, 50.0)
+        asyncio.run(self.outbox.dispatch(force=True))
+        self.chain.revert(self.outbox.sent[1].tx_hash)
+        balance = self.ledger.balance(player_account('test_user'))
+        
+        self.assertEqual(asyncio.run(self.outbox.confirm()), 0)
+        self.assertEqual(refunds, [('test_user', to_minor(48.0))])
+        self.assertEqual(self.ledger.balance(player_account('test_user')), balance + to_minor(48.0))
+        self.assertEqual(self.outbox.backlog, 0)
+        self.assertEqual(self.db.fetchall("SELECT status FROM withdrawal_requests"), [('reverted',)])
+        
+class TestPlayerStore(unittest.TestCase):
+    PLAYERS_DDL = (
+        "CREATE TABLE players (twitter_handle TEXT PRIMARY KEY, name TEXT, house TEXT, level INTEGER, "
+        "xp INTEGER, hp INTEGER, max_hp INTEGER, bonus_galleons REAL, withdrawable_galleons REAL, spells TEXT, "
+        "potions TEXT, wins INTEGER, losses INTEGER, titles TEXT, created_at TEXT)"
+    )
+    
+    def setUp(self):
+        self.db = make_test_db(self.PLAYERS_DDL)
+        self.store = PlayerStore(self.db)
+        self.winner = Character('winner', 'Winner')
+        self.loser = Character('loser', 'Loser')
+        self.store.insert(self.winner)
+        self.store.insert(self.loser)
+        
+    def test_only_changed_columns_are_written(self):
+        """Test that a duel result writes just the touched columns."""
+        self.winner.wins += 1
+        self.winner.xp += 20
+        self.assertEqual(self.winner.dirty_columns, ['xp', 'wins'])
+        self.assertEqual(self.winner.take_changes(), {'xp': 20, 'wins': 1})
+        self.assertFalse(self.winner.has_changes)
+        
+        self.winner.spells = self.winner.spells  # Same spellbook: nothing to write
+        self.assertFalse(self.winner.has_changes)
+        self.winner.add_potion('Healing Potion')
+        self.assertEqual(self.winner.take_changes(), {'potions': '{"Healing Potion": 1}'})
+        
+    def test_flush_coalesces_and_batches(self):
+        """Test that repeated changes collapse and same-shape rows share a statement."""
+        for _ in range(3):
+            self.winner.wins += 1
+            self.store.mark(self.winner)
+        self.loser.wins += 1
+        self.store.mark(self.loser)
+        
+        self.assertEqual(self.store.flush(), 2)
+        self.assertEqual(self.store.statements, 1)
+        self.assertEqual(self.store.load('winner').wins, 3)
+        self.assertEqual(self.store.load('loser').wins, 1)
+        self.assertEqual(self.store.flush(), 0)
+        
+    def test_mark_takes_changes_on_the_owning_thread(self):
+        """Test that a flush writes what was marked, not later unmarked changes."""
+        self.winner.wins += 1
+        self.store.mark(self.winner)
+        self.assertFalse(self.winner.has_changes)
+        self.winner.wins += 1  # Mid-command on the owning shard; not marked yet
+        
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store.load('winner').wins, 1)
+        self.assertEqual(self.winner.dirty_columns, ['wins'])
+        
+    def test_failed_flush_keeps_newer_changes(self):
+        """Test that a failed write is requeued beneath changes marked since."""
+        self.winner.wins, self.winner.xp = 1, 10
+        self.store.mark(self.winner)
+        self.db.execute("ALTER TABLE players RENAME TO players_moved")
+        self.assertEqual(self.store.flush(), 0)
+        self.db.execute("ALTER TABLE players_moved RENAME TO players")
+        self.winner.wins = 2
+        self.store.mark(self.winner)
+        
+        self.assertEqual(self.store.flush(), 1)
+        stored = self.store.load('winner')
+        self.assertEqual((stored.wins, stored.xp), (2, 10))
+        
+    def test_flush_on_interval_and_close(self):
+        """Test that queued changes are written on a timer and at shutdown."""
+        now = [0.0]
+        store = PlayerStore(self.db, flush_interval=5, clock=lambda: now[0])
+        self.winner.wins = 1
+        store.mark(self.winner)
+        
+        self.assertEqual(store.maybe_flush(), 0)
+        now[0] = 5.0
+        self.assertEqual(store.maybe_flush(), 1)
+        self.loser.wins = 1
+        store.mark(self.loser)
+        self.assertEqual(store.close(), 1)
+        self.assertEqual(self.store.load('loser').wins, 1)
+        
+    def test_wizards_survive_restart(self):
+        """Test that a restarted handler reads saved wizards back on first use."""
+        ledger = Ledger()
+        handler = CommandHandler(make_banking(ledger=ledger), store=self.store)
+        handler.handle_command('create', ['Merlin'], 'Merlin_Fan')
+        handler.banking.process_deposit('tx1', handler.get_player('merlin_fan'), 30.0)
+        handler.handle_command('p', [], 'merlin_fan')
+        self.store.flush()
+        handler.executor.shutdown()
+        
+        restarted = CommandHandler(make_banking(ledger=ledger), store=PlayerStore(self.db))
+        profile = restarted.handle_command('profile', [], 'Merlin_Fan')
+        
+        self.assertEqual((profile['name'], profile['withdrawable_galleons']), ('Merlin', 30.0))
+        self.assertEqual(restarted.handle_command('create', ['Merlin'], 'Merlin_Fan'),
+                         {'error': 'You already have a wizard'})
+        self.assertIs(restarted.get_player('@merlin_fan'), restarted.get_player('Merlin_Fan'))
+        self.assertEqual(restarted.leaderboard.rank('merlin_fan'), 1)
+        self.assertIsNone(restarted.get_player('nobody'))
+        restarted.executor.shutdown()
+        
+    def test_commands_mark_changed_players(self):
+        """Test that the command handler queues players its commands change."""
+        handler = CommandHandler(make_banking(), store=self.store)
+        handler.handle_command('create', ['Merlin'], 'merlin_fan')
+        self.assertEqual(self.store.load('merlin_fan').name, 'Merlin')
+        
+        handler.banking.process_deposit('tx1', handler.get_player('merlin_fan'), 100.0)
+        handler.handle_command('withdraw', ['50'], 'merlin_fan')
+        self.assertEqual(self.store.flush(), 1)
+        self.assertEqual(self.store.load('merlin_fan').withdrawable_galleons, 50.0)
+        handler.executor.shutdown()
+        
+@unittest.skipUnless(numpy, 'numpy is required for the duel simulator')
+class TestDuelSimulator(unittest.TestCase):
+    def test_agrees_with_scalar_combat(self):
+        """Test that vectorized duels match Combat within statistical tolerance."""
+        house1, house2 = simulator.HOUSES.index('Slytherin'), simulator.HOUSES.index('Hufflepuff')
+        result = simulator.DuelSimulator(seed=7).run(house1, 1, house2, 2, n=20000)
+        
+        random.seed(7)
+        scalar = [simulator.play_scalar_duel('Slytherin', 1, 'Hufflepuff', 2) for _ in range(1500)]
+        scalar_wins = sum(winner == 1 for winner, _ in scalar) / len(scalar)
+        scalar_turns = sum(turns for _, turns in scalar) / len(scalar)
+        
+        self.assertAlmostEqual(result.p1_win_rate, scalar_wins, delta=0.05)
+        self.assertAlmostEqual(result.turns.mean(), scalar_turns, delta=3)
+        self.assertEqual(result.draw_rate, 0.0)
+        self.assertGreater(result.effects['stun'], 0)
+        
+    def test_matchup_table(self):
+        """Test that every house/level pairing is reported."""
+        table = simulator.DuelSimulator(seed=1).matchup_table(levels=(1, 3), n=200)
+        self.assertEqual(len(table), 64)
+        summary = table[('Gryffindor', 3, 'Ravenclaw', 1)]
+        self.assertEqual(summary['duels'], 200)
+        self.assertGreater(summary['p1_win_rate'], 0.9)
+        
+class TestDuelJournal(unittest.TestCase):
+    def setUp(self):
+        self.db = make_test_db(
+            "CREATE TABLE active_duels (id INTEGER PRIMARY KEY, player1 TEXT, player2 TEXT, "
+            "bet_amount REAL, status TEXT, turn TEXT, hp1 INTEGER, hp2 INTEGER, seed INTEGER, "
+            "level1 INTEGER, level2 INTEGER, house1 TEXT, house2 TEXT, start_hp1 INTEGER, start_hp2 INTEGER)",
+            "CREATE TABLE duel_events (duel_id INTEGER, turn INTEGER, caster TEXT, spell TEXT, "
+            "PRIMARY KEY (duel_id, turn))"
+        )
+        self.handler = CommandHandler(make_banking(), duel_log=DuelJournal(self.db))
+        for handle in ('alice', 'bob'):
+            self.handler.handle_command('create', [handle.title()], handle)
+            self.handler.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), 5.0)
+        
+    def test_recover_duel_after_restart(self):
+        """Test that a journaled duel resumes in a new handler from its events."""
+        duel_id = self.handler.handle_command('duel', ['@bob', '5'], 'alice')['duel_id']
+        self.handler.handle_command('cast', ['incendio'], 'alice')
+        self.handler.handle_command('cast', ['protego'], 'bob')
+        expected = self.handler.active_duels[duel_id].to_dict()
+        
+        # A fresh handler with the same players and journal, as after a crash
+        restarted = CommandHandler(make_banking(), duel_log=DuelJournal(self.db))
+        restarted.players = self.handler.players
+        recovery = make_state_recovery(duel_log=restarted.duel_log, command_handler=restarted)
+        result = recovery.recover_duel(duel_id)
+        missing = recovery.recover_duel(duel_id + 1)
+        
+        self.assertEqual(result['events_replayed'], 2)
+        self.assertEqual(result['duel'], expected)
+        self.assertEqual(missing['code'], 'DUEL_NOT_FOUND')
+        self.assertEqual(self.db.fetchone("SELECT COUNT(*) FROM duel_events")[0], 2)
+        self.assertEqual(restarted.handle_command('duel', ['@alice', '5'], 'bob'), {'error': 'Already in a duel'})
+        self.assertNotIn('error', restarted.handle_command('cast', ['incendio'], 'alice'))
+        self.assertEqual(next(restarted._duel_ids), duel_id + 1)
+        
+    def test_replay_uses_stats_from_the_start(self):
+        """Test that level-ups and re-sorting after the start do not change a replay."""
+        alice, bob = self.handler.get_player('alice'), self.handler.get_player('bob')
+        alice.house, bob.house = 'Slytherin', 'Gryffindor'
+        duel_id = self.handler.handle_command('duel', ['@bob', '5'], 'alice')['duel_id']
+        for _ in range(6):
+            self.handler.handle_command('cast', ['incendio'], 'alice')
+            self.handler.handle_command('cast', ['incendio'], 'bob')
+        expected = self.handler.active_duels[duel_id].to_dict()
+        
+        alice.grant_xp(650)
+        alice.house, bob.house = 'Hufflepuff', 'Ravenclaw'
+        restarted = CommandHandler(make_banking(), duel_log=DuelJournal(self.db))
+        restarted.players = self.handler.players
+        result = make_state_recovery(duel_log=restarted.duel_log, command_handler=restarted).recover_duel(duel_id)
+        
+        self.assertEqual(result['duel'], expected)
+        self.assertEqual(restarted.active_duels[duel_id].levels, (1, 1))
+
+class TestDuelTimeouts(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        self.handler = CommandHandler(make_banking(), clock=lambda: self.now)
+        for handle in ('alice', 'bob'):
+            self.handler.handle_command('create', [handle.title()], handle)
+            self.handler.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), 5.0)
+        self.duel_id = self.handler.handle_command('duel', ['@bob', '5'], 'alice')['duel_id']
+        
+    def test_cast_restarts_clock(self):
+        """Test that a duel only times out five minutes after its last cast."""
+        self.now += 200
+        self.handler.handle_command('cast', ['incendio'], 'alice')
+        self.now += 200
+        self.assertEqual(self.handler.expire_duels(), [])
+        self.now += 101
+        self.assertEqual(self.handler.expire_duels()[0]['duel_id'], self.duel_id)
+        self.assertEqual(len(self.handler.duels), 0)
+        self.assertEqual(len(self.handler.duels.deadlines), 0)
+        
+    def test_stalled_player_forfeits(self):
+        """Test that a player who stops mid-duel loses and the opponent is paid."""
+        alice, bob = self.handler.get_player('alice'), self.handler.get_player('bob')
+        self.handler.handle_command('cast', ['protego'], 'alice')
+        self.handler.handle_command('cast', ['protego'], 'bob')
+        self.now += 301
+        
+        result = self.handler.expire_duels()
+        self.assertEqual(result, [{'duel_id': self.duel_id, 'status': 'player2_wins', 'forfeited': 'alice'}])
+        self.assertEqual((bob.wins, alice.losses), (1, 1))
+        self.assertEqual(bob.withdrawable_galleons, 10.0)
+        self.assertIsNone(self.handler._current_duel(alice))
+        
+    def test_unanswered_challenge_is_cancelled(self):
+        """Test that a duel the opponent never joined ends without rewards and refunds both stakes."""
+        self.handler.handle_command('cast', ['incendio'], 'alice')
+        self.now += 301
+        
+        result = self.handler.expire_duels()
+        self.assertEqual(result[0]['status'], 'cancelled')
+        self.assertIsNone(result[0]['forfeited'])
+        self.assertEqual(self.handler.get_player('alice').wins, 0)
+        self.assertEqual(self.handler.get_player('alice').withdrawable_galleons, 5.0)
+        self.assertEqual(self.handler.banking.ledger.balance(escrow_account(self.duel_id)), 0)
+        self.assertNotIn('error', self.handler.handle_command('duel', ['@bob', '5'], 'alice'))
+
+class TestDuelStakes(unittest.TestCase):
+    def setUp(self):
+        self.handler = CommandHandler(make_banking())
+        for handle, deposit in (('alice', 30.0), ('bob', 20.0)):
+            self.handler.handle_command('create', [handle.title()], handle)
+            self.handler.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), deposit)
+        self.alice, self.bob = self.handler.get_player('alice'), self.handler.get_player('bob')
+        
+    def test_stake_above_balance_is_rejected(self):
+        """Test that neither player can stake more than their withdrawable balance."""
+        result = self.handler.handle_command('duel', ['@bob', '25'], 'alice')
+        self.assertIn('error', result)
+        self.assertEqual((self.alice.withdrawable_galleons, self.bob.withdrawable_galleons), (30.0, 20.0))
+        self.assertIsNone(self.handler._current_duel(self.alice))
+        
+    def test_duel_keeps_combined_balance(self):
+        """Test that stakes move through escrow, so a duel mints no Galleons."""
+        duel_id = self.handler.handle_command('duel', ['@bob', '15'], 'alice')['duel_id']
+        escrow = escrow_account(duel_id)
+        self.assertEqual((self.alice.withdrawable_galleons, self.bob.withdrawable_galleons), (15.0, 5.0))
+        self.assertEqual(self.handler.banking.ledger.balance(escrow), to_minor(30.0))
+        
+        self.handler.active_duels[duel_id].hp2 = 1
+        self.handler.handle_command('cast', ['incendio'], 'alice')
+        self.assertEqual((self.alice.withdrawable_galleons, self.bob.withdrawable_galleons), (45.0, 5.0))
+        self.assertEqual(self.alice.withdrawable_galleons + self.bob.withdrawable_galleons, 50.0)
+        self.assertEqual(self.handler.banking.ledger.balance(escrow), 0)
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.handler = CommandHandler(make_banking(), admins=('admin',))
+        self.handler.banking.prize_pool = 5000.0
+        for i in range(10):
+            self.handler.handle_command('create', [f'Wizard{i}'], f'player{i}')
+        
+    def test_bracket_with_byes(self):
+        """Test that byes advance and each round's players come from the last."""
+        tournament = Tournament(1, rng=random.Random(7))
+        for i in range(10):
+            self.assertTrue(tournament.join(f'player{i}')['success'])
+        self.assertEqual(tournament.join('PLAYER3'), {'error': 'Already registered'})
+        self.assertEqual(tournament.start()['rounds'], 4)
+        
+        first = tournament.matches(0)
+        self.assertEqual(len(first), 8)
+        self.assertEqual(sum(m['status'] == 'ready' for m in first), 2)
+        self.assertTrue(all(m['player1'] for m in first))
+        for match in first:
+            if match['status'] == 'ready':
+                tournament.record(tournament.node_for(match['id']), match['player2'])
+        self.assertEqual(tournament.current_round, 1)
+        second = tournament.matches(1)
+        self.assertEqual({m['player1'] for m in second} | {m['player2'] for m in second},
+                         {m['winner'] for m in tournament.matches(0)})
+        
+    def test_tournament_commands(self):
+        """Test create, join, matches and process_match through to payouts."""
+        tournament_id = self.handler.handle_command('t', ['create'], 'admin')['tournament_id']
+        for i in range(10):
+            self.handler.handle_command('t', ['join'], f'player{i}')
+        self.assertEqual(self.handler.handle_command('t', ['create'], 'player1'),
+                         {'error': 'Unknown tournament command'})
+        self.assertEqual(CommandHandler(make_banking()).handle_command('t', ['create'], 'admin'),
+                         {'error': 'Unknown tournament command'})  # No admins unless configured
+        self.assertEqual(self.handler.handle_command('t', ['matches'], 'admin')['matches'], [])
+        self.assertEqual(self.handler.handle_command('t', ['start'], 'admin')['rounds'], 4)
+        
+        for round_num in range(4):
+            matches = self.handler.handle_command('t', ['matches', str(round_num)], 'admin')['matches']
+            for match in matches:
+                if match['status'] == 'ready':
+                    result = self.handler.handle_command('t', ['process_match', str(match['id'])], 'admin')
+                    self.assertTrue(result['success'])
+        
+        status = self.handler.handle_command('t', ['status'], 'player0')
+        self.assertEqual((status['tournament_id'], status['status']), (tournament_id, 'finished'))
+        payouts = result['prizes']['payouts']
+        self.assertEqual(list(payouts), result['placings'])
+        self.assertEqual(list(payouts.values()), [250.0, 150.0, 50.0, 50.0])
+        champion = self.handler.get_player(status['champion'])
+        self.assertEqual(champion.withdrawable_galleons, 250.0)
+        self.assertGreaterEqual(champion.level, 2)  # At least three 50 XP wins
+        
+    def test_play_round_runs_matches_on_shards(self):
+        """Test that play_round resolves every ready match of the round."""
+        for i in range(8):
+            self.handler.handle_command('t', ['join'], f'player{i}')
+        results = self.handler.play_round()
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(r['success'] for r in results))
+        self.assertEqual(sum(r['round_complete'] for r in results), 1)
+        self.assertEqual(self.handler.current_tournament.current_round, 1)
+
+class TestHouseCup(unittest.TestCase):
+    def test_round_robin_pairs_everyone_once(self):
+        """Test that the circle method meets every pair once, one match per round."""
+        for count in (6, 7):
+            players = [f'w{i}' for i in range(count)]
+            rounds = list(round_robin(players))
+            pairs = [frozenset(pair) for pairings in rounds for pair in pairings]
+            self.assertEqual(len(rounds), count - 1 if count % 2 == 0 else count)
+            self.assertEqual(len(pairs), count * (count - 1) // 2)
+            self.assertEqual(len(set(pairs)), len(pairs))
+            for pairings in rounds:
+                seated = [player for pair in pairings for player in pair]
+                self.assertEqual(len(seated), len(set(seated)))
+        
+    def test_cup_streams_matches_and_keeps_standings(self):
+        """Test a cup played in batches against its running aggregates."""
+        handler = CommandHandler(make_banking(), admins=('admin',))
+        for i in range(12):
+            handler.handle_command('create', [f'Wizard{i}'], f'player{i}')
+            handler.get_player(f'player{i}').house = Character.HOUSES[i % 2]
+        self.assertEqual(handler.handle_command('t', ['cup', 'start'], 'admin')['matches'], 30)
+        
+        batches = 0
+        while handler.play_house_cup(batch_size=4):
+            batches += 1
+        self.assertEqual(batches, 8)
+        
+        status = handler.handle_command('t', ['cup'], 'player0')
+        self.assertTrue(status['finished'])
+        for house in Character.HOUSES[:2]:
+            standings = handler.house_cup.standings(house)
+            self.assertEqual(sum(row['wins'] for row in standings), 15)
+            self.assertEqual(standings[0]['wins'], status['houses'][house]['leader_wins'])
+
+class TestTournamentRecovery(unittest.TestCase):
+    def setUp(self):
+        self.db = make_test_db(
+            "CREATE TABLE tournament_checkpoints (tournament_id INTEGER, round INTEGER, state TEXT, "
+            "PRIMARY KEY (tournament_id, round))",
+            "CREATE TABLE tournament_matches (tournament_id INTEGER, node INTEGER, winner TEXT, "
+            "loser TEXT, PRIMARY KEY (tournament_id, node))"
+        )
+        self.handler = self._handler()
+        for i in range(16):
+            self.handler.handle_command('create', [f'Wizard{i}'], f'player{i}')
+            self.handler.handle_command('t', ['join'], f'player{i}')
+        self.tournament = self.handler.current_tournament
+        
+    def _handler(self):
+        banking = make_banking()
+        banking.prize_pool = 5000.0
+        return CommandHandler(banking, tournament_log=TournamentJournal(self.db), admins=('admin',))
+        
+    def _restart(self):
+        restarted = self._handler()
+        restarted.players = self.handler.players
+        recovery = make_state_recovery(tournament_log=restarted.tournament_log, command_handler=restarted)
+        return restarted, recovery.recover_tournament(self.tournament.id)
+        
+    def test_resume_from_checkpoint_and_tail(self):
+        """Test that a restart mid-round rebuilds the bracket and play continues."""
+        self.handler.play_round()
+        for match in self.handler.handle_command('t', ['matches', '1'], 'admin')['matches'][:3]:
+            self.handler.handle_command('t', ['process_match', str(match['id'])], 'admin')
+        
+        restarted, result = self._restart()
+        self.assertEqual(result['matches_replayed'], 3)
+        self.assertEqual(result['round'], 1)
+        recovered = restarted.current_tournament
+        self.assertEqual(recovered.tree, self.tournament.tree)
+        self.assertEqual(next(restarted._tournament_ids), self.tournament.id + 1)
+        while recovered.status == 'running':
+            restarted.play_round()
+        self.assertTrue(recovered.prizes_paid)
+        
+    def test_owed_prizes_paid_on_resume(self):
+        """Test that a crash between the final and its payout pays out on resume."""
+        while self.tournament.status != 'finished':
+            self.handler.play_round()
+        self.db.execute("DELETE FROM tournament_checkpoints WHERE round = %s" % self.tournament.rounds)
+        
+        restarted, result = self._restart()
+        self.assertEqual(result['status'], 'finished')
+        self.assertEqual(result['matches_replayed'], 1)
+        self.assertEqual(list(result['prizes']['payouts']), self.tournament.placings())
+        self.assertTrue(restarted.current_tournament.prizes_paid)
+        self.assertIsNone(restarted.resume_tournament(restarted.current_tournament))
+        
+    def test_open_ids_until_prizes_paid(self):
+        """Test that a tournament is listed for recovery until its prizes are paid."""
+        journal = self.handler.tournament_log
+        self.handler.play_round()
+        self.assertEqual(journal.open_ids(), [self.tournament.id])
+        while self.tournament.status != 'finished':
+            self.handler.play_round()
+        self.assertTrue(self.tournament.prizes_paid)
+        self.assertEqual(journal.open_ids(), [])
+
+class TestIndexableSkipList(unittest.TestCase):
+    def test_matches_sorted_list(self):
+        """Test ranks, positions and slices against a plain sorted list."""
+        rng = random.Random(3)
+        skiplist, reference = IndexableSkipList(seed=3), set()
+        for _ in range(3000):
+            key = rng.randrange(500)
+            if rng.random() < 0.6:
+                self.assertEqual(skiplist.add(key), key not in reference)
+                reference.add(key)
+            else:
+                self.assertEqual(skiplist.remove(key), key in reference)
+                reference.discard(key)
+        ordered = sorted(reference)
+        self.assertEqual(list(skiplist), ordered)
+        self.assertEqual([skiplist.index(key) for key in ordered], list(range(len(ordered))))
+        self.assertEqual(skiplist[len(ordered) // 2], ordered[len(ordered) // 2])
+        self.assertEqual(skiplist.slice(10, 20), ordered[10:20])
+
+class TestLeaderboard(unittest.TestCase):
+    def setUp(self):
+        self.handler = CommandHandler(make_banking())
+        for i in range(6):
+            self.handler.handle_command('create', [f'Wizard{i}'], f'player{i}')
+        
+    def test_duel_results_rerank_live(self):
+        """Test that a finished duel moves the winner up without a rebuild."""
+        for handle in ('player4', 'player1'):
+            self.handler.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), 5.0)
+        self.handler.handle_command('duel', ['@player1', '5'], 'player4')
+        self.handler.active_duels[1].hp2 = 1
+        self.handler.handle_command('cast', ['incendio'], 'player4')
+        
+        result = self.handler.handle_command('lb', [], 'player1')
+        self.assertEqual(result['top'][0]['handle'], 'player4')
+        self.assertEqual(result['rank'], 6)  # Ties on wins break on fewer losses
+        self.assertEqual([row['rank'] for row in result['around']], [4, 5, 6])
+        self.assertEqual(self.handler.leaderboard.rank('player4', 'level'), 1)
+        self.assertIn('error', self.handler.handle_command('lb', ['s'], 'player1'))
+        
+    def test_rebuild_from_players_table(self):
+        """Test that load ranks stored wizards like the live index."""
+        store = PlayerStore(make_test_db(
+            "CREATE TABLE players (twitter_handle TEXT PRIMARY KEY, name TEXT, house TEXT, level INTEGER, "
+            "xp INTEGER, hp INTEGER, max_hp INTEGER, bonus_galleons REAL, withdrawable_galleons REAL, spells TEXT, "
+            "potions TEXT, wins INTEGER, losses INTEGER, titles TEXT)"
+        ))
+        for player in self.handler.players.values():
+            player.withdrawable_galleons = float(len(player.name) + player.wins)
+            player.wins = int(player.twitter_handle[-1]) % 3
+            store.insert(player)
+            self.handler.leaderboard.update(player)
+        
+        rebuilt = Leaderboard()
+        self.assertEqual(rebuilt.load(store.db), 6)
+        for board in ('wins', 'level', 'galleons'):
+            self.assertEqual([row['handle'] for row in rebuilt.top(board)],
+                             [row['handle'] for row in self.handler.leaderboard.top(board)])
+        
+    def test_loaded_leaderboard_wizards_can_play(self):
+        """Test that wizards ranked on a leaderboard rebuilt at startup can use commands."""
+        db = make_test_db(
+            "CREATE TABLE players (twitter_handle TEXT PRIMARY KEY, name TEXT, house TEXT, level INTEGER, "
+            "xp INTEGER, hp INTEGER, max_hp INTEGER, bonus_galleons REAL, withdrawable_galleons REAL, "
+            "spells TEXT, potions TEXT, wins INTEGER, losses INTEGER, titles TEXT)"
+        )
+        store = PlayerStore(db)
+        for player in self.handler.players.values():
+            store.insert(player)
+        leaderboard = Leaderboard()
+        leaderboard.load(db)
+        
+        restarted = CommandHandler(make_banking(), store=PlayerStore(db), leaderboard=leaderboard)
+        for row in leaderboard.top('wins'):
+            profile = restarted.handle_command('profile', [], row['handle'])
+            self.assertEqual(profile['name'], row['name'])
+        self.assertEqual(len(restarted.leaderboard), 6)
+        restarted.executor.shutdown()
+        
+    def test_handler_uses_a_given_empty_leaderboard(self):
+        """Test that a leaderboard loaded with no wizards is still the one used."""
+        leaderboard = Leaderboard()
+        handler = CommandHandler(make_banking(), leaderboard=leaderboard)
+        handler.handle_command('create', ['Merlin'], 'merlin_fan')
+        
+        self.assertIs(handler.leaderboard, leaderboard)
+        self.assertEqual(leaderboard.rank('merlin_fan'), 1)
+        handler.executor.shutdown()
+
+class TestHouseStandings(unittest.TestCase):
+    def setUp(self):
+        self.handler = CommandHandler(make_banking())
+        for i in range(4):
+            self.handler.handle_command('create', [f'Wizard{i}'], f'player{i}')
+            self.handler.get_player(f'player{i}').house = Character.HOUSES[i % 2]
+            self.handler._mark_changed((f'player{i}',))
+        self.standings = self.handler.house_standings
+        
+    def test_duel_end_updates_house_totals(self):
+        """Test that wins, XP and winnings land on the winner's house in place."""
+        house = self.handler.get_player('player0').house
+        for handle in ('player0', 'player1'):
+            self.handler.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), 5.0)
+        self.handler.handle_command('duel', ['@player1', '5'], 'player0')
+        self.handler.active_duels[1].hp2 = 1
+        self.handler.handle_command('cast', ['incendio'], 'player0')
+        
+        totals = self.standings.totals[house]
+        self.assertEqual((totals['members'], totals['wins'], totals['xp']), (2, 1, 20))
+        self.assertEqual(totals['galleons_won'], to_minor(10.0))
+        self.assertEqual(self.standings.totals[self.handler.get_player('player1').house]['xp'], 10)
+        
+        houses = self.handler.handle_command('lb', ['h'], 'player2')['houses']
+        self.assertEqual(houses[0]['house'], house)
+        self.assertEqual(houses[0]['galleons_won'], 10.0)
+        
+    def test_house_change_moves_member(self):
+        """Test that a wizard's totals follow them to a new house."""
+        player = self.handler.get_player('player2')
+        player.wins = 3
+        self.standings.observe(player)
+        old_house, player.house = player.house, Character.HOUSES[3]
+        self.standings.observe(player)
+        self.assertEqual(self.standings.totals[old_house]['wins'], 0)
+        self.assertEqual(self.standings.totals[old_house]['members'], 1)
+        self.assertEqual(self.standings.totals[player.house]['wins'], 3)
+        
+    def test_snapshot_and_load(self):
+        """Test that a restart restores the totals from players and the snapshot."""
+        db = make_test_db(
+            "CREATE TABLE house_standings (house TEXT PRIMARY KEY, members INTEGER, wins INTEGER, "
+            "xp INTEGER, tournament_points INTEGER, galleons_won REAL)",
+            "CREATE TABLE players (twitter_handle TEXT, house TEXT, level INTEGER, xp INTEGER, wins INTEGER)"
+        )
+        self.standings.db = db
+        placings = [self.handler.get_player(f'player{i}') for i in range(4)]
+        self.standings.record_placings(placings)
+        for player in placings:
+            player.wins = 2
+            db.execute("INSERT INTO players VALUES (%s, %s, %s, %s, %s)",
+                       (player.twitter_handle, player.house, player.level, player.xp, player.wins))
+            self.handler._mark_changed((player.twitter_handle,))
+        self.assertTrue(self.standings.snapshot())
+        
+        restored = HouseStandings(db)
+        self.assertEqual(restored.load(), 4)
+        self.assertEqual(restored.standings(), self.standings.standings())
+        self.assertEqual(restored.standings()[0]['tournament_points'], 5)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
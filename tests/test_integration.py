@@ -1,12 +1,20 @@
+import asyncio
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from game_logic.character import Character
 from game_logic.combat import Combat
 from game_logic.banking import BankingSystem
-from game_logic.command_handler import CommandHandler
+from game_logic.command_handler import CommandHandler, parse_tweet
+from game_logic.settlement import FakeWithdrawalSender
+from game_logic.verification import FakeChainBackend, TransactionVerifier
+from utils.rate_limiter import RateLimiter
+from utils.replies import format_reply
+from utils.pipeline import Pipeline, Stage, StageConfig, DROP_NEWEST, build_mention_pipeline
 
 class TestGameFlows(unittest.TestCase):
     def setUp(self):
-        self.banking = BankingSystem()
+        self.banking = BankingSystem(TransactionVerifier(FakeChainBackend(default_confirmations=3)),
+                                     sender=FakeWithdrawalSender())
         self.command_handler = CommandHandler(self.banking)
         
     def test_full_duel_flow(self):
@@ -26,6 +34,10 @@ class TestGameFlows(unittest.TestCase):
         self.assertTrue(create_result1['success'])
         self.assertTrue(create_result2['success'])
         
+        # Fund both stakes
+        for handle in ('player1', 'player2'):
+            self.banking.process_deposit(f'tx_{handle}', self.command_handler.get_player(handle), 50.0)
+        
         # Start duel
         duel_result = self.command_handler.handle_command(
             'duel',
@@ -69,7 +81,7 @@ class TestGameFlows(unittest.TestCase):
         # Process deposit
         deposit_result = self.banking.process_deposit(
             'test_tx_hash',
-            Character('player1', 'Wizard1'),
+            self.command_handler.get_player('player1'),
             100.0
         )
         
@@ -152,9 +164,10 @@ class TestGameFlows(unittest.TestCase):
         self.assertIn('error', cast_result)
         
     def test_concurrent_operations(self):
-        """Test handling of concurrent operations."""
-        # Create character
-        create_result = self.command_handler.handle_command(
+        """Test that concurrent withdrawals by one player are serialized."""
+        # No limits, so only per-player ordering can stop the double spend
+        command_handler = CommandHandler(self.banking, rate_limiter=RateLimiter(limits={}))
+        create_result = command_handler.handle_command(
             'create',
             ['Wizard1'],
             'player1'
@@ -162,25 +175,160 @@ class TestGameFlows(unittest.TestCase):
         
         self.assertTrue(create_result['success'])
         
-        # Simulate concurrent withdrawals
-        # In a real implementation, this would use threading/async
-        withdraw1 = self.command_handler.handle_command(
-            'withdraw',
-            ['50'],
-            'player1'
+        # Fund exactly one withdrawal
+        self.banking.process_deposit(
+            'test_tx_hash',
+            command_handler.get_player('player1'),
+            50.0
         )
         
-        withdraw2 = self.command_handler.handle_command(
-            'withdraw',
-            ['50'],
-            'player1'
-        )
+        # Submit the withdrawals concurrently
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [
+                executor.submit(
+                    command_handler.handle_command,
+                    'withdraw',
+                    ['50'],
+                    'player1'
+                )
+                for _ in range(8)
+            ]
+            results = [future.result() for future in futures]
         
-        # One should succeed, one should fail
-        self.assertTrue(
-            (withdraw1.get('success') and 'error' in withdraw2) or
-            (withdraw2.get('success') and 'error' in withdraw1)
+        # Exactly one should succeed; the rest find the balance spent
+        self.assertEqual(sum(1 for result in results if result.get('success')), 1)
+        self.assertEqual(
+            [result['error'] for result in results if 'error' in result],
+            ['Insufficient balance'] * 7
         )
+        self.assertEqual(command_handler.get_player('player1').withdrawable_galleons, 0)
+        
+    def test_banking_rate_limit(self):
+        """Test that a second banking command within a minute is rejected."""
+        self.command_handler.handle_command('create', ['Wizard1'], 'player1')
+        self.banking.process_deposit('test_tx_hash', self.command_handler.get_player('player1'), 100.0)
+        
+        first = self.command_handler.handle_command('withdraw', ['50'], 'player1')
+        second = self.command_handler.handle_command('withdraw', ['50'], 'player1')
+        
+        self.assertTrue(first['success'])
+        self.assertEqual(second['code'], 429)
+        self.assertGreater(second['retry_after'], 0)
+        self.assertEqual(self.command_handler.get_player('player1').withdrawable_galleons, 50.0)
+        
+    def test_rate_limited_commands(self):
+        """Test that spam is rejected with a retry hint."""
+        self.command_handler.handle_command('create', ['Wizard1'], 'player1')
+        results = [
+            self.command_handler.handle_command('tokenomics', [], 'player1')
+            for _ in range(6)
+        ]
+        
+        self.assertEqual(results[-1]['code'], 429)
+        self.assertGreater(results[-1]['retry_after'], 0)
+        self.assertTrue(all('prize_pool' in result for result in results[:5]))
+        
+class TestCommandParsing(unittest.TestCase):
+    def test_duel_shorthand(self):
+        """Test parsing of the duel shorthand into typed fields."""
+        command = parse_tweet('@WizardsOfX d @MoonMage 50')
+        self.assertEqual(command.name, 'duel')
+        self.assertEqual(command.target, 'MoonMage')
+        self.assertEqual(command.amount, 50.0)
+        
+    def test_case_insensitive(self):
+        """Test that command words are matched case-insensitively."""
+        self.assertEqual(parse_tweet('@wizardsofx WITHDRAW 100').name, 'withdraw')
+        self.assertEqual(parse_tweet('T join').args, ('join',))
+        self.assertEqual(parse_tweet('@WizardsOfX I want to play!').name, 'start')
+        
+    def test_handle_tweet(self):
+        """Test executing raw mention text end to end."""
+        handler = CommandHandler(BankingSystem(TransactionVerifier(FakeChainBackend(default_confirmations=3)),
+                                               sender=FakeWithdrawalSender()))
+        result = handler.handle_tweet('@WizardsOfX create Wizard1', 'player1')
+        self.assertTrue(result['success'])
+        
+        result = handler.handle_tweet('@WizardsOfX cast incendio', 'player1')
+        self.assertIn('error', result)
+        self.assertIn('error', handler.handle_tweet('@WizardsOfX', 'player1'))
+        
+class TestReplies(unittest.TestCase):
+    def setUp(self):
+        self.banking = BankingSystem(TransactionVerifier(FakeChainBackend(default_confirmations=3)),
+                                     sender=FakeWithdrawalSender())
+        self.handler = CommandHandler(self.banking)
+        
+    def reply(self, text, handle):
+        command = parse_tweet(text)
+        return format_reply(command, self.handler.execute(command, handle))
+        
+    def test_replies_describe_each_result(self):
+        """Test that replies are worded from each command's payload."""
+        self.assertIn('Wizard1 begins at level 1', self.reply('@WizardsOfX create Wizard1', 'player1'))
+        self.reply('@WizardsOfX create Wizard2', 'player2')
+        for handle in ('player1', 'player2'):
+            self.banking.process_deposit(f'tx_{handle}', self.handler.get_player(handle), 100.0)
+            
+        self.assertEqual(self.reply('@WizardsOfX b', 'player1'),
+                         '💰 100 withdrawable + 20 bonus = 120 Galleons')
+        self.assertIn('@player1 vs @player2 for 50 Galleons', self.reply('@WizardsOfX d @player2 50', 'player1'))
+        self.assertTrue(self.reply('@WizardsOfX cast incendio', 'player1').startswith('✨ Incendio!'))
+        self.assertIn('Level 1', self.reply('@WizardsOfX p', 'player2'))
+        self.assertIn('1. @player', self.reply('@WizardsOfX lb', 'player1'))
+        self.assertIn("You're in tournament #1", self.reply('@WizardsOfX t join', 'player1'))
+        
+    def test_error_and_limit_replies(self):
+        """Test that errors and rate limits are reported as such."""
+        self.assertEqual(self.reply('@WizardsOfX p', 'nobody'), '❌ Create a wizard first')
+        for _ in range(6):
+            self.reply('@WizardsOfX tokenomics', 'player1')
+        self.assertRegex(self.reply('@WizardsOfX tokenomics', 'player1'), r'^❌ .* Try again in [\d.]+s\.$')
+        
+class TestMentionPipeline(unittest.IsolatedAsyncioTestCase):
+    async def test_mentions_flow_to_replies(self):
+        """Test that mentions are parsed, executed and answered."""
+        handler = CommandHandler(BankingSystem(TransactionVerifier(FakeChainBackend(default_confirmations=3)),
+                                               sender=FakeWithdrawalSender()))
+        mentions = [[
+            {'id': 1, 'author': 'player1', 'text': '@WizardsOfX create Wizard1'},
+            {'id': 2, 'author': 'player1', 'text': '@WizardsOfX'},
+            {'id': 3, 'author': 'player1', 'text': '@WizardsOfX p'},
+        ]]
+        replies = []
+        
+        def fetch():
+            return mentions.pop() if mentions else []
+            
+        async def send_reply(mention, result, command):
+            replies.append((mention['id'], result))
+            if len(replies) == 2:
+                pipeline.stop()
+                
+        pipeline = build_mention_pipeline(handler, fetch, send_reply, poll_interval=0.01)
+        await asyncio.wait_for(pipeline.run(), timeout=5)
+        
+        self.assertEqual(sorted(mention_id for mention_id, _ in replies), [1, 3])
+        self.assertTrue(all(result['success'] for _, result in replies))
+        self.assertEqual(pipeline.stats()['fetched'], 3)
+        
+    async def test_drop_newest_backpressure(self):
+        """Test that a full drop_newest stage sheds load instead of blocking."""
+        release = asyncio.Event()
+        
+        async def slow(item):
+            await release.wait()
+            
+        stage = Stage('slow', slow, StageConfig(queue_size=2, overflow=DROP_NEWEST))
+        pipeline = Pipeline(lambda: list(range(10)), [stage], poll_interval=0.01)
+        task = asyncio.ensure_future(pipeline.run())
+        await asyncio.sleep(0.05)
+        
+        self.assertGreater(stage.dropped, 0)
+        self.assertLessEqual(stage.queue.qsize(), 2)
+        pipeline.stop()
+        release.set()
+        await asyncio.wait_for(task, timeout=5)
         
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
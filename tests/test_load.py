@@ -8,11 +8,14 @@ from game_logic.character import Character
 from game_logic.combat import Combat
 from game_logic.banking import BankingSystem
 from game_logic.command_handler import CommandHandler
+from game_logic.settlement import FakeWithdrawalSender
+from game_logic.verification import FakeChainBackend, TransactionVerifier
 
 class TestLoadPerformance(unittest.TestCase):
     def setUp(self):
-        self.banking = BankingSystem()
-        self.command_handler = CommandHandler(self.banking)
+        self.banking = BankingSystem(TransactionVerifier(FakeChainBackend(default_confirmations=3)),
+                                     sender=FakeWithdrawalSender())
+        self.command_handler = CommandHandler(self.banking, admins=('admin',))
         self.num_concurrent_users = 100
         self.test_duration = 60  # seconds
         self.metrics = {
@@ -67,8 +70,8 @@ class TestLoadPerformance(unittest.TestCase):
         
     def test_concurrent_duels(self):
         """Test system performance with many concurrent duels."""
-        # Create test players
-        players = self._create_test_players(100)
+        # Create test players who can cover a 50 Galleon stake
+        players = self._create_test_players(100, deposit=50.0)
         active_duels = []
         
         # Start concurrent duels
@@ -85,21 +88,21 @@ class TestLoadPerformance(unittest.TestCase):
                 )
                 
             # Wait for duels to be created
-            for future in as_completed(duel_futures):
+            for future, i in zip(duel_futures, range(0, len(players), 2)):
                 duel_id = future.result()
                 if duel_id:
-                    active_duels.append(duel_id)
+                    active_duels.append((duel_id, players[i], players[i+1]))
                     
             # Submit spell casting tasks
             cast_futures = []
             start_time = time.time()
             
             while time.time() - start_time < self.test_duration:
-                for duel_id in active_duels:
+                for duel_id, player1, player2 in active_duels:
                     cast_futures.append(
                         executor.submit(
                             self._cast_spell,
-                            duel_id,
+                            random.choice([player1, player2]),
                             random.choice(['Incendio', 'Protego'])
                         )
                     )
@@ -121,7 +124,7 @@ class TestLoadPerformance(unittest.TestCase):
         num_players = 128  # Test with 128 players (7 rounds)
         players = self._create_test_players(num_players)
         
-        # Start tournament
+        # Open tournament
         tournament_id = self._create_tournament()
         
         # Register players concurrently
@@ -141,14 +144,21 @@ class TestLoadPerformance(unittest.TestCase):
                 result = future.result()
                 self._update_metrics(result)
                 
+        # Close registration and lay out the bracket
+        start = self.command_handler.handle_command('t', ['start'], 'admin')
+        self.assertEqual(start['players'], num_players)
+        self.assertEqual(start['rounds'], 7)  # log2(128) = 7 rounds
+        self.assertEqual(self.command_handler.current_tournament.size, num_players)
+        
         # Run tournament rounds
         round_times = []
-        for round_num in range(7):  # log2(128) = 7 rounds
+        for round_num in range(start['rounds']):
             start_time = time.time()
             
             with ThreadPoolExecutor(max_workers=64) as executor:
                 futures = []
                 matches = self._get_round_matches(tournament_id, round_num)
+                self.assertEqual(len(matches), num_players >> (round_num + 1))
                 
                 for match in matches:
                     futures.append(
@@ -166,6 +176,11 @@ class TestLoadPerformance(unittest.TestCase):
                     
             round_times.append(time.time() - start_time)
             
+        status = self.command_handler.handle_command('t', ['status'], 'admin')
+        self.assertEqual(status['status'], 'finished')
+        self.assertIsNotNone(status['champion'])
+        self.assertEqual(self.metrics['errors'], 0)
+        
         # Assert tournament performance
         avg_round_time = sum(round_times) / len(round_times)
         self.assertLess(
@@ -246,12 +261,18 @@ class TestLoadPerformance(unittest.TestCase):
         if not result['success']:
             self.metrics['errors'] += 1
             
-    def _create_test_players(self, count: int) -> List[Character]:
-        """Create test player characters."""
-        return [
-            Character(f'player_{i}', f'Wizard_{i}')
-            for i in range(count)
-        ]
+    def _create_test_players(self, count: int, deposit: float = 0) -> List[Character]:
+        """Register test wizards, funding each with `deposit` Galleons."""
+        players = []
+        for i in range(count):
+            handle = f'player_{i}'
+            result = self.command_handler.handle_command('create', [f'Wizard_{i}'], handle)
+            self.assertTrue(result['success'])
+            player = self.command_handler.get_player(handle)
+            if deposit:
+                self.assertTrue(self.banking.process_deposit(f'tx_{handle}', player, deposit)['success'])
+            players.append(player)
+        return players
         
     def _start_duel(self, player1: Character, player2: Character) -> int:
         """Start a test duel between two players."""
@@ -265,14 +286,14 @@ class TestLoadPerformance(unittest.TestCase):
         except Exception:
             return None
             
-    def _cast_spell(self, duel_id: int, spell: str) -> Dict:
+    def _cast_spell(self, player: Character, spell: str) -> Dict:
         """Cast a spell in a test duel."""
         start_time = time.time()
         try:
             result = self.command_handler.handle_command(
                 'cast',
                 [spell],
-                f'player_{random.randint(1, 1000)}'
+                player.twitter_handle
             )
             return {
                 'success': True,
@@ -304,7 +325,7 @@ class TestLoadPerformance(unittest.TestCase):
                 player.twitter_handle
             )
             return {
-                'success': True,
+                'success': 'error' not in result,
                 'response_time': time.time() - start_time
             }
         except Exception as e:
@@ -332,7 +353,7 @@ class TestLoadPerformance(unittest.TestCase):
                 'admin'
             )
             return {
-                'success': True,
+                'success': 'error' not in result,
                 'response_time': time.time() - start_time
             }
         except Exception as e:
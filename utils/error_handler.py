@@ -4,6 +4,9 @@ from datetime import datetime
 import json
 import traceback
 
+from game_logic.combat import Combat
+from game_logic.tournament import Tournament
+
 class GameError(Exception):
     """Base class for game-specific exceptions."""
     def __init__(self, message: str, error_code: str, details: Optional[Dict] = None):
@@ -127,19 +130,43 @@ class ErrorHandler:
 class StateRecovery:
     """Handles game state recovery operations."""
     
-    def __init__(self, error_handler: ErrorHandler):
+    def __init__(self, error_handler: ErrorHandler, duel_log=None, command_handler=None,
+                 tournament_log=None):
         self.error_handler = error_handler
         self.logger = error_handler.logger
+        self.duel_log = duel_log  # DuelJournal holding seeds and cast events
+        self.tournament_log = tournament_log  # TournamentJournal holding checkpoints and matches
+        self.command_handler = command_handler  # Receives recovered duels
         
     def recover_duel(self, duel_id: int) -> Dict:
-        """Recover from an interrupted duel."""
+        """Rebuild an interrupted duel from its seed and cast log and resume it."""
         try:
-            # TODO: Implement duel recovery logic
-            # 1. Load duel state from database
-            # 2. Verify player states
-            # 3. Either resume or safely end duel
-            # 4. Return bets if needed
-            pass
+            loaded = self.duel_log.load(duel_id)
+            if loaded is None:
+                raise GameStateError(f'Duel {duel_id} not found', 'DUEL_NOT_FOUND')
+            header, spells = loaded
+            if header['status'] != 'active':
+                raise GameStateError(f'Duel {duel_id} already ended', 'DUEL_FINISHED',
+                                     {'status': header['status']})
+
+            handler = self.command_handler
+            player1 = handler.get_player(header['player1'])
+            player2 = handler.get_player(header['player2'])
+            if player1 is None or player2 is None:
+                raise GameStateError(f'Duel {duel_id} references an unknown player', 'PLAYER_NOT_FOUND',
+                                     {'player1': header['player1'], 'player2': header['player2']})
+
+            try:
+                combat = Combat.replay(player1, player2, header['seed'], spells,
+                                       header['bet_amount'], banking=handler.banking, duel_id=duel_id,
+                                       levels=header['levels'], houses=header['houses'],
+                                       starting_hp=header['starting_hp'])
+            except ValueError as e:
+                raise GameStateError(str(e), 'DUEL_LOG_INVALID', {'duel_id': duel_id})
+            handler.register_duel(duel_id, combat)
+            self.logger.info(f"Recovered duel {duel_id} after {len(spells)} casts")
+            return {'success': True, 'duel_id': duel_id, 'duel': combat.to_dict(),
+                    'events_replayed': len(spells)}
         except Exception as e:
             return self.error_handler.handle_error(e, {'duel_id': duel_id})
             
@@ -155,13 +182,25 @@ class StateRecovery:
             return self.error_handler.handle_error(e, {'tx_hash': tx_hash})
             
     def recover_tournament(self, tournament_id: int) -> Dict:
-        """Recover from an interrupted tournament."""
+        """Resume a tournament from its latest checkpoint and the matches logged since."""
         try:
-            # TODO: Implement tournament recovery logic
-            # 1. Load tournament state
-            # 2. Verify all matches
-            # 3. Resume or safely end tournament
-            # 4. Handle prize distribution
-            pass
+            loaded = self.tournament_log.load(tournament_id)
+            if loaded is None:
+                raise GameStateError(f'Tournament {tournament_id} not found', 'TOURNAMENT_NOT_FOUND')
+            state, tail = loaded
+
+            try:
+                tournament = Tournament.from_checkpoint(state)
+                for node, winner, loser in tail:
+                    tournament.restore(node, winner, loser)
+            except ValueError as e:
+                raise GameStateError(str(e), 'TOURNAMENT_LOG_INVALID', {'tournament_id': tournament_id})
+            prizes = self.command_handler.resume_tournament(tournament)
+            self.logger.info(f"Recovered tournament {tournament_id} with {len(tail)} matches past its checkpoint")
+            result = {'success': True, 'tournament_id': tournament_id, 'status': tournament.status,
+                      'round': tournament.current_round, 'matches_replayed': len(tail)}
+            if prizes is not None:
+                result['prizes'] = prizes
+            return result
         except Exception as e:
             return self.error_handler.handle_error(e, {'tournament_id': tournament_id}) 
\ No newline at end of file
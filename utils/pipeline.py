@@ -0,0 +1,202 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from game_logic.command_handler import Command, parse_tweet
+
+logger = logging.getLogger('wizards_of_x.pipeline')
+
+# Backpressure policies applied when a stage's inbound queue is full
+BLOCK = 'block'              # Wait for space; slows every upstream stage
+DROP_NEWEST = 'drop_newest'  # Discard the incoming item
+DROP_OLDEST = 'drop_oldest'  # Evict the oldest queued item to make room
+OVERFLOW_POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST)
+
+@dataclass
+class StageConfig:
+    """Concurrency, queue bound and overflow policy for one stage."""
+    concurrency: int = 1
+    queue_size: int = 100
+    overflow: str = BLOCK
+
+    def __post_init__(self):
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {self.overflow}")
+        if self.concurrency < 1 or self.queue_size < 1:
+            raise ValueError("Concurrency and queue size must be positive")
+
+class Stage:
+    """A bounded queue drained by a pool of workers.
+
+    The stage function may be a coroutine function or a plain blocking
+    function; blocking functions run in the default thread pool. Returning
+    None filters the item out instead of passing it downstream.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], config: Optional[StageConfig] = None):
+        self.name = name
+        self.func = func
+        self.config = config or StageConfig()
+        self.queue: Optional[asyncio.Queue] = None
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._is_async = asyncio.iscoroutinefunction(func)
+
+    async def put(self, item: Any) -> bool:
+        """Enqueue an item according to the overflow policy."""
+        if self.config.overflow == BLOCK:
+            await self.queue.put(item)
+            return True
+
+        if self.queue.full():
+            if self.config.overflow == DROP_NEWEST:
+                self.dropped += 1
+                return False
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.dropped += 1
+        self.queue.put_nowait(item)
+        return True
+
+    async def work(self, downstream: Optional['Stage']) -> None:
+        """Worker loop: process items and forward results downstream."""
+        while True:
+            item = await self.queue.get()
+            try:
+                result = await self._call(item)
+                self.processed += 1
+                if result is not None and downstream is not None:
+                    await downstream.put(result)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Pipeline stage {self.name} failed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _call(self, item: Any) -> Any:
+        if self._is_async:
+            return await self.func(item)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.func, item)
+
+    def stats(self) -> Dict:
+        """Current counters and queue depth for monitoring."""
+        return {
+            'queued': self.queue.qsize() if self.queue else 0,
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'errors': self.errors
+        }
+
+class Pipeline:
+    """Polls a source and pushes items through a chain of stages."""
+
+    def __init__(self, fetch: Callable[[], Iterable], stages: List[Stage], poll_interval: float = 1.0):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage")
+        self.fetch = fetch
+        self.stages = stages
+        self.poll_interval = poll_interval
+        self.fetched = 0
+        self._stop: Optional[asyncio.Event] = None
+        self._is_async_fetch = asyncio.iscoroutinefunction(fetch)
+
+    async def run(self) -> None:
+        """Run until stop() is called, then drain in-flight items."""
+        self._stop = asyncio.Event()
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.config.queue_size)
+
+        workers = []
+        for index, stage in enumerate(self.stages):
+            downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.config.concurrency):
+                workers.append(asyncio.ensure_future(stage.work(downstream)))
+
+        source = asyncio.ensure_future(self._poll())
+        try:
+            await self._stop.wait()
+        finally:
+            source.cancel()
+            await asyncio.gather(source, return_exceptions=True)
+            # Stages drain in order so nothing is stranded mid-pipeline
+            for stage in self.stages:
+                await stage.queue.join()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    def stop(self) -> None:
+        """Ask the pipeline to stop fetching and drain."""
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _poll(self) -> None:
+        """Fetch batches from the source, sleeping only when it is idle."""
+        first = self.stages[0]
+        while True:
+            try:
+                if self._is_async_fetch:
+                    batch = await self.fetch()
+                else:
+                    loop = asyncio.get_event_loop()
+                    batch = await loop.run_in_executor(None, self.fetch)
+            except Exception as e:
+                logger.error(f"Error fetching mentions: {e}")
+                batch = None
+
+            count = 0
+            for item in batch or ():
+                await first.put(item)
+                count += 1
+            self.fetched += count
+            if not count:
+                await asyncio.sleep(self.poll_interval)
+
+    def stats(self) -> Dict:
+        """Per-stage counters for monitoring."""
+        stats = {stage.name: stage.stats() for stage in self.stages}
+        stats['fetched'] = self.fetched
+        return stats
+
+def build_mention_pipeline(command_handler, fetch_mentions: Callable[[], Iterable],
+                           send_reply: Callable[[Dict, Dict, Command], Any],
+                           config: Optional[Dict[str, StageConfig]] = None,
+                           poll_interval: float = 1.0) -> Pipeline:
+    """Wire fetch -> parse -> execute -> reply around a CommandHandler.
+
+    Mentions are dicts with at least 'author' and 'text' keys.
+    `send_reply(mention, result, command)` gets the parsed command too, so
+    it can word the reply for that command.
+    """
+    config = config or {}
+
+    async def parse(mention: Dict):
+        # Parsing is cheap enough to run on the loop without a thread hop
+        command = parse_tweet(mention['text'])
+        if command is None:
+            return None
+        return mention, command
+
+    async def execute(item):
+        # Runs on the player's executor shard; no pool thread sits blocked
+        mention, command = item
+        future = command_handler.submit(command, mention['author'])
+        return mention, command, await asyncio.wrap_future(future)
+
+    async def reply(item):
+        mention, command, result = item
+        if asyncio.iscoroutinefunction(send_reply):
+            await send_reply(mention, result, command)
+        else:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, send_reply, mention, result, command)
+        return None
+
+    stages = [
+        Stage('parse', parse, config.get('parse')),
+        Stage('execute', execute, config.get('execute', StageConfig(concurrency=4))),
+        Stage('reply', reply, config.get('reply', StageConfig(concurrency=4))),
+    ]
+    return Pipeline(fetch_mentions, stages, poll_interval)
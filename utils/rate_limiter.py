@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+@dataclass(frozen=True)
+class RateLimit:
+    """A token bucket: `capacity` actions, fully refilled every `period` seconds."""
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+# Documented limits from API.md
+DEFAULT_LIMITS = {
+    'general': RateLimit(6, 60),   # 6 commands per minute
+    'duel': RateLimit(1, 5),       # 1 duel action per 5 seconds
+    'banking': RateLimit(1, 60),   # 1 banking operation per minute
+    'profile': RateLimit(10, 60),  # 10 profile views per minute
+}
+
+class RateLimiter:
+    """Per-(player, command class) token buckets with lazy refill.
+
+    A bucket is only touched when its player sends a command, so idle
+    players cost nothing. Buckets are kept in least-recently-used order;
+    any bucket idle long enough to have refilled completely is
+    indistinguishable from a fresh one and is dropped, which keeps memory
+    proportional to recently active players. `max_entries` is a hard cap
+    for bursts of distinct handles; evicting a partly drained bucket early
+    only ever errs in the player's favour.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, RateLimit]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 max_entries: int = 200_000):
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.clock = clock
+        self.max_entries = max_entries
+        # (handle, command_class) -> (tokens, last_refill)
+        self._buckets: 'OrderedDict[Tuple[str, str], Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, handle: str, command_class: str) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until retry."""
+        limit = self.limits.get(command_class)
+        if limit is None:
+            return 0.0
+
+        now = self.clock()
+        key = (handle.lower(), command_class)
+        with self._lock:
+            self._evict_idle(now)
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = float(limit.capacity)
+            else:
+                tokens, last = bucket
+                tokens = min(limit.capacity, tokens + (now - last) * limit.refill_rate)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / limit.refill_rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_entries:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop least-recently-used buckets that have refilled completely."""
+        buckets = self._buckets
+        while buckets:
+            key, (tokens, last) = next(iter(buckets.items()))
+            limit = self.limits.get(key[1])
+            needed = (limit.capacity - tokens) / limit.refill_rate if limit else 0
+            if now - last < needed:
+                return
+            buckets.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
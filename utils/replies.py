@@ -0,0 +1,121 @@
+from typing import Callable, Dict
+from game_logic.command_handler import Command
+
+TWEET_LIMIT = 280
+
+def _galleons(amount: float) -> str:
+    return f'{amount:,.2f}'.rstrip('0').rstrip('.')
+
+def _create(command: Command, result: Dict) -> str:
+    return (f"🎩 The Sorting Hat says... {result['house']}!\n"
+            f"✨ {result['name']} begins at level {result['level']} with {result['hp']} HP "
+            f"and {_galleons(result['bonus_galleons'])} bonus Galleons.\n"
+            f"Spells: {', '.join(result['spells'])}")
+
+def _start(command: Command, result: Dict) -> str:
+    if result['registered']:
+        return "🧙 Welcome back! Challenge someone with: d @player amount"
+    return f"🧙 Welcome to Wizards of X! Reply '{result['next_step']}' to be sorted into a house."
+
+def _help(command: Command, result: Dict) -> str:
+    return f"📜 Commands: {', '.join(result['commands'])}"
+
+def _duel(command: Command, result: Dict) -> str:
+    duel = result['duel']
+    return (f"⚔️ Duel #{result['duel_id']}: @{duel['player1']} vs @{duel['player2']} "
+            f"for {_galleons(duel['bet_amount'])} Galleons! @{duel['turn']} casts first.")
+
+def _cast(command: Command, result: Dict) -> str:
+    parts = [f"✨ {result['spell']}!"]
+    if 'damage' in result:
+        parts.append(f"{result['damage']} damage.")
+    parts.extend(result['effects'])
+    return ' '.join(parts)
+
+def _profile(command: Command, result: Dict) -> str:
+    return (f"🧙 {result['name']} of {result['house']} | Level {result['level']} ({result['xp']} XP) | "
+            f"{result['max_hp']} max HP | {result['wins']}W-{result['losses']}L | "
+            f"{_galleons(result['withdrawable_galleons'])} Galleons "
+            f"(+{_galleons(result['bonus_galleons'])} bonus)")
+
+def _balance(command: Command, result: Dict) -> str:
+    return (f"💰 {_galleons(result['withdrawable_galleons'])} withdrawable + "
+            f"{_galleons(result['bonus_galleons'])} bonus = {_galleons(result['total'])} Galleons")
+
+def _deposit(command: Command, result: Dict) -> str:
+    return f"🏦 {result['instructions']}"
+
+def _withdraw(command: Command, result: Dict) -> str:
+    return (f"💸 Withdrawal #{result['withdrawal_id']}: {_galleons(result['amount'])} Galleons "
+            f"on the way ({_galleons(result['fee'])} fee). Balance: {_galleons(result['new_balance'])}")
+
+def _tokenomics(command: Command, result: Dict) -> str:
+    return (f"🏦 Prize pool {_galleons(result['prize_pool'])} | Burned {_galleons(result['total_burned'])} | "
+            f"Burning soon {_galleons(result['pending_burns'])}")
+
+def _leaderboard(command: Command, result: Dict) -> str:
+    if result['board'] == 'house':
+        rows = [f"{i}. {row['house']} {row['tournament_points']} pts"
+                for i, row in enumerate(result['houses'], 1)]
+        return '🏆 House standings: ' + ' | '.join(rows)
+    rows = [f"{row['rank']}. @{row['handle']}" for row in result['top']]
+    text = f"🏆 Top by {result['board']}: " + ' '.join(rows)
+    if result['rank'] is not None:
+        text += f" | You: #{result['rank']} of {result['players']}"
+    return text
+
+def _house_cup(command: Command, result: Dict) -> str:
+    if 'standings' not in result:
+        return f"🏰 The House Cup has begun: {result['matches']} matches to play!"
+    rows = [f"{row['house']} {row['tournament_points']} pts" for row in result['standings']]
+    return '🏰 House Cup: ' + ' | '.join(rows)
+
+def _tournament(command: Command, result: Dict) -> str:
+    if command.args and command.args[0].lower() == 'cup':
+        return _house_cup(command, result)
+    if 'placings' in result:
+        return f"🏆 @{result['winner']} wins the tournament final over @{result['loser']}!"
+    if 'winner' in result:
+        return f"⚔️ @{result['winner']} beats @{result['loser']} in round {result['round'] + 1}."
+    if 'matches' in result:
+        pairs = [f"@{m['player1']} vs @{m['player2']}" for m in result['matches'] if m['status'] == 'ready']
+        return f"📋 Round {result['round'] + 1}: " + (', '.join(pairs) or 'no matches left to play')
+    if 'status' in result:
+        if result['champion']:
+            return f"🏆 Tournament #{result['tournament_id']} champion: @{result['champion']}"
+        return (f"📋 Tournament #{result['tournament_id']} ({result['type']}): {result['status']}, "
+                f"{result['players']} wizards")
+    if 'rounds' in result:
+        return (f"🏁 Tournament #{result['tournament_id']} has begun: {result['players']} wizards, "
+                f"{result['rounds']} rounds!")
+    if 'players' in result:
+        return f"✅ You're in tournament #{result['tournament_id']} ({result['players']} wizards so far)."
+    return f"✅ Tournament #{result['tournament_id']} created."
+
+FORMATTERS: Dict[str, Callable[[Command, Dict], str]] = {
+    'start': _start,
+    'help': _help,
+    'create': _create,
+    'duel': _duel,
+    'cast': _cast,
+    'profile': _profile,
+    'balance': _balance,
+    'deposit': _deposit,
+    'withdraw': _withdraw,
+    'tokenomics': _tokenomics,
+    'leaderboard': _leaderboard,
+    'tournament': _tournament,
+}
+
+def format_reply(command: Command, result: Dict) -> str:
+    """Tweet text for a command's result, cut to fit one tweet."""
+    if 'error' in result:
+        text = f"❌ {result['error']}"
+        if 'retry_after' in result:
+            text += f" Try again in {result['retry_after']}s."
+    else:
+        formatter = FORMATTERS.get(command.name)
+        text = formatter(command, result) if formatter else "✨ Done!"
+    if len(text) > TWEET_LIMIT:
+        text = text[:TWEET_LIMIT - 1] + '…'
+    return text
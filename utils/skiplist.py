@@ -0,0 +1,127 @@
+import random
+from typing import Any, Iterator, List, Optional
+
+class _Node:
+    __slots__ = ('key', 'next', 'width')
+
+    def __init__(self, key: Any, height: int):
+        self.key = key
+        self.next: List[Optional['_Node']] = [None] * height
+        self.width = [1] * height  # Positions skipped by each forward link
+
+class IndexableSkipList:
+    """Sorted set of unique, comparable keys with positional access.
+
+    Every forward link records how many positions it skips, so insert,
+    remove, `index` (rank of a key) and `[i]` (key at a rank) are all
+    expected O(log n), and a slice costs O(log n + its length).
+    """
+
+    MAX_HEIGHT = 32
+
+    def __init__(self, seed: Optional[int] = None):
+        self._head = _Node(None, self.MAX_HEIGHT)
+        self._height = 1
+        self._size = 0
+        self._random = random.Random(seed)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        node = self._head.next[0]
+        while node is not None:
+            yield node.key
+            node = node.next[0]
+
+    def _search(self, key: Any):
+        """Last node before `key` on each level, and its position."""
+        update = [self._head] * self.MAX_HEIGHT
+        positions = [0] * self.MAX_HEIGHT
+        node, position = self._head, 0
+        for level in range(self._height - 1, -1, -1):
+            while node.next[level] is not None and node.next[level].key < key:
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+        return update, positions
+
+    def add(self, key: Any) -> bool:
+        """Insert a key; returns False if it is already present."""
+        update, positions = self._search(key)
+        found = update[0].next[0]
+        if found is not None and found.key == key:
+            return False
+
+        height = 1
+        while height < self.MAX_HEIGHT and self._random.random() < 0.5:
+            height += 1
+        for level in range(self._height, height):
+            self._head.width[level] = self._size + 1
+        self._height = max(self._height, height)
+
+        node = _Node(key, height)
+        position = positions[0] + 1  # 1-based position of the new node
+        for level in range(height):
+            before = update[level]
+            skipped = position - positions[level]
+            node.next[level] = before.next[level]
+            node.width[level] = before.width[level] - skipped + 1
+            before.next[level] = node
+            before.width[level] = skipped
+        for level in range(height, self._height):
+            update[level].width[level] += 1
+        self._size += 1
+        return True
+
+    def remove(self, key: Any) -> bool:
+        """Delete a key; returns False if it was not present."""
+        update, _ = self._search(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            return False
+        for level in range(self._height):
+            before = update[level]
+            if before.next[level] is node:
+                before.width[level] += node.width[level] - 1
+                before.next[level] = node.next[level]
+            else:
+                before.width[level] -= 1
+        self._size -= 1
+        return True
+
+    def index(self, key: Any) -> int:
+        """0-based rank of a key; raises ValueError if absent."""
+        update, positions = self._search(key)
+        node = update[0].next[0]
+        if node is None or node.key != key:
+            raise ValueError(f'{key!r} is not in the list')
+        return positions[0]
+
+    def __getitem__(self, index: int) -> Any:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('skip list index out of range')
+        return self._node_at(index + 1).key
+
+    def slice(self, start: int, stop: int) -> List[Any]:
+        """Keys with rank in [start, stop)."""
+        start, stop = max(start, 0), min(stop, self._size)
+        if start >= stop:
+            return []
+        node, keys = self._node_at(start + 1), []
+        while node is not None and len(keys) < stop - start:
+            keys.append(node.key)
+            node = node.next[0]
+        return keys
+
+    def _node_at(self, position: int) -> _Node:
+        """Node at a 1-based position."""
+        node = self._head
+        for level in range(self._height - 1, -1, -1):
+            while node.next[level] is not None and node.width[level] <= position:
+                position -= node.width[level]
+                node = node.next[level]
+        return node
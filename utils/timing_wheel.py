@@ -0,0 +1,110 @@
+from typing import Dict, Hashable, List, Tuple
+
+class TimingWheel:
+    """Hierarchical timing wheel for large numbers of timeouts.
+
+    Level 0 has `slots` buckets of one `tick` each; every level above
+    covers `slots` times the span of the one below. A key is filed at the
+    coarsest level that resolves its deadline and cascades down as time
+    approaches it. Scheduling and cancelling are O(1), and advancing costs
+    O(ticks elapsed + keys moved), so expiry work follows the number of
+    keys actually expiring rather than the number scheduled. Deadlines
+    beyond the top level's span wait in an overflow set that is rechecked
+    once per top-level rotation.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, start: float = 0.0):
+        if tick <= 0 or slots < 2 or levels < 1:
+            raise ValueError("Invalid timing wheel geometry")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self._spans = [slots ** level for level in range(levels + 1)]
+        self._wheels: List[List[Dict[Hashable, int]]] = [
+            [{} for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: Dict[Hashable, int] = {}
+        self._due: Dict[Hashable, int] = {}  # Expired during a cascade, returned next
+        self._where: Dict[Hashable, Tuple[int, int]] = {}  # key -> (level, slot); level -1 = overflow/due
+        self._current = int(start // tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """Schedule (or reschedule) a key to expire at `deadline`."""
+        self.cancel(key)
+        self._place(key, int(-(-deadline // self.tick)))  # Round up to a whole tick
+
+    def cancel(self, key: Hashable) -> bool:
+        """Remove a key; returns False if it was not scheduled."""
+        where = self._where.pop(key, None)
+        if where is None:
+            return False
+        level, slot = where
+        if level >= 0:
+            del self._wheels[level][slot][key]
+        else:
+            self._overflow.pop(key, None)
+            self._due.pop(key, None)
+        return True
+
+    def advance(self, now: float) -> List[Hashable]:
+        """Move time forward to `now` and return every key that expired."""
+        target = int(now // self.tick)
+        expired = list(self._due)
+        for key in expired:
+            del self._where[key]
+        self._due.clear()
+
+        if not self._where:
+            # Nothing scheduled; skip the idle ticks entirely
+            self._current = max(self._current, target)
+            return expired
+
+        while self._current < target:
+            self._current += 1
+            tick = self._current
+            if tick % self._spans[self.levels] == 0 and self._overflow:
+                self._replace(self._overflow)
+            for level in range(self.levels - 1, 0, -1):
+                if tick % self._spans[level] == 0:
+                    slot = (tick // self._spans[level]) % self.slots
+                    self._replace(self._wheels[level][slot])
+            bucket = self._wheels[0][tick % self.slots]
+            if bucket:
+                for key in bucket:
+                    del self._where[key]
+                expired.extend(bucket)
+                bucket.clear()
+            for key in self._due:
+                del self._where[key]
+            expired.extend(self._due)
+            self._due.clear()
+        return expired
+
+    def _replace(self, bucket: Dict[Hashable, int]) -> None:
+        """Refile a bucket's keys at the level matching their remaining time."""
+        entries = list(bucket.items())
+        bucket.clear()
+        for key, due in entries:
+            del self._where[key]
+            self._place(key, due)
+
+    def _place(self, key: Hashable, due: int) -> None:
+        delta = due - self._current
+        if delta <= 0:
+            self._due[key] = due
+            self._where[key] = (-1, -1)
+            return
+        for level in range(self.levels):
+            if delta < self._spans[level + 1]:
+                slot = (due // self._spans[level]) % self.slots
+                self._wheels[level][slot][key] = due
+                self._where[key] = (level, slot)
+                return
+        self._overflow[key] = due
+        self._where[key] = (-1, -1)